@@ -0,0 +1,62 @@
+""" Cost of the control node's expiry timing wheel.
+
+Arms ``--timers`` timers with deadlines spread over ``--spread`` seconds, re-arms a share
+of them (what a TTL refresh does) and then turns the wheel over the whole spread without
+waiting for the clock. A tick has to finish well within its second for the expiry lag to
+stay at one tick, so the slowest tick is the number to watch.
+
+    python benchmarks/bench_expiry.py --timers 1000000 --spread 3600
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+
+EXPIRY_DIR = os.path.join(os.path.dirname(__file__), "..", "src", "servers", "control_node")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--timers", type=int, default=1000000)
+    parser.add_argument("--spread", type=int, default=3600, help="seconds the deadlines are spread over")
+    parser.add_argument("--rearm", type=float, default=0.5, help="share of the timers armed again")
+    args = parser.parse_args()
+
+    sys.path.insert(0, EXPIRY_DIR)
+    from expiry import TimingWheel
+
+    wheel = TimingWheel()
+    now = int(time.time())
+    deadlines = [now + 1 + random.randrange(args.spread) for _ in range(args.timers)]
+
+    start = time.perf_counter()
+    for ino, deadline in enumerate(deadlines):
+        wheel.arm(ino, deadline)
+    armed = time.perf_counter() - start
+
+    rearms = int(args.timers * args.rearm)
+    start = time.perf_counter()
+    for ino in random.sample(range(args.timers), rearms):
+        wheel.arm(ino, deadlines[ino])
+    rearmed = time.perf_counter() - start
+
+    slowest, biggest, expired = 0.0, 0, 0
+    start = time.perf_counter()
+    for second in range(now + 1, now + args.spread + 1):
+        tick = time.perf_counter()
+        batch = wheel.advance(second)
+        slowest = max(slowest, time.perf_counter() - tick)
+        biggest = max(biggest, len(batch))
+        expired += len(batch)
+    turned = time.perf_counter() - start
+
+    print(f"arm     {args.timers / armed:12.0f} timers/s")
+    print(f"re-arm  {rearms / max(rearmed, 1e-9):12.0f} timers/s")
+    print(f"expire  {expired / turned:12.0f} timers/s, {expired} of {args.timers} fired")
+    print(f"ticks   slowest {slowest * 1000:.1f} ms, largest batch {biggest}")
+
+
+if __name__ == "__main__":
+    main()
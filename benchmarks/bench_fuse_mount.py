@@ -0,0 +1,133 @@
+""" Benchmark a DEEDSFS mount under different FUSE mount options.
+
+Runs a sequential write/read workload and a metadata-heavy one (stat + listdir over many
+files) against a mounted DEEDSFS. With ``--compare`` the script mounts the filesystem
+itself twice, once with options matching the old bare ``foreground=True`` mount and once
+with the defaults of ``deedsctl setup``, and prints both results side by side.
+
+Needs a running cluster (``docker compose up``) and FUSE, e.g. inside the client container:
+
+    PYTHONPATH=./src python benchmarks/bench_fuse_mount.py --compare --mountpoint /mnt/bench
+    PYTHONPATH=./src python benchmarks/bench_fuse_mount.py --mountpoint /mnt/deeds
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+import uuid
+
+
+# What the kernel got before mount options were exposed: no big writes, no page cache reuse
+# and no negative lookup caching.
+BASELINE_FLAGS = ["--negative-timeout", "0", "--no-big-writes", "--max-write", "4096", "--no-auto-cache"]
+
+
+def sequential(root, size_mb, chunk):
+    path = os.path.join(root, f"bench-{uuid.uuid4().hex}.bin")
+    payload = os.urandom(chunk)
+    total = size_mb * 1024 * 1024
+
+    start = time.perf_counter()
+    with open(path, "wb") as f:
+        for _ in range(0, total, chunk):
+            f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    write_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        while f.read(chunk):
+            pass
+    read_s = time.perf_counter() - start
+
+    os.remove(path)
+    return {"write MB/s": size_mb / write_s, "read MB/s": size_mb / read_s}
+
+
+def metadata(root, files, rounds):
+    directory = os.path.join(root, f"bench-{uuid.uuid4().hex}")
+    os.mkdir(directory)
+    paths = [os.path.join(directory, f"f{i}") for i in range(files)]
+    start = time.perf_counter()
+    for path in paths:
+        with open(path, "wb"):
+            pass
+    create_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        os.listdir(directory)
+        for path in paths:
+            os.stat(path)
+        # Misses exercise negative lookups
+        for i in range(files // 10):
+            os.path.exists(os.path.join(directory, f"missing{i}"))
+    stat_s = time.perf_counter() - start
+
+    for path in paths:
+        os.remove(path)
+    os.rmdir(directory)
+    stat_ops = rounds * (1 + files + files // 10)
+    return {"creates/s": files / create_s, "stat ops/s": stat_ops / stat_s}
+
+
+def run(root, args):
+    result = sequential(root, args.size_mb, args.chunk)
+    result.update(metadata(root, args.files, args.rounds))
+    return result
+
+
+def mounted(mountpoint, flags):
+    """Start ``deedsctl setup`` in the background and wait until the mount is live."""
+    os.makedirs(mountpoint, exist_ok=True)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "deedsclient", "setup", "--mountpoint", mountpoint, *flags],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while not os.path.ismount(mountpoint):
+        if proc.poll() is not None or time.monotonic() > deadline:
+            proc.kill()
+            raise RuntimeError(f"DEEDSFS did not mount at {mountpoint}")
+        time.sleep(0.2)
+    return proc
+
+
+def unmount(mountpoint, proc):
+    subprocess.run(["fusermount", "-u", mountpoint], check=False)
+    proc.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mountpoint", default="/mnt/deeds")
+    parser.add_argument("--compare", action="store_true", help="mount twice and compare option sets")
+    parser.add_argument("--size-mb", type=int, default=16)
+    parser.add_argument("--chunk", type=int, default=128 * 1024)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    if not args.compare:
+        for name, value in run(args.mountpoint, args).items():
+            print(f"{name:>12}: {value:10.1f}")
+        return
+
+    results = {}
+    for label, flags in (("baseline", BASELINE_FLAGS), ("tuned", [])):
+        proc = mounted(args.mountpoint, flags)
+        try:
+            results[label] = run(args.mountpoint, args)
+        finally:
+            unmount(args.mountpoint, proc)
+
+    print(f"{'':>12}  {'baseline':>10}  {'tuned':>10}  {'gain':>6}")
+    for name in results["baseline"]:
+        before, after = results["baseline"][name], results["tuned"][name]
+        print(f"{name:>12}  {before:10.1f}  {after:10.1f}  {after / before:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+""" Concurrency stress test of the control node's metadata operations.
+
+Every client thread works in its own directory (mkdir, create, write, getattr, list,
+rename, delete), which the master's path locks let run in parallel; ``--shared`` puts all
+threads in one directory and has them rename files into each other's names, which is the
+case the lock ordering has to keep free of deadlocks. After each run the tree is checked
+for lost or leftover entries.
+
+Needs a running master, e.g. inside the client container:
+
+    PYTHONPATH=./src python benchmarks/bench_master_concurrency.py --threads 1 4 16
+    PYTHONPATH=./src python benchmarks/bench_master_concurrency.py --shared --threads 8
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from concurrent import futures
+from pathlib import Path
+
+import grpc
+
+sys.path.append(str(Path(__file__).parent.parent / "src" / "servers" / "deedsproto"))
+import master_pb2
+import master_pb2_grpc
+
+
+TIMEOUT = 30
+
+
+def worker(stub, root, shared, thread, files):
+    """One client thread; returns the number of RPCs it made."""
+    directory = root if shared else f"{root}/t{thread}"
+    if not shared:
+        stub.mkdir(master_pb2.Location(path=directory, mode=0o755), timeout=TIMEOUT)
+    names = [f"{directory}/t{thread}-f{i}" for i in range(files)]
+    ops = 1
+    for i, name in enumerate(names):
+        stub.create(master_pb2.Location(path=name, mode=0o644), timeout=TIMEOUT)
+        stub.write(master_pb2.WriteRequest(dest=name, size=(i % 4) * 100), timeout=TIMEOUT)
+        stub.getFileTableEntry(master_pb2.GetFileTableEntryRequest(fname=name), timeout=TIMEOUT)
+        ops += 3
+    stub.getListOfFiles(master_pb2.Location(path=directory), timeout=TIMEOUT)
+    ops += 1
+    for i, name in enumerate(names):
+        # In shared mode rename onto a neighbour's file name half of the time
+        target = f"{directory}/t{(thread + 1) % 4}-f{i}-r" if shared and i % 2 else f"{name}-r"
+        stub.rename(master_pb2.RenameRequest(src=name, dest=target), timeout=TIMEOUT)
+        stub.delete(master_pb2.DeleteRequest(fname=target), timeout=TIMEOUT)
+        ops += 2
+    return ops
+
+
+def run(stub, threads, files, shared):
+    root = f"/bench-{uuid.uuid4().hex[:8]}"
+    stub.mkdir(master_pb2.Location(path=root, mode=0o755), timeout=TIMEOUT)
+    start = time.perf_counter()
+    with futures.ThreadPoolExecutor(max_workers=threads) as pool:
+        jobs = [pool.submit(worker, stub, root, shared, t, files) for t in range(threads)]
+        ops = sum(job.result() for job in jobs)
+    elapsed = time.perf_counter() - start
+
+    # Everything the threads created was renamed and deleted again
+    subdirs = [] if shared else [f"t{t}" for t in range(threads)]
+    leftovers = [e for e in stub.getListOfFiles(master_pb2.Location(path=root), timeout=TIMEOUT).files
+                 if e not in subdirs]
+    for subdir in subdirs:
+        leftovers += stub.getListOfFiles(master_pb2.Location(path=f"{root}/{subdir}"), timeout=TIMEOUT).files
+    attrs = json.loads(stub.getFileTableEntry(master_pb2.GetFileTableEntryRequest(fname=root)).attrs)
+    stub.delete(master_pb2.DeleteRequest(fname=root), timeout=TIMEOUT)
+    return ops / elapsed, leftovers, attrs["st_nlink"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--address", default=os.getenv("DEEDS_MASTER_ADDRESS", "localhost:50051"))
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--files", type=int, default=200, help="files per thread")
+    parser.add_argument("--shared", action="store_true", help="all threads in one directory")
+    args = parser.parse_args()
+
+    channel = grpc.insecure_channel(args.address)
+    grpc.channel_ready_future(channel).result(timeout=TIMEOUT)
+    stub = master_pb2_grpc.MasterServiceStub(channel)
+
+    print(f"{'threads':>7}  {'ops/s':>9}  {'leftovers':>9}  {'nlink':>5}")
+    for threads in args.threads:
+        rate, leftovers, nlink = run(stub, threads, args.files, args.shared)
+        expected = 2 if args.shared else 2 + threads
+        status = "" if not leftovers and nlink == expected else f"  INCONSISTENT (expected nlink {expected})"
+        print(f"{threads:>7}  {rate:9.0f}  {len(leftovers):>9}  {nlink:>5}{status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+""" Memory used by the control node's metadata per file.
+
+Builds the same tree twice, each in a fresh interpreter: once in the path-keyed layout the
+master used to have (``file_table`` of uuid-string tuples plus a 12-key attribute dict per
+path, and ``files``/``folders`` sets per directory), and once in the slotted ``Namespace``
+with packed ``BlockMap``s. Reports the RSS growth per file for both.
+
+    python benchmarks/bench_metadata_memory.py --files 1000000
+    python benchmarks/bench_metadata_memory.py --files 1000000 10000000 --blocks 4
+
+10M files in the old layout needs several GB of RAM.
+"""
+import argparse
+import os
+import stat
+import subprocess
+import sys
+import time
+import uuid
+
+
+NAMESPACE_DIR = os.path.join(os.path.dirname(__file__), "..", "src", "servers", "control_node")
+NODES = ["A", "B", "C"]
+
+
+def rss():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def paths(files, per_dir):
+    for i in range(files):
+        yield f"/d{i // per_dir}", f"f{i % per_dir}"
+
+
+def build_dicts(files, blocks, per_dir):
+    file_table, file_attributes = {}, {}
+    now = int(time.time())
+
+    def attrs(mode):
+        return {"st_mode": mode, "st_nlink": 1, "st_uid": 0, "st_gid": 0, "st_size": 0,
+                "st_atime": now, "st_mtime": now, "st_ctime": now, "st_blocks": 0,
+                "st_blksize": 0, "st_ino": 0, "st_dev": 0}
+
+    for directory, name in paths(files, per_dir):
+        if directory not in file_table:
+            file_table[directory] = []
+            file_attributes[directory] = dict(attrs(stat.S_IFDIR | 0o755), files=set(), folders=set())
+        path = f"{directory}/{name}"
+        file_table[path] = [(str(uuid.uuid1()), NODES[i % 3], i) for i in range(blocks)]
+        file_attributes[path] = attrs(stat.S_IFREG | 0o644)
+        file_attributes[directory]["files"].add(name)
+    return file_table, file_attributes
+
+
+def build_namespace(files, blocks, per_dir):
+    sys.path.insert(0, NAMESPACE_DIR)
+    from namespace import Namespace
+
+    namespace = Namespace()
+    for directory, name in paths(files, per_dir):
+        parent = namespace.resolve(directory) or namespace.mkdir(directory)
+        inode = namespace._new(parent, name, stat.S_IFREG | 0o644, int(time.time()))
+        for i in range(blocks):
+            inode.blocks.append(str(uuid.uuid1()), NODES[i % 3])
+    return namespace
+
+
+def measure(layout, files, blocks, per_dir):
+    """Child process: build one layout and print bytes per file."""
+    build = build_dicts if layout == "dicts" else build_namespace
+    before = rss()
+    start = time.perf_counter()
+    state = build(files, blocks, per_dir)
+    elapsed = time.perf_counter() - start
+    print((rss() - before) / files, elapsed)
+    del state
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, nargs="+", default=[1000000])
+    parser.add_argument("--blocks", type=int, default=2, help="blocks per file")
+    parser.add_argument("--per-dir", type=int, default=1000, help="files per directory")
+    parser.add_argument("--layout", choices=["dicts", "namespace"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.layout:
+        measure(args.layout, args.files[0], args.blocks, args.per_dir)
+        return
+
+    print(f"{'files':>10}  {'layout':>9}  {'bytes/file':>10}  {'total MB':>9}  {'build s':>8}")
+    for files in args.files:
+        results = {}
+        for layout in ("dicts", "namespace"):
+            out = subprocess.run(
+                [sys.executable, __file__, "--layout", layout, "--files", str(files),
+                 "--blocks", str(args.blocks), "--per-dir", str(args.per_dir)],
+                check=True, capture_output=True, text=True,
+            ).stdout.split()
+            per_file, elapsed = float(out[0]), float(out[1])
+            results[layout] = per_file
+            print(f"{files:>10}  {layout:>9}  {per_file:10.0f}  {per_file * files / 2**20:9.0f}  {elapsed:8.1f}")
+        print(f"{'':>10}  {'saving':>9}  {results['dicts'] / results['namespace']:9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 import click
-from .deedsfs import DEEDSFS
+from .deedsfs import DEEDSFS, FUSE_OPTIONS
 from .deedsclient import DeedsClient
 
 @click.group()
@@ -9,22 +9,92 @@ def deedsctl():
 
 @deedsctl.command()
 @click.option('--mountpoint', default='/tmp/deedsfs', help='The mountpoint for the DEEDS filesystem.')
-def setup(mountpoint):
+@click.option('--attr-timeout', type=float, default=FUSE_OPTIONS['attr_timeout'], show_default=True,
+              help='Seconds the kernel caches file attributes.')
+@click.option('--entry-timeout', type=float, default=FUSE_OPTIONS['entry_timeout'], show_default=True,
+              help='Seconds the kernel caches name lookups.')
+@click.option('--negative-timeout', type=float, default=FUSE_OPTIONS['negative_timeout'], show_default=True,
+              help='Seconds the kernel caches failed lookups.')
+@click.option('--big-writes/--no-big-writes', default=FUSE_OPTIONS['big_writes'], show_default=True,
+              help='Allow writes larger than 4 KiB.')
+@click.option('--max-write', type=int, default=FUSE_OPTIONS['max_write'], show_default=True,
+              help='Largest write request in bytes.')
+@click.option('--max-read', type=int, default=FUSE_OPTIONS['max_read'], show_default=True,
+              help='Largest read request in bytes.')
+@click.option('--kernel-cache/--no-kernel-cache', default=FUSE_OPTIONS['kernel_cache'], show_default=True,
+              help='Never invalidate the page cache on open.')
+@click.option('--auto-cache/--no-auto-cache', default=FUSE_OPTIONS['auto_cache'], show_default=True,
+              help='Keep the page cache while mtime and size are unchanged.')
+@click.option('--max-background', type=int, default=FUSE_OPTIONS['max_background'],
+              help='Maximum number of background requests (libfuse default if unset).')
+def setup(mountpoint, **fuse_options):
     """Setup the deedsctl."""
     deedsfs = DEEDSFS()
+    if not deedsfs.client.ping():
+        raise click.ClickException(f"DEEDS master at {deedsfs.client.address} is not reachable")
     click.echo(f"Mouting DEEDS filesystem at {mountpoint}...")
-    deedsfs.mount(mountpoint)
+    deedsfs.mount(mountpoint, **fuse_options)
 
 @deedsctl.command()
-@click.option('--ttl', default=60, help='The time-to-live for the file.')
+@click.option('--ttl', type=int, default=None, help='The time-to-live for the file (0: none).')
+@click.option('--recursive', '-r', is_flag=True, help='Also set it for everything below the directory.')
+@click.option('--pattern', default='',
+              help='With --recursive, only for entries whose name matches this glob, e.g. "*.log".')
+@click.option('--default-ttl', type=int, default=None,
+              help='Time-to-live of new entries below the directory (0: none, -1: the master default).')
+@click.option('--wait/--no-wait', default=True, show_default=True, help='Follow the progress of the job.')
 @click.argument('path')
-def expire(ttl, path):
-    """Set the time-to-live for a file."""
+def expire(ttl, recursive, pattern, default_ttl, wait, path):
+    """Set the time-to-live for a file, or for a whole directory tree."""
     import os
+    import time
+    import grpc
+    if pattern and not recursive:
+        raise click.UsageError("--pattern needs --recursive")
+    if ttl is None and (recursive or default_ttl is None):
+        raise click.UsageError("--ttl is needed unless only --default-ttl is set")
     address = os.getenv("DEEDS_MASTER_ADDRESS", "localhost:50051")
     client = DeedsClient(address)
-    click.echo(f"Setting time-to-live for {path} to {ttl}...")
-    client.reset_expire(path, ttl)
+    try:
+        if ttl is None:
+            click.echo(f"Setting the default time-to-live below {path} to {default_ttl}...")
+            client.expire_tree(path, None, False, default_ttl=default_ttl)
+            return
+        click.echo(f"Setting time-to-live for {path} to {ttl}...")
+        if not (recursive or default_ttl is not None):
+            client.reset_expire(path, ttl)
+            return
+        job = client.expire_tree(path, ttl, recursive, pattern, default_ttl)
+    except grpc.RpcError as e:
+        raise click.ClickException(e.details())
+    click.echo(f"Started job {job.job_id}")
+    while wait and not job.done:
+        time.sleep(1)
+        job = client.expire_job(job.job_id)
+        click.echo(f"{job.updated} of {job.scanned} entries updated")
+    if job.error:
+        raise click.ClickException(job.error)
+
+
+@deedsctl.command(name='expiry-stats')
+def expiry_stats():
+    """Show the counters of the master's expiry timers."""
+    import os
+    address = os.getenv("DEEDS_MASTER_ADDRESS", "localhost:50051")
+    client = DeedsClient(address)
+    for name, value in client.expiry_stats().items():
+        click.echo(f"{name}: {value}")
+
+
+@deedsctl.command()
+def selftest():
+    """Run an end-to-end smoke test against the cluster (writes /test.txt)."""
+    import os
+    address = os.getenv("DEEDS_MASTER_ADDRESS", "localhost:50051")
+    client = DeedsClient(address)
+    if not client.ping():
+        raise click.ClickException(f"DEEDS master at {address} is not reachable")
+    client.test()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,168 @@
+""" In-process caches of the DEEDS client.
+
+``BlockCache`` holds block contents keyed by block uuid. Block uuids are allocated by the
+master and never reused, so a cached block stays valid until this client overwrites it or
+learns that the master dropped it (file shrunk or deleted). Those events invalidate the
+entry; everything else is bounded by a byte budget with least-recently-used eviction.
+A fetch that was already in flight when its block was invalidated must not put the old
+bytes back, so invalidations are numbered: callers read ``epoch()`` before fetching and
+pass it to ``put``, which drops blocks invalidated since.
+
+``AttrCache`` holds file attributes for a short time, so the stream of ``getattr`` calls
+the kernel makes during path walks and ``ls -l`` does not turn into one master RPC each.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+MAX_BYTES = 64 * 1024 * 1024
+# Recently invalidated uuids remembered; a put older than all of them is dropped
+MAX_INVALIDATED = 4096
+ATTR_TTL = 1.0
+NEGATIVE_TTL = 0.5
+MAX_ATTR_ENTRIES = 100000
+
+
+class BlockCache:
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._blocks = OrderedDict()
+        self._epoch = 0
+        self._invalidated = OrderedDict()   # uuid -> epoch of its last invalidation, oldest first
+        self._forgotten = 0                 # Latest epoch dropped from _invalidated
+        self._lock = threading.Lock()
+
+    def get(self, block_uuid):
+        with self._lock:
+            data = self._blocks.get(block_uuid)
+            if data is None:
+                self.misses += 1
+                return None
+            self._blocks.move_to_end(block_uuid)
+            self.hits += 1
+            return data
+
+    def epoch(self):
+        """Number of the latest invalidation, to pass to ``put`` for a fetch started now"""
+        with self._lock:
+            return self._epoch
+
+    def peek(self, block_uuid):
+        """Like ``get`` but without touching the counters or the LRU order."""
+        with self._lock:
+            return self._blocks.get(block_uuid)
+
+    def __contains__(self, block_uuid):
+        with self._lock:
+            return block_uuid in self._blocks
+
+    def put(self, block_uuid, data, epoch=None):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if epoch is not None and max(self._invalidated.get(block_uuid, 0), self._forgotten) > epoch:
+                return
+            old = self._blocks.pop(block_uuid, None)
+            if old is not None:
+                self.size -= len(old)
+            self._blocks[block_uuid] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self._blocks.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def invalidate(self, block_uuids):
+        with self._lock:
+            self._epoch += 1
+            for block_uuid in block_uuids:
+                data = self._blocks.pop(block_uuid, None)
+                if data is not None:
+                    self.size -= len(data)
+                self._invalidated.pop(block_uuid, None)
+                self._invalidated[block_uuid] = self._epoch
+            while len(self._invalidated) > MAX_INVALIDATED:
+                _, self._forgotten = self._invalidated.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._blocks.clear()
+            self.size = 0
+            self._epoch += 1
+            self._invalidated.clear()
+            self._forgotten = self._epoch
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "blocks": len(self._blocks),
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class AttrCache:
+    """Path -> attributes dict, or ``None`` for a path known not to exist.
+
+    Entries live for ``ttl`` seconds (``negative_ttl`` for missing paths) but never past
+    the file's own ``expire_at``, so an expired file is not kept alive by the cache.
+    """
+
+    def __init__(self, ttl=ATTR_TTL, negative_ttl=NEGATIVE_TTL, max_entries=MAX_ATTR_ENTRIES):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """Return ``(found, attrs)``; ``found`` is False when the master must be asked."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None or entry[0] <= now:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(path)
+            self.hits += 1
+            return True, entry[1]
+
+    def put(self, path, attrs):
+        now = time.time()
+        if attrs is None:
+            valid_until = now + self.negative_ttl
+        else:
+            valid_until = now + self.ttl
+            if attrs.get("expire_at") is not None:
+                valid_until = min(valid_until, attrs["expire_at"])
+        if valid_until <= now:
+            return
+        with self._lock:
+            self._entries[path] = (valid_until, attrs)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *paths):
+        with self._lock:
+            for path in paths:
+                self._entries.pop(path, None)
+
+    def invalidate_tree(self, path):
+        """Drop ``path`` and everything below it, e.g. after a directory rename."""
+        prefix = path.rstrip("/") + "/"
+        with self._lock:
+            for cached in [p for p in self._entries if p == path or p.startswith(prefix)]:
+                del self._entries[cached]
@@ -0,0 +1,172 @@
+""" Long-lived gRPC channels to the storage nodes (minions).
+
+A DeedsClient used to open a new channel for every block it touched and then wait for
+it to become ready, so every block paid a TCP + HTTP/2 handshake. The pool below keeps
+one channel per minion address for the lifetime of the client and tracks whether the
+minion is reachable, so a dead node is backed off instead of being re-dialled per block.
+"""
+import threading
+import time
+
+import grpc
+
+import minion_pb2_grpc
+
+
+# Errors that mean "the node is not reachable", as opposed to application errors
+# such as NOT_FOUND which say nothing about the health of the connection.
+RECONNECT_CODES = (grpc.StatusCode.UNAVAILABLE, grpc.StatusCode.DEADLINE_EXCEEDED)
+
+CHANNEL_OPTIONS = [
+    ("grpc.keepalive_time_ms", 30000),
+    ("grpc.keepalive_timeout_ms", 10000),
+    ("grpc.keepalive_permit_without_calls", 1),
+]
+
+
+class MinionUnavailable(Exception):
+    """The minion could not be reached, or is still inside its reconnect backoff."""
+
+
+class _PoolEntry:
+    def __init__(self, address):
+        self.address = address
+        self.channel = None
+        self.stub = None
+        self.last_used = 0.0
+        self.failures = 0
+        self.retry_at = 0.0
+        self.lock = threading.Lock()
+
+    @property
+    def healthy(self):
+        return self.failures == 0
+
+
+class MinionChannelPool:
+    """Client-wide pool of minion channels keyed by ``host:port``.
+
+    Channels are created lazily, reused across calls and closed after ``idle_timeout``
+    seconds without use. A minion that fails to connect (or whose calls fail with
+    UNAVAILABLE) is put into exponential backoff; callers asking for it during that
+    window get ``MinionUnavailable`` immediately rather than blocking on a dial.
+    """
+
+    def __init__(self, connect_timeout=10, idle_timeout=300, backoff_base=0.5, backoff_max=30):
+        self.connect_timeout = connect_timeout
+        self.idle_timeout = idle_timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    def _entry(self, address):
+        with self._lock:
+            entry = self._entries.get(address)
+            if entry is None:
+                entry = self._entries[address] = _PoolEntry(address)
+            return entry
+
+    def get_stub(self, address):
+        entry = self._entry(address)
+        now = time.monotonic()
+        with entry.lock:
+            if entry.stub is None:
+                if now < entry.retry_at:
+                    raise MinionUnavailable(
+                        f"Minion {address} is unavailable, retrying in {entry.retry_at - now:.1f}s")
+                channel = grpc.insecure_channel(address, options=CHANNEL_OPTIONS)
+                try:
+                    grpc.channel_ready_future(channel).result(timeout=self.connect_timeout)
+                except grpc.FutureTimeoutError:
+                    channel.close()
+                    self._backoff(entry, time.monotonic())
+                    raise MinionUnavailable(f"Connection to Minion {address} timed out")
+                entry.channel = channel
+                entry.stub = minion_pb2_grpc.MinionServiceStub(channel)
+            entry.last_used = now
+            stub = entry.stub
+        self._evict_idle(now)
+        return stub
+
+    def call(self, address, method, request, timeout=None):
+        """Invoke ``method`` on the minion at ``address``, recording the outcome."""
+        stub = self.get_stub(address)
+        try:
+            response = getattr(stub, method)(request, timeout=timeout)
+        except grpc.RpcError as e:
+            if e.code() in RECONNECT_CODES:
+                self.report_failure(address)
+            raise
+        self.report_success(address)
+        return response
+
+    def stream(self, address, method, request, timeout=None):
+        """Like ``call`` for a server-streaming ``method``; returns all responses as a list."""
+        stub = self.get_stub(address)
+        try:
+            responses = list(getattr(stub, method)(request, timeout=timeout))
+        except grpc.RpcError as e:
+            if e.code() in RECONNECT_CODES:
+                self.report_failure(address)
+            raise
+        self.report_success(address)
+        return responses
+
+    def report_success(self, address):
+        entry = self._entry(address)
+        with entry.lock:
+            entry.failures = 0
+            entry.retry_at = 0.0
+
+    def report_failure(self, address):
+        """Drop the channel to ``address`` so the next call reconnects after a backoff."""
+        entry = self._entry(address)
+        with entry.lock:
+            self._close(entry)
+            self._backoff(entry, time.monotonic())
+
+    def _backoff(self, entry, now):
+        entry.failures += 1
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (entry.failures - 1)))
+        entry.retry_at = now + delay
+
+    @staticmethod
+    def _close(entry):
+        if entry.channel is not None:
+            entry.channel.close()
+        entry.channel = None
+        entry.stub = None
+
+    def _evict_idle(self, now):
+        if now - self._last_sweep < self.idle_timeout / 2:
+            return
+        self._last_sweep = now
+        with self._lock:
+            entries = list(self._entries.values())
+        for entry in entries:
+            with entry.lock:
+                if entry.stub is not None and now - entry.last_used > self.idle_timeout:
+                    self._close(entry)
+
+    def health(self):
+        """Snapshot of the pool: ``{address: {"connected", "healthy", "failures"}}``."""
+        with self._lock:
+            entries = list(self._entries.values())
+        return {
+            entry.address: {
+                "connected": entry.stub is not None,
+                "healthy": entry.healthy,
+                "failures": entry.failures,
+            }
+            for entry in entries
+        }
+
+    def close(self):
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            with entry.lock:
+                self._close(entry)
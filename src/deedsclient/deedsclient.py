@@ -1,16 +1,19 @@
 from dataclasses import dataclass
-import functools
-import logging
-import random
-import configparser
+import json
+import os
+import threading
+import time
 import grpc
-from concurrent import futures
 
 import master_pb2
 import master_pb2_grpc
 import minion_pb2
 import minion_pb2_grpc
 
+from .cache import AttrCache, BlockCache
+from .channels import MinionChannelPool
+from .readahead import Readahead
+from .transfer import BlockTransfer
 
 NODE_MAP = {
     #  A:storage1:50051,B:storage2:50051,C:storage3:50051
@@ -20,40 +23,169 @@ NODE_MAP = {
 }
 
 
+def replica_addresses(block, start=0):
+    """Addresses of the minions holding ``block``, beginning with its ``start``-th replica"""
+    replicas = list(block.replicas) or [block.node_id]
+    start %= len(replicas)
+    return [NODE_MAP[node_id] for node_id in replicas[start:] + replicas[:start]]
+
+
+@dataclass
+class OpenFile:
+    """A file handle: the block map leased from the master on open"""
+    path: str
+    flags: int
+    blocks: list
+    version: int = 0
+    lease_expires: float = 0.0
+
+    def renew(self, lease):
+        self.blocks = sorted(lease.blocks, key=lambda x: x.block_index)
+        self.version = lease.version
+        self.lease_expires = time.monotonic() + lease.lease_ttl
+
+
 class DeedsClient:
-    def __init__(self, address):
+    def __init__(self, address, attr_ttl=None):
+        """Cheap: nothing is dialled until the first call; use ping() to check the master"""
         self.address = address
-        self.channel = grpc.insecure_channel(address)
-        self.master_stub = master_pb2_grpc.MasterServiceStub(self.channel)
-        self.test()
+        self.channel = None
+        self._master_stub = None
+        self._master_lock = threading.Lock()
+        self.minions = MinionChannelPool()
+        self.block_cache = BlockCache()
+        self.attr_cache = AttrCache() if attr_ttl is None else AttrCache(ttl=attr_ttl)
+        self.transfer = BlockTransfer(self.minions, cache=self.block_cache)
+        self.readahead = Readahead()
+        # Block uuids and version last seen for each path, to spot blocks the master dropped
+        # and contents rewritten by other clients
+        self._file_blocks = {}
+        self._file_versions = {}
+        self._file_blocks_lock = threading.Lock()
+        self._block_size = None
+        # Size of each file as this client last saw or wrote it, so writes need not ask the master
+        self._file_sizes = {}
+        self._file_sizes_lock = threading.Lock()
         self.fdid = 0
         self.fd_map = {}
+        self._fd_lock = threading.Lock()
+
+    @property
+    def master_stub(self):
+        if self._master_stub is None:
+            with self._master_lock:
+                if self._master_stub is None:
+                    self.channel = grpc.insecure_channel(self.address)
+                    self._master_stub = master_pb2_grpc.MasterServiceStub(self.channel)
+        return self._master_stub
+
+    def ping(self, timeout=5):
+        """True if the master answers its health check within timeout seconds"""
+        try:
+            self.master_stub.ping(master_pb2.Empty(), timeout=timeout)
+            return True
+        except grpc.RpcError:
+            return False
 
     def _get_minion_stub(self, host, port=None):
-        if port is None:
-            channel = grpc.insecure_channel(host)
+        address = host if port is None else f"{host}:{port}"
+        return self.minions.get_stub(address)
+
+    @property
+    def block_size(self):
+        # Fixed by the master's configuration, so it is only asked for once
+        if self._block_size is None:
+            self._block_size = self.master_stub.getBlockSize(master_pb2.Empty()).size
+        return self._block_size
+
+    def _file_size(self, fname):
+        if fname not in self._file_sizes:
+            self.getattr(fname, None)
+        return self._file_sizes.get(fname, 0)
+
+    def _saw_size(self, fname, size):
+        # Only this client's writes change sizes it has seen, so a lookup that raced with one
+        # of its writes must not shrink the size back
+        with self._file_sizes_lock:
+            self._file_sizes[fname] = max(size, self._file_sizes.get(fname, 0))
+
+    def _forget_sizes(self, path, new=None):
+        """Drop the sizes of ``path`` and everything below it, or move them under ``new``"""
+        prefix = path.rstrip("/") + "/"
+        with self._file_sizes_lock:
+            for fname in [f for f in self._file_sizes if f == path or f.startswith(prefix)]:
+                size = self._file_sizes.pop(fname)
+                if new is not None:
+                    self._file_sizes[new + fname[len(path):]] = size
+
+    def _track_blocks(self, fname, blocks, version=None, written=False):
+        """Remember the blocks of ``fname`` and evict cached blocks it no longer has.
+
+        An overwrite keeps the uuids of the blocks it rewrites, so when the file's
+        ``version`` moved on since this client last saw it, other than by its own write
+        (``written``), every cached block of the file is evicted.
+        """
+        current = {block.block_uuid for block in blocks}
+        with self._file_blocks_lock:
+            previous = self._file_blocks.get(fname, set())
+            self._file_blocks[fname] = current
+            seen = self._file_versions.get(fname)
+            if version is not None:
+                self._file_versions[fname] = version
+        if seen is not None and version is not None and seen != (version - 1 if written else version):
+            self.block_cache.invalidate(previous | current)
         else:
-            channel = grpc.insecure_channel(f"{host}:{port}")
-        # wait for the channel to be ready with timeout of 10 seconds
-        try:
-            grpc.channel_ready_future(channel).result(timeout=10)
-        except grpc.FutureTimeoutError:
-            raise Exception("Connection to Minion timed out")
-        return minion_pb2_grpc.MinionServiceStub(channel)
+            self.block_cache.invalidate(previous - current)
+
+    def _forget_blocks(self, fname, blocks=()):
+        """Evict the blocks of ``fname`` (and of everything below it) from the cache"""
+        stale = {block.block_uuid for block in blocks}
+        prefix = fname.rstrip("/") + "/"
+        with self._file_blocks_lock:
+            for path in [p for p in self._file_blocks if p == fname or p.startswith(prefix)]:
+                stale |= self._file_blocks.pop(path)
+                self._file_versions.pop(path, None)
+        self.block_cache.invalidate(stale)
+
+    def cache_stats(self):
+        stats = self.block_cache.stats()
+        stats.update(attr_hits=self.attr_cache.hits, attr_misses=self.attr_cache.misses)
+        return stats
+
+    def _invalidate_attrs(self, *paths, tree=False):
+        """Forget cached attributes of paths (and their parents) changed by this client"""
+        for path in paths:
+            if tree:
+                self.attr_cache.invalidate_tree(path)
+            self.attr_cache.invalidate(path, os.path.dirname(path))
 
     def _list_files(self, path="/"):
         yield from self.master_stub.getListOfFiles(master_pb2.Location(path=path)).files
 
     def create(self, fname, mode):
+        self._forget_sizes(str(fname))
         request = master_pb2.Location(path=str(fname), mode=mode)
         response = self.master_stub.create(request)
+        self._invalidate_attrs(fname)
         return response
 
     def getattr(self, fname, fh):
         request = master_pb2.GetFileTableEntryRequest(fname=fname)
         response = self.master_stub.getFileTableEntry(request)
+        if response.attrs:
+            self._saw_size(fname, json.loads(response.attrs).get("st_size", 0))
         return response.attrs
 
+    def stat(self, fname):
+        """Attributes of ``fname`` as a dict, None if it does not exist; briefly cached"""
+        found, attrs = self.attr_cache.get(fname)
+        if found:
+            return attrs
+        raw = self.getattr(fname, None)
+        attrs = json.loads(raw) if raw else None
+        self.attr_cache.put(fname, attrs)
+        return attrs
+
     def getxattr(self, path, name, position=0):
         ...     # TODO
 
@@ -69,65 +201,154 @@ class DeedsClient:
     def rename(self, old, new):
         request = master_pb2.RenameRequest(src=str(old), dest=str(new))
         response = self.master_stub.rename(request)
+        self._forget_sizes(str(old), str(new))
+        self._invalidate_attrs(old, new, tree=True)
+        prefix = old.rstrip("/") + "/"
+        for handle in list(self.fd_map.values()):
+            if handle.path == old or handle.path.startswith(prefix):
+                handle.path = new + handle.path[len(old):]
+        with self._file_blocks_lock:
+            # Blocks keep their uuids across a rename, so cached data stays valid
+            for path in [p for p in self._file_blocks if p == old or p.startswith(prefix)]:
+                self._file_blocks[new + path[len(old):]] = self._file_blocks.pop(path)
+                if path in self._file_versions:
+                    self._file_versions[new + path[len(old):]] = self._file_versions.pop(path)
         return response
 
+    def _new_handle(self, handle):
+        with self._fd_lock:
+            self.fdid += 1
+            self.fd_map[self.fdid] = handle
+            return self.fdid
+
     def open(self, fname, flags):
-        """ What is this?: Open a file, meaning create a file handle, in our case, a file table entry """
-        file_details = master_pb2.OpenRequest(fname=fname, flags=flags)
-        response = self.master_stub.open(file_details)
-        self.fdid += 1
-        self.fd_map[self.fdid] = response
-        print(f"Opened file {fname} with file handle {self.fdid}")
-        return self.fdid
+        """Open a file handle holding a lease on the file's block map, so reads skip the master"""
+        handle = OpenFile(path=fname, flags=flags, blocks=[])
+        self._renew(handle)
+        fh = self._new_handle(handle)
+        print(f"Opened file {fname} with file handle {fh}")
+        return fh
+
+    def attach(self, fname, flags=0):
+        """File handle for a file this client just created; its lease is taken on first read"""
+        return self._new_handle(OpenFile(path=fname, flags=flags, blocks=[]))
+
+    def _renew(self, handle):
+        lease = self.master_stub.open(master_pb2.OpenRequest(fname=handle.path, flags=handle.flags))
+        if self._block_size is None:
+            self._block_size = lease.block_size
+        handle.renew(lease)
+        self._track_blocks(handle.path, handle.blocks, lease.version)
+
+    def _blocks_for_read(self, path, fh):
+        """Block map for a read: the handle's lease while it is valid, otherwise the master's"""
+        handle = self.fd_map.get(fh)
+        if handle is None:
+            read_response = self.master_stub.read(master_pb2.ReadRequest(fname=path))
+            self._track_blocks(path, read_response.blocks, read_response.version)
+            return read_response.blocks
+        if time.monotonic() >= handle.lease_expires:
+            self._renew(handle)
+        return handle.blocks
 
     def read(self, path, size, offset, fh):
-        """Stream the output from chunks, considering offset and size"""
-        read_request = master_pb2.ReadRequest(fname=path)
-        read_response = self.master_stub.read(read_request)
-        block_size = self.master_stub.getBlockSize(master_pb2.Empty()).size
-        bytes_read = 0
-
-        for block in sorted(read_response.blocks, key=lambda x: x.block_index):
-            if offset >= block_size:
-                offset -= block_size
+        """Read ``size`` bytes at ``offset``, fetching the covered blocks in parallel"""
+        file_blocks = self._blocks_for_read(path, fh)
+        block_size = self.block_size
+        if size <= 0:
+            return b""
+
+        first, last = offset // block_size, (offset + size - 1) // block_size
+        blocks = sorted(file_blocks, key=lambda x: x.block_index)
+        extents = []
+        for block in blocks:
+            if not first <= block.block_index <= last:
                 continue
-
-            minion = NODE_MAP[block.node_id]
-            minion_stub = self._get_minion_stub(minion)
-            get_request = minion_pb2.GetRequest(block_uuid=block.block_uuid)
-            get_response = minion_stub.get(get_request)
-            data = get_response.data[offset:]
-            offset = 0
-
-            while data:
-                chunk = data[:size - bytes_read]
-                yield chunk
-                bytes_read += len(chunk)
-                if bytes_read >= size:
-                    return
-                data = data[len(chunk):]
+            block_start = block.block_index * block_size
+            start = max(offset - block_start, 0)
+            end = min(offset + size - block_start, block_size)
+            # Consecutive blocks start at different replicas, so a read spreads over all of them
+            extents.append((replica_addresses(block, block.block_index), block.block_uuid, start, end))
+
+        ahead = self.readahead.access(fh, offset, size)
+        if ahead is not None:
+            first_ahead, last_ahead = ahead[0] // block_size, (ahead[1] - 1) // block_size
+            self.transfer.prefetch(
+                (replica_addresses(block, block.block_index)[0], block.block_uuid)
+                for block in file_blocks
+                if first_ahead <= block.block_index <= last_ahead
+            )
+        return self.transfer.fetch(extents, blocks[-1].block_uuid if blocks else None)
 
     def write(self, path, data, offset, fh):
-        block_size = self.master_stub.getBlockSize(master_pb2.Empty()).size
-        total_file_size = offset + len(data)
-        write_request = master_pb2.WriteRequest(fname=path, size=total_file_size)
+        return self.write_extents(path, [(offset, data)], fh)
+
+    def write_extents(self, path, extents, fh=None):
+        """Store ``(offset, data)`` extents of one file with a single master write.
+
+        The file is grown to cover every extent but never shrunk, so extents flushed out of
+        order do not truncate data written by an earlier call. A put replaces a whole block,
+        so blocks only partly covered by the extents are merged with their current contents.
+        """
+        block_size = self.block_size
+        end = max(offset + len(data) for offset, data in extents)
+        size_before = self._file_size(path)
+        new_size = max(end, size_before)
+        write_request = master_pb2.WriteRequest(dest=path, size=new_size)
         write_response = self.master_stub.write(write_request)
-        bytes_written = 0
-
-        for block in sorted(write_response.blocks, key=lambda x: x.block_index):
-            if offset >= block_size:
-                offset -= block_size
+        self._saw_size(path, new_size)
+        self._track_blocks(path, write_response.blocks, write_response.version, written=True)
+        # Handles on this file see the new block map without waiting for their lease to run out
+        for handle in list(self.fd_map.values()):
+            if handle.path == path and handle.version < write_response.version:
+                handle.blocks = sorted(write_response.blocks, key=lambda x: x.block_index)
+                handle.version = write_response.version
+        blocks = {block.block_index: block for block in write_response.blocks}
+
+        # Slice the payload per block without copying it; the puts then run in parallel.
+        pieces = {}
+        for offset, data in extents:
+            if not data:
                 continue
-
-            minion = NODE_MAP[block.node_id]
-            minion_stub = self._get_minion_stub(minion)
-            put_request = minion_pb2.PutRequest(block_uuid=block.block_uuid, data=data[:block_size - offset])
-            put_response = minion_stub.put(put_request)
-            data = data[len(put_request.data):]
-            bytes_written += len(put_request.data)
-            offset = 0
-
-        return bytes_written
+            view = memoryview(data)
+            for index in range(offset // block_size, (offset + len(data) - 1) // block_size + 1):
+                block_start = index * block_size
+                start = max(offset - block_start, 0)
+                position = block_start + start - offset
+                pieces.setdefault(index, []).append((start, view[position:position + block_size - start]))
+
+        # Blocks past the old end of file that the extents skip are a hole; they are stored
+        # zero-filled. The old last block is left as it is unless it is written: reads see
+        # zeros past its end (see BlockTransfer.fetch).
+        for index in range((size_before + block_size - 1) // block_size, (new_size - 1) // block_size + 1):
+            pieces.setdefault(index, [])
+
+        uploads = []
+        for index, parts in sorted(pieces.items()):
+            block = blocks[index]
+            existing = max(0, min(block_size, size_before - index * block_size))
+            length = min(block_size, new_size - index * block_size)
+            if len(parts) == 1 and parts[0][0] == 0 and len(parts[0][1]) >= length:
+                data = parts[0][1]
+            else:
+                data = self._merge_block(block, parts, existing, length)
+            uploads.append((index, replica_addresses(block), block.block_uuid, data))
+        try:
+            self.transfer.upload(uploads, write_response.expire_at)
+        finally:
+            self.block_cache.invalidate(block_uuid for _, _, block_uuid, _ in uploads)
+            self.attr_cache.invalidate(path)
+        return sum(len(data) for _, data in extents)
+
+    def _merge_block(self, block, parts, existing, length):
+        """``length`` bytes of ``block``: its first ``existing`` bytes with ``(start, data)`` parts laid over"""
+        merged = bytearray(length)
+        if existing:
+            current = self.transfer.fetch([(replica_addresses(block), block.block_uuid, 0, existing)])
+            merged[:len(current)] = current
+        for start, data in parts:
+            merged[start:start + len(data)] = data
+        return memoryview(merged)
 
     def flush(self, path, fh):
         # Assuming flush is to ensure all data is written to the storage
@@ -147,11 +368,15 @@ class DeedsClient:
     def mkdir(self, path, mode):
         request = master_pb2.Location(path=str(path), mode=mode)
         response = self.master_stub.mkdir(request)
+        self._invalidate_attrs(path)
         return response
 
     def rmdir(self, path):
         request = master_pb2.DeleteRequest(fname=str(path))
         response = self.master_stub.delete(request)
+        self._forget_sizes(str(path))
+        self._forget_blocks(path, response.blocks)
+        self._invalidate_attrs(path, tree=True)
         return response
 
     def truncate(self, fname, length, fh=None):
@@ -160,26 +385,55 @@ class DeedsClient:
     def unlink(self, fname):
         request = master_pb2.DeleteRequest(fname=str(fname))
         response = self.master_stub.delete(request)
+        self._forget_sizes(str(fname))
+        self._forget_blocks(fname, response.blocks)
+        self._invalidate_attrs(fname)
         return response
 
     def release(self, fname, fh):
         print(f"Releasing file {fname} with file handle {fh}")
-        del self.fd_map[fh]
+        self.fd_map.pop(fh, None)
+        self.readahead.forget(fh)
         return 0
 
     def statfs(self, path):
         request = master_pb2.Empty()
         response = self.master_stub.statfs(request)
-        return dict(f_bsize=response.block_size, f_blocks=response.total_blocks, f_bavail=response.free_blocks)
+        return dict(f_bsize=response.block_size, f_frsize=response.block_size,
+                    f_blocks=response.total_blocks, f_bfree=response.free_blocks, f_bavail=response.free_blocks,
+                    f_files=response.total_files + response.free_files, f_ffree=response.free_files,
+                    f_favail=response.free_files)
 
     def reset_expire(self, path, ttl):
         request = master_pb2.Location(path=path, ttl=ttl)
         response = self.master_stub.setExpireTime(request)
+        self.attr_cache.invalidate(path)
         return response
 
+    def expire_tree(self, path, ttl=None, recursive=True, pattern="", default_ttl=None):
+        """Start a master-side job setting the TTL of path and (recursive) everything below it
+        whose name matches pattern; default_ttl also sets the TTL of new entries below path.
+        Returns the master_pb2.ExpireJob, see expire_job for its progress; without ttl no
+        job is started and the job returned is already done"""
+        request = master_pb2.ExpireRequest(path=path, recursive=recursive, pattern=pattern)
+        if ttl is not None:
+            request.ttl = ttl
+        if default_ttl is not None:
+            request.default_ttl = default_ttl
+        job = self.master_stub.setExpireTimes(request)
+        self.attr_cache.invalidate_tree(path)
+        return job
+
+    def expire_job(self, job_id):
+        return self.master_stub.getExpireJob(master_pb2.ExpireJob(job_id=job_id))
+    def expiry_stats(self):
+        """Counters of the master's expiry timers, see master_pb2.ExpiryStats"""
+        response = self.master_stub.getExpiryStats(master_pb2.Empty())
+        return {field.name: getattr(response, field.name) for field in response.DESCRIPTOR.fields}
+
     def test(self):
-        channel = grpc.insecure_channel(target=self.address)
-        master_stub = master_pb2_grpc.MasterServiceStub(channel)
+        """End-to-end smoke test: writes /test.txt, reads it back and lists /. Run by `deedsctl selftest`"""
+        master_stub = self.master_stub
 
         # put a file
         print("Putting a file")
@@ -190,9 +444,8 @@ class DeedsClient:
         print(f"Block size: {block_size}")
         for block in blocks:
             minion = NODE_MAP[block.node_id]
-            minion_stub = self._get_minion_stub(minion)
             put_request = minion_pb2.PutRequest(block_uuid=block.block_uuid, data=b"Hello Tim", minions=[])
-            put_response = minion_stub.put(put_request)
+            put_response = self.minions.call(minion, "put", put_request)
             print(f"Put response: {put_response}")
 
         minions = master_stub.getMinions(master_pb2.Empty()).minions
@@ -211,9 +464,8 @@ class DeedsClient:
         print(f"Read response: {read_response}")
         for block in read_response.blocks:
             minion = NODE_MAP[block.node_id]
-            minion_stub = self._get_minion_stub(minion)
             get_request = minion_pb2.GetRequest(block_uuid=block.block_uuid)
-            get_response = minion_stub.get(get_request)
+            get_response = self.minions.call(minion, "get", get_request)
             print(f"Get response: {get_response}")
 
         # Get the list of files
@@ -5,13 +5,39 @@ import stat
 import sys
 import errno
 import fuse
+import grpc
 import time
 from fuse import FUSE, Operations, FuseOSError, fuse_exit, LoggingMixIn
 
 from .deedsclient import DeedsClient
+from .writeback import WriteBackCache
 
 
 
+# Mount options handed to libfuse. The kernel otherwise revalidates every lookup and
+# attribute with a getattr, splits writes into 4 KiB requests and drops the page cache on
+# every open. Timeouts stay short because files expire; auto_cache re-reads a file only
+# when its mtime or size changed since it was last cached.
+FUSE_OPTIONS = {
+    "attr_timeout": 1.0,
+    "entry_timeout": 1.0,
+    "negative_timeout": 0.5,
+    "big_writes": True,
+    "max_write": 131072,
+    "max_read": 131072,
+    "kernel_cache": False,
+    "auto_cache": True,
+    "max_background": None,
+}
+
+
+def io_errno(error):
+    """errno for a failure to store data: ENOENT only if the file is gone, otherwise EIO"""
+    if isinstance(error, grpc.RpcError) and error.code() == grpc.StatusCode.NOT_FOUND:
+        return errno.ENOENT
+    return errno.EIO
+
+
 def logger_d(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
@@ -28,8 +54,10 @@ class DEEDSFS(LoggingMixIn, Operations):
     def __init__(self):
         address = os.getenv("DEEDS_MASTER_ADDRESS", "localhost:50051")
         self.client = DeedsClient(address)
+        self.writeback = WriteBackCache(self.client)
         self._mountpoint = None
         self._fuse = None
+        self._fuse_options = dict(FUSE_OPTIONS)
         self.follow_symlinks = True
         self.deedfs_fstat_workaround = False
         self.fd = 0
@@ -39,11 +67,14 @@ class DEEDSFS(LoggingMixIn, Operations):
         return self._mountpoint is not None
 
     def _run_fuse(self):
+        # None means "leave it to libfuse"; fusepy would otherwise pass "key=None"
+        options = {key: value for key, value in self._fuse_options.items() if value is not None}
         self._fuse = FUSE(
             self,
             self._mountpoint,
             foreground=True,
             # nothreads=True,
+            **options,
         )
 
     def __call__(self, op, *args):
@@ -52,7 +83,12 @@ class DEEDSFS(LoggingMixIn, Operations):
         f = logger_d(getattr(self, op))
         return f(*args)
 
-    def mount(self, mountpoint):
+    def mount(self, mountpoint, **fuse_options):
+        """Mount at mountpoint; fuse_options override entries of FUSE_OPTIONS"""
+        unknown = set(fuse_options) - set(FUSE_OPTIONS)
+        if unknown:
+            raise ValueError(f"Unknown FUSE options: {', '.join(sorted(unknown))}")
+        self._fuse_options.update(fuse_options)
         self._mountpoint = mountpoint
         # self._fuse_thread = threading.Thread(target=self._run_fuse, daemon=True)
         # self._fuse_thread.start()
@@ -75,17 +111,14 @@ class DEEDSFS(LoggingMixIn, Operations):
         if not self.client:
             self.init(path)
         try:
-            # Placeholder for the logic to get the file's attributes
-            # Simulate getting the file attributes as if from SSH
-            stbuf = self.client.getattr(path, fh)
-
-            # Return a dictionary like the 'stat' struct
-            if stbuf is None:
-                raise FuseOSError(errno.ENOENT)
-            try:
-                return json.loads(stbuf)
-            except json.JSONDecodeError:
+            attrs = self.client.stat(path)
+            if attrs is None:
                 raise FuseOSError(errno.ENOENT)
+            # Copy: the dict is shared with the client's attribute cache
+            attrs = dict(attrs)
+            # Data still sitting in the write-back buffers already counts towards the size
+            attrs["st_size"] = max(attrs.get("st_size", 0), self.writeback.dirty_end(path))
+            return attrs
         except Exception as e:
             print(e)
             print(e.__traceback__)
@@ -112,7 +145,7 @@ class DEEDSFS(LoggingMixIn, Operations):
             # return self.client.create(path, mode)
             response = self.client.create(path, mode)
             if response:
-                return 0
+                return self.client.attach(path, os.O_WRONLY)
             else:
                 return -1
         except Exception as e:
@@ -143,6 +176,7 @@ class DEEDSFS(LoggingMixIn, Operations):
         if not self.client:
             self.init(path)
         try:
+            self.writeback.discard_path(path)
             response = self.client.unlink(path)
             if response:
                 return 0
@@ -174,6 +208,7 @@ class DEEDSFS(LoggingMixIn, Operations):
             self.init(old)
         try:
             response = self.client.rename(old, new)
+            self.writeback.rename(old, new)
             if response:
                 return 0
             else:
@@ -188,7 +223,7 @@ class DEEDSFS(LoggingMixIn, Operations):
         if not self.client:
             self.init(path)
         try:
-            return 0
+            return self.client.open(path, flags)
         except Exception as e:
             print(e)
             raise FuseOSError(errno.ENOENT)
@@ -199,6 +234,8 @@ class DEEDSFS(LoggingMixIn, Operations):
         if not self.client:
             self.init(path)
         try:
+            # Make buffered writes visible before reading the file back
+            self.writeback.flush_path(path)
             r_content = self.client.read(path, size, offset, fh)
             return r_content
         except Exception as e:
@@ -211,10 +248,10 @@ class DEEDSFS(LoggingMixIn, Operations):
         if not self.client:
             self.init(path)
         try:
-            return self.client.write(path, data, offset, fh)
+            return self.writeback.write(fh, path, data, offset)
         except Exception as e:
             print(e)
-            raise FuseOSError(errno.ENOENT)
+            raise FuseOSError(io_errno(e))
 
     def truncate(self, path, length, fh=None):
         if not self.has_mounted or not self.client:
@@ -233,10 +270,27 @@ class DEEDSFS(LoggingMixIn, Operations):
         if not self.client:
             self.init(path)
         try:
-            return self.client.release(path, fh)
+            self.writeback.release(fh)
         except Exception as e:
             print(e)
-            raise FuseOSError(errno.ENOENT)
+            raise FuseOSError(io_errno(e))
+        finally:
+            # The handle is gone even if its last data could not be stored
+            self.client.release(path, fh)
+        return 0
+
+    def flush(self, path, fh):
+        if not self.has_mounted or not self.client:
+            raise fuse.FuseOSError(errno.ENOENT)
+        try:
+            self.writeback.flush(fh)
+            return 0
+        except Exception as e:
+            print(e)
+            raise FuseOSError(errno.EIO)
+
+    def fsync(self, path, datasync, fh):
+        return self.flush(path, fh)
 
     def statfs(self, path):
         if not self.has_mounted or not self.client:
@@ -0,0 +1,61 @@
+""" Sequential-access detection for readahead.
+
+Each open file handle keeps track of where its last read ended. A read that continues
+from there (or lands inside the range already being prefetched) counts as sequential and
+doubles the readahead window, up to a maximum; any other read is random access and turns
+readahead off for the handle until it becomes sequential again.
+"""
+import threading
+
+
+MIN_WINDOW = 128 * 1024
+MAX_WINDOW = 4 * 1024 * 1024
+
+
+class _Stream:
+    def __init__(self):
+        self.next_offset = None
+        self.window = 0
+        self.prefetched_to = 0
+
+
+class Readahead:
+    def __init__(self, min_window=MIN_WINDOW, max_window=MAX_WINDOW):
+        self.min_window = min_window
+        self.max_window = max_window
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    def access(self, fh, offset, size):
+        """Record a read of ``size`` bytes at ``offset`` on ``fh``.
+
+        Returns the ``(start, end)`` byte range to prefetch next, or None.
+        """
+        with self._lock:
+            stream = self._streams.get(fh)
+            if stream is None:
+                stream = self._streams[fh] = _Stream()
+            if stream.next_offset is None:
+                sequential = offset == 0
+            else:
+                sequential = stream.next_offset <= offset <= max(stream.next_offset, stream.prefetched_to)
+            if sequential:
+                stream.window = min(max(stream.window * 2, self.min_window), self.max_window)
+            else:
+                stream.window = 0
+                stream.prefetched_to = 0
+            stream.next_offset = offset + size
+
+            if not stream.window:
+                return None
+            # Top up only once the reader has eaten into half of what is already prefetched,
+            # so the minions see window-sized batches rather than one block per read.
+            if stream.prefetched_to - (offset + size) > stream.window // 2:
+                return None
+            start = max(offset + size, stream.prefetched_to)
+            stream.prefetched_to = start + stream.window
+            return start, stream.prefetched_to
+
+    def forget(self, fh):
+        with self._lock:
+            self._streams.pop(fh, None)
@@ -0,0 +1,245 @@
+""" Parallel block transfers between a DeedsClient and the minions.
+
+Blocks of a file are spread over several minions, so walking them one at a time leaves
+every node but one idle. The engine here fans block requests out over a bounded thread
+pool while capping how many requests each minion has in flight, and hands results back
+in ``block_index`` order. Reads fail fast; uploads keep going and report every block
+that could not be stored.
+
+Blocks are small, so a read asks each minion for all of its blocks in one ``multiGet``
+call (up to ``MULTIGET_BLOCKS`` per call) instead of one ``get`` per block. A block held
+by several minions is read from the next replica when a minion fails, and written to the
+first replica only, which forwards it along the others.
+"""
+import threading
+from collections import deque
+from concurrent import futures
+
+import grpc
+
+import minion_pb2
+
+from .channels import MinionUnavailable
+
+
+MAX_WORKERS = 16
+MINION_WINDOW = 4
+PREFETCH_WORKERS = 4
+MULTIGET_BLOCKS = 64
+
+
+class BlockReadError(Exception):
+    """A minion answered a block request with a ``BlockStatus`` other than ``OK``."""
+
+    def __init__(self, block_uuid, status):
+        self.block_uuid = block_uuid
+        self.status = status
+        super().__init__(f"Block {block_uuid}: {minion_pb2.BlockStatus.Name(status)}")
+
+
+class BlockUploadError(Exception):
+    """Some blocks of an upload failed. ``failures`` maps ``block_index`` to the error."""
+
+    def __init__(self, failures, written):
+        self.failures = failures
+        self.written = written
+        details = ", ".join(f"block {index}: {error}" for index, error in sorted(failures.items()))
+        super().__init__(f"{len(failures)} block(s) failed to upload ({details})")
+
+
+class BlockTransfer:
+    """Bounded fan-out of block RPCs over a ``MinionChannelPool``.
+
+    ``window`` is the number of requests allowed in flight per minion across all callers
+    of this engine, so concurrent FUSE reads share the same budget per node. Blocks found
+    in ``cache`` (a ``BlockCache``) are not fetched again, and ``prefetch`` loads blocks
+    into that cache in the background.
+    """
+
+    def __init__(self, pool, cache=None, max_workers=MAX_WORKERS, window=MINION_WINDOW):
+        self.pool = pool
+        self.cache = cache
+        self.window = window
+        self.executor = futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="deeds-transfer")
+        self._prefetcher = futures.ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="deeds-prefetch")
+        self._prefetching = {}
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def _semaphore(self, address):
+        with self._lock:
+            sem = self._windows.get(address)
+            if sem is None:
+                sem = self._windows[address] = threading.BoundedSemaphore(self.window)
+            return sem
+
+    def _run(self, jobs, work):
+        """Run ``work(job)`` for every ``(address, job)`` pair, honouring per-minion windows.
+
+        Returns the results in the order of ``jobs``. The first failure cancels whatever
+        has not started yet and is re-raised to the caller.
+        """
+        results = [None] * len(jobs)
+        pending = deque(enumerate(jobs))
+        inflight = {}
+
+        def submit(position, address, job, sem):
+            future = self.executor.submit(work, address, job)
+            future.add_done_callback(lambda _: sem.release())
+            inflight[future] = position
+
+        try:
+            while pending or inflight:
+                # Start everything the per-minion windows allow, keeping block order where possible.
+                for _ in range(len(pending)):
+                    position, (address, job) = pending.popleft()
+                    sem = self._semaphore(address)
+                    if sem.acquire(blocking=False):
+                        submit(position, address, job, sem)
+                    else:
+                        pending.append((position, (address, job)))
+                if not inflight:
+                    # Every window we need is held by other callers: wait for the head one.
+                    position, (address, job) = pending.popleft()
+                    sem = self._semaphore(address)
+                    sem.acquire()
+                    submit(position, address, job, sem)
+                done, _ = futures.wait(inflight, return_when=futures.FIRST_COMPLETED)
+                for future in done:
+                    results[inflight.pop(future)] = future.result()
+        except BaseException:
+            for future in inflight:
+                future.cancel()
+            raise
+        return results
+
+    def _get(self, address, block_uuid):
+        return self.pool.call(address, "get", minion_pb2.GetRequest(block_uuid=block_uuid)).data
+
+    def _get_many(self, address, block_uuids):
+        """Data of ``block_uuids`` on ``address``, or the exception that prevented it"""
+        try:
+            responses = self.pool.stream(address, "multiGet", minion_pb2.MultiGetRequest(block_uuids=block_uuids))
+        except (grpc.RpcError, MinionUnavailable) as e:
+            return e
+        for response in responses:
+            if response.status != minion_pb2.OK:
+                return BlockReadError(response.block_uuid, response.status)
+        return [response.data for response in responses]
+
+    def fetch(self, extents, tail=None):
+        """Fetch ``(addresses, block_uuid, start, end)`` extents and return them as one buffer.
+
+        ``addresses`` lists the minions holding the block, preferred first (a single address
+        string works too). ``extents`` must already be sorted by ``block_index``;
+        ``start``/``end`` select the part of each block that belongs to the requested range.
+        ``tail`` is the uuid of the last block of the file, where a block shorter than
+        ``end`` is the end of file. Any other short block (the old last block of a file that
+        grew past it) reads as zeros past its end.
+        """
+        replicas = [[addresses] if isinstance(addresses, str) else list(addresses)
+                    for addresses, _, _, _ in extents]
+        jobs = [(addresses[0], block_uuid) for addresses, (_, block_uuid, _, _) in zip(replicas, extents)]
+        epoch = self.cache.epoch() if self.cache is not None else None
+        blocks = [self.cache.get(block_uuid) if self.cache else None for _, block_uuid in jobs]
+        for position, (_, block_uuid) in enumerate(jobs):
+            prefetching = self._prefetching.get(block_uuid) if blocks[position] is None else None
+            if prefetching is not None:
+                # Already on its way from readahead: wait for it instead of asking twice
+                prefetching.result()
+                blocks[position] = self.cache.peek(block_uuid)
+        missing = [position for position, data in enumerate(blocks) if data is None]
+        while missing:
+            # One multiGet per minion (and per MULTIGET_BLOCKS blocks) for whatever is missing
+            batches = {}
+            for position in missing:
+                address = replicas[position][0]
+                if not batches.get(address) or len(batches[address][-1]) == MULTIGET_BLOCKS:
+                    batches.setdefault(address, []).append([])
+                batches[address][-1].append(position)
+            calls = [(address, batch) for address, address_batches in batches.items() for batch in address_batches]
+            fetched = self._run(
+                [(address, [jobs[position][1] for position in batch]) for address, batch in calls], self._get_many)
+            missing = []
+            for (address, batch), result in zip(calls, fetched):
+                if isinstance(result, Exception):
+                    # Try the next replica of these blocks, give up when there is none
+                    for position in batch:
+                        replicas[position].pop(0)
+                        if not replicas[position]:
+                            raise result
+                        missing.append(position)
+                    print(f"Reading {len(batch)} block(s) from {address} failed, trying other replicas: {result}")
+                    continue
+                for position, data in zip(batch, result):
+                    blocks[position] = data
+                    if self.cache is not None:
+                        self.cache.put(jobs[position][1], data, epoch)
+        return b"".join(
+            memoryview(data)[start:end] if block_uuid == tail or len(data) >= end
+            else bytes(memoryview(data)[start:end]).ljust(end - start, b"\0")
+            for data, (_, block_uuid, start, end) in zip(blocks, extents)
+        )
+
+    def _prefetch_one(self, address, block_uuid, epoch):
+        try:
+            with self._semaphore(address):
+                self.cache.put(block_uuid, self._get(address, block_uuid), epoch)
+        except Exception as e:
+            # Best effort: the read that needs the block will fetch it again
+            print(f"Prefetch of block {block_uuid} failed: {e}")
+        finally:
+            with self._lock:
+                self._prefetching.pop(block_uuid, None)
+
+    def prefetch(self, blocks):
+        """Start loading ``(address, block_uuid)`` pairs into the cache in the background."""
+        if self.cache is None:
+            return
+        epoch = self.cache.epoch()
+        with self._lock:
+            for address, block_uuid in blocks:
+                if block_uuid in self._prefetching or block_uuid in self.cache:
+                    continue
+                self._prefetching[block_uuid] = self._prefetcher.submit(
+                    self._prefetch_one, address, block_uuid, epoch)
+
+    def _put(self, address, job):
+        _, block_uuid, data, chain, expire_at = job
+        minions = [minion_pb2.Minion(host=host, port=int(port))
+                   for host, _, port in (next_address.rpartition(":") for next_address in chain)]
+        try:
+            self.pool.call(address, "put", minion_pb2.PutRequest(block_uuid=block_uuid, data=bytes(data),
+                                                                 minions=minions, expire_at=expire_at))
+        except Exception as e:
+            return e
+        return len(data)
+
+    def upload(self, extents, expire_at=0):
+        """Store ``(block_index, addresses, block_uuid, data)`` extents, N puts in flight.
+
+        Each block is put on ``addresses[0]``, which forwards it along the rest of
+        ``addresses`` before answering; every minion on the way deletes it by itself once
+        ``expire_at`` (the file's deadline, 0 for none) has passed. ``data`` is normally a
+        ``memoryview`` slice of the caller's payload, so nothing is copied until the put for
+        that block is built. Returns the number of bytes stored; raises ``BlockUploadError``
+        naming each failed block if any put did not succeed.
+        """
+        jobs = []
+        for index, addresses, block_uuid, data in extents:
+            addresses = [addresses] if isinstance(addresses, str) else list(addresses)
+            jobs.append((addresses[0], (index, block_uuid, data, addresses[1:], expire_at)))
+        results = self._run(jobs, self._put)
+        failures = {
+            index: result
+            for (index, _, _, _), result in zip(extents, results)
+            if isinstance(result, Exception)
+        }
+        written = sum(result for result in results if not isinstance(result, Exception))
+        if failures:
+            raise BlockUploadError(failures, written)
+        return written
+
+    def close(self):
+        self._prefetcher.shutdown(wait=False, cancel_futures=True)
+        self.executor.shutdown(wait=False, cancel_futures=True)
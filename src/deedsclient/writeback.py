@@ -0,0 +1,218 @@
+""" Write-back buffering for DEEDSFS.
+
+The kernel splits a ``cp`` into thousands of 4-128 KiB ``write`` calls, and each one used
+to cost a master ``write`` RPC plus a put per block. Writes are buffered per open file
+handle instead, merged with adjacent and overlapping writes, and pushed to DEEDS as a few
+large block-aligned extents on ``flush``/``fsync``/``release``, or earlier when a handle
+holds too much data or has held it for too long.
+"""
+import bisect
+import threading
+import time
+
+
+MAX_HANDLE_BYTES = 8 * 1024 * 1024
+MAX_TOTAL_BYTES = 64 * 1024 * 1024
+MAX_AGE = 5.0
+
+
+class WriteBuffer:
+    """Dirty extents of one open file, kept sorted and non-overlapping."""
+
+    def __init__(self, path):
+        self.path = path
+        self.extents = []       # [[offset, bytearray], ...]
+        self.size = 0
+        self.dirty_since = None
+        self.lock = threading.Lock()
+
+    @property
+    def end(self):
+        return self.extents[-1][0] + len(self.extents[-1][1]) if self.extents else 0
+
+    def add(self, offset, data):
+        """Merge ``data`` at ``offset`` into the extents; later writes win on overlap."""
+        end = offset + len(data)
+        if self.dirty_since is None:
+            self.dirty_since = time.monotonic()
+        if self.extents:
+            # Sequential writes land on or right after the last extent: grow it in place
+            # rather than rebuilding the list, which made a long stream of writes quadratic
+            tail_start, tail = self.extents[-1]
+            tail_end = tail_start + len(tail)
+            if tail_start <= offset <= tail_end:
+                tail[offset - tail_start:end - tail_start] = data
+                self.size += len(tail) - (tail_end - tail_start)
+                return
+            if offset > tail_end:
+                self.extents.append([offset, bytearray(data)])
+                self.size += len(data)
+                return
+        touching, rest = [], []
+        for extent in self.extents:
+            overlaps = extent[0] <= end and extent[0] + len(extent[1]) >= offset
+            (touching if overlaps else rest).append(extent)
+        if touching:
+            start = min(offset, touching[0][0])
+            merged = bytearray(max(end, max(s + len(buf) for s, buf in touching)) - start)
+            for s, buf in touching:
+                merged[s - start:s - start + len(buf)] = buf
+            merged[offset - start:end - start] = data
+        else:
+            start, merged = offset, bytearray(data)
+        bisect.insort(rest, [start, merged], key=lambda extent: extent[0])
+        self.extents = rest
+        self.size += len(merged) - sum(len(buf) for _, buf in touching)
+
+    def take(self, block_size=None):
+        """Remove and return the extents to flush.
+
+        With ``block_size`` only whole blocks are taken and each extent's unaligned tail
+        stays buffered, so a stream of writes keeps completing the same block rather than
+        storing it several times in pieces.
+        """
+        if block_size is None:
+            taken, self.extents = self.extents, []
+        else:
+            taken, keep = [], []
+            for start, buf in self.extents:
+                cut = (start + len(buf)) // block_size * block_size
+                if cut <= start:
+                    keep.append([start, buf])
+                    continue
+                taken.append([start, buf[:cut - start]])
+                if cut < start + len(buf):
+                    keep.append([cut, buf[cut - start:]])
+            self.extents = keep
+        self.size = sum(len(buf) for _, buf in self.extents)
+        self.dirty_since = time.monotonic() if self.extents else None
+        return [(start, bytes(buf)) for start, buf in taken]
+
+    def put_back(self, extents, dirty_since):
+        """Undo a ``take`` whose extents could not be stored."""
+        for start, data in extents:
+            self.add(start, data)
+        self.dirty_since = dirty_since
+
+
+class WriteBackCache:
+    """Per-handle write buffers with a memory cap shared by all handles.
+
+    ``client`` is the ``DeedsClient`` used to store flushed extents. A background thread
+    flushes buffers that have been dirty for longer than ``max_age`` seconds. Extents that
+    fail to be stored stay buffered, so a failed background flush is retried and its data
+    is still there for the next ``flush``/``release`` of the handle, which reports the error
+    if storing fails again.
+    """
+
+    def __init__(self, client, max_handle_bytes=MAX_HANDLE_BYTES, max_total_bytes=MAX_TOTAL_BYTES,
+                 max_age=MAX_AGE):
+        self.client = client
+        self.max_handle_bytes = max_handle_bytes
+        self.max_total_bytes = max_total_bytes
+        self.max_age = max_age
+        self.buffers = {}
+        self._lock = threading.Lock()
+        self._flusher = threading.Thread(target=self._flush_aged, name="deeds-writeback", daemon=True)
+        self._flusher.start()
+
+    @property
+    def total_bytes(self):
+        with self._lock:
+            buffers = list(self.buffers.values())
+        return sum(buffer.size for buffer in buffers)
+
+    def _buffer(self, fh, path):
+        with self._lock:
+            buffer = self.buffers.get(fh)
+            if buffer is None:
+                buffer = self.buffers[fh] = WriteBuffer(path)
+            return buffer
+
+    def write(self, fh, path, data, offset):
+        buffer = self._buffer(fh, path)
+        with buffer.lock:
+            buffer.add(offset, data)
+            over_limit = buffer.size >= self.max_handle_bytes
+        if over_limit:
+            self._flush(buffer, aligned=True)
+        if self.total_bytes > self.max_total_bytes:
+            self._shrink()
+        return len(data)
+
+    def _flush(self, buffer, aligned=False):
+        with buffer.lock:
+            dirty_since = buffer.dirty_since
+            extents = buffer.take(self.client.block_size if aligned else None)
+            if extents:
+                try:
+                    self.client.write_extents(buffer.path, extents)
+                except Exception:
+                    buffer.put_back(extents, dirty_since)
+                    raise
+
+    def _shrink(self):
+        """Flush the largest buffers until all handles together fit under the cap."""
+        with self._lock:
+            buffers = sorted(self.buffers.values(), key=lambda buffer: buffer.size, reverse=True)
+        for buffer in buffers:
+            if self.total_bytes <= self.max_total_bytes:
+                return
+            self._flush(buffer)
+
+    def _flush_aged(self):
+        while True:
+            time.sleep(self.max_age / 2)
+            now = time.monotonic()
+            with self._lock:
+                buffers = list(self.buffers.values())
+            for buffer in buffers:
+                if buffer.dirty_since is not None and now - buffer.dirty_since >= self.max_age:
+                    try:
+                        self._flush(buffer, aligned=True)
+                    except Exception as e:
+                        print(f"Background flush of {buffer.path} failed, keeping its data: {e}")
+
+    def flush(self, fh):
+        """Store everything buffered for ``fh``."""
+        with self._lock:
+            buffer = self.buffers.get(fh)
+        if buffer is None:
+            return
+        self._flush(buffer)
+
+    def flush_path(self, path):
+        """Flush every handle open on ``path``, e.g. before the file is read back."""
+        with self._lock:
+            handles = [fh for fh, buffer in self.buffers.items() if buffer.path == path]
+        for fh in handles:
+            self.flush(fh)
+
+    def release(self, fh):
+        try:
+            self.flush(fh)
+        finally:
+            with self._lock:
+                self.buffers.pop(fh, None)
+
+    def discard_path(self, path):
+        """Drop unflushed data of ``path`` because the file itself is gone."""
+        with self._lock:
+            for buffer in self.buffers.values():
+                if buffer.path == path:
+                    with buffer.lock:
+                        buffer.take()
+
+    def rename(self, old, new):
+        """Buffers of ``old`` and of everything below it follow the rename."""
+        prefix = old.rstrip("/") + "/"
+        with self._lock:
+            for buffer in self.buffers.values():
+                if buffer.path == old or buffer.path.startswith(prefix):
+                    buffer.path = new + buffer.path[len(old):]
+
+    def dirty_end(self, path):
+        """End offset of buffered data for ``path``, or 0 when nothing is buffered."""
+        with self._lock:
+            buffers = [buffer for buffer in self.buffers.values() if buffer.path == path]
+        return max((buffer.end for buffer in buffers), default=0)
@@ -1,15 +1,19 @@
-""" Backup server for the control node. This server is responsible for storing the file table and the backup files.
+""" Backup server for the control node.
+
+The master streams its operation log here (see ``control_node.replication``). The backup
+stores the records exactly as framed by the master, next to the latest checkpoint the
+master sent, so the directory has the same layout as the master's own metadata directory
+and a master with an empty disk can be bootstrapped by downloading it.
 
 TODO:
-- Rather than transmitting the entire file table, only transmit the changes to the file table.
 - Implement the backup to DATABASE
 """
 
 import os
-import json
 from pathlib import Path
 import sys
 import signal
+import threading
 import grpc
 import logging
 from concurrent import futures
@@ -17,61 +21,155 @@ from concurrent import futures
 import backup_master_pb2 as backup_pb2
 import backup_master_pb2_grpc as backup_pb2_grpc
 
+from ..control_node.oplog import fsync_dir, list_files, read_raw
+
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 BACKUP_LOCATION = "~/deeds.backup"
+CHUNK_BYTES = 1024 * 1024
 
 
 def set_backup_location(location):
     global BACKUP_LOCATION
     BACKUP_LOCATION = location
-    os.makedirs(Path(BACKUP_LOCATION).parent, exist_ok=True)
+    os.makedirs(BACKUP_LOCATION, exist_ok=True)
     logging.info(f"Base location set to {BACKUP_LOCATION}")
 
 
-# Load the file table from a file if it exists
-def loadFromFile():
-    if os.path.isfile(BACKUP_LOCATION):
-        logging.info("File found")
-        with open(BACKUP_LOCATION, 'r') as f:
-            return json.load(f)
-    logging.info("No file found, starting with an empty file table")
-    return {}
-
-
-# Save the file table to disk
-def saveToFile(file_table):
-    with open(BACKUP_LOCATION, 'w') as my_json:
-        json.dump(file_table, my_json, ensure_ascii=False)
-    logging.info("File table saved to disk")
+class ReplicaStore:
+    """Checkpoint plus log segments of the master, kept in ``directory``."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.seq = 0
+        self._file = None
+        checkpoints = list_files(directory, "checkpoint.")
+        if checkpoints:
+            self.seq = checkpoints[-1][0]
+        segments = list_files(directory, "log.")
+        for first_seq, path in segments:
+            end = 0
+            for seq, _, _, end in read_raw(path):
+                self.seq = max(self.seq, seq)
+            if end < os.path.getsize(path):
+                os.truncate(path, end)
+        self._roll()
+        logging.info(f"Backup holds the master's log up to seq {self.seq}")
+
+    def _roll(self):
+        if self._file is not None:
+            self._file.close()
+        self._file = open(os.path.join(self.directory, f"log.{self.seq + 1:020d}"), "ab")
+        fsync_dir(self.directory)
+
+    def append(self, records):
+        """Store a batch; records must continue right after ``seq`` (repeats are skipped)."""
+        with self.lock:
+            data = []
+            for record in records:
+                if record.seq <= self.seq:
+                    continue
+                if record.seq != self.seq + 1:
+                    raise ValueError(f"Gap in the log: expected seq {self.seq + 1}, got {record.seq}")
+                data.append(record.frame)
+                self.seq = record.seq
+            self._file.write(b"".join(data))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            return self.seq
+
+    def install(self, chunks):
+        """Store a checkpoint and drop what it makes redundant."""
+        with self.lock:
+            name, tmp = None, None
+            for chunk in chunks:
+                if tmp is None:
+                    name = chunk.name
+                    if not name.startswith("checkpoint.") or not name[len("checkpoint."):].isdigit():
+                        raise ValueError(f"Not a checkpoint: {name}")
+                    tmp = open(os.path.join(self.directory, name + ".tmp"), "wb")
+                tmp.write(chunk.data)
+            if tmp is None:
+                raise ValueError("Empty snapshot")
+            tmp.flush()
+            os.fsync(tmp.fileno())
+            tmp.close()
+            os.replace(tmp.name, os.path.join(self.directory, name))
+            checkpoint_seq = int(name[len("checkpoint."):])
+            if checkpoint_seq > self.seq:
+                # Records between our position and the checkpoint will never arrive
+                self.seq = checkpoint_seq
+            self._roll()
+            segments = list_files(self.directory, "log.")
+            for (first_seq, path), (next_first, _) in zip(segments, segments[1:]):
+                if next_first <= checkpoint_seq + 1:
+                    os.remove(path)
+            for seq, path in list_files(self.directory, "checkpoint."):
+                if seq < checkpoint_seq:
+                    os.remove(path)
+            fsync_dir(self.directory)
+            logging.info(f"Checkpoint {checkpoint_seq} installed, log at seq {self.seq}")
+            return self.seq
+
+    def files(self):
+        """The latest checkpoint and every segment after it, as ``FileChunk`` messages."""
+        with self.lock:
+            self._file.flush()
+            paths = [path for _, path in list_files(self.directory, "checkpoint.")[-1:]]
+            paths += [path for _, path in list_files(self.directory, "log.")]
+        for path in paths:
+            with open(path, "rb") as f:
+                while True:
+                    data = f.read(CHUNK_BYTES)
+                    yield backup_pb2.FileChunk(name=os.path.basename(path), data=data)
+                    if len(data) < CHUNK_BYTES:
+                        break
+
+    def close(self):
+        with self.lock:
+            self._file.close()
 
 
 # Signal handler for graceful shutdown
 def int_handler(signal, frame):
-    saveToFile(BackUpServer.file_table)
+    if BackUpServer.store is not None:
+        BackUpServer.store.close()
     logging.info("Gracefully shutting down server")
     sys.exit(0)
 
 
 # BackUpServer class implementing the gRPC service
 class BackUpServer(backup_pb2_grpc.BackUpServiceServicer):
-    file_table = loadFromFile()
+    store = None
+
+    def getPosition(self, request, context):
+        return backup_pb2.Position(seq=self.store.seq)
+
+    def replicate(self, request_iterator, context):
+        for batch in request_iterator:
+            try:
+                seq = self.store.append(batch.records)
+            except ValueError as e:
+                context.abort(grpc.StatusCode.FAILED_PRECONDITION, str(e))
+            yield backup_pb2.Position(seq=seq)
 
-    def getFileTable(self, request, context):
-        file_table_string = json.dumps(self.file_table)
-        logging.info("File table requested")
-        return backup_pb2.FileTable(file_table_json=file_table_string)
+    def installSnapshot(self, request_iterator, context):
+        try:
+            return backup_pb2.Position(seq=self.store.install(request_iterator))
+        except ValueError as e:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
 
-    def updateFileTable(self, request, context):
-        self.file_table = json.loads(request.file_table_json)
-        logging.info("File table updated")
-        return backup_pb2.Empty()
+    def download(self, request, context):
+        logging.info("Master is downloading the backup")
+        yield from self.store.files()
 
 
 # Main function to start the server
 def serve(address):
-    set_backup_location(Path(os.environ.get('DEEDS_BACKUP_LOCATION', BACKUP_LOCATION)).resolve())
+    set_backup_location(Path(os.environ.get('DEEDS_BACKUP_LOCATION', BACKUP_LOCATION)).expanduser().resolve())
+    BackUpServer.store = ReplicaStore(str(BACKUP_LOCATION))
     server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
     backup_pb2_grpc.add_BackUpServiceServicer_to_server(BackUpServer(), server)
     server.add_insecure_port(address)
@@ -1 +1,5 @@
-from .server import serve as control_node_server
+def control_node_server(address):
+    # Imported on demand: namespace/oplog are also used by the backup server, which needs
+    # none of the rest of the master
+    from .server import serve
+    serve(address)
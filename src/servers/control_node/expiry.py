@@ -0,0 +1,280 @@
+""" Expiry timers of the control node.
+
+Every inode with a TTL has an absolute deadline, ``Inode.expire_at``, which the operation
+log and the checkpoints keep with the rest of its attributes. A backend turns the deadlines
+into callbacks: ``arm`` sets or moves the timer of an inode, ``disarm`` drops it, and the
+function given to ``start`` receives the inode numbers that are due, a batch at a time.
+The master removes each batch under its own locks and syncs the log once for all of it.
+
+Two backends, chosen by ``expiry_backend`` in ``GFS.conf``:
+
+- ``wheel`` (the default): a hierarchical timing wheel inside the master. Arming and
+  disarming are O(1) and need no network; once a second the due slot is emptied as a
+  whole. The timers are rebuilt from the namespace at start-up, so they are exactly as
+  durable as the metadata.
+- ``redis``: a key with a TTL per inode in Redis and its keyspace notifications (the
+  server must run with ``notify-keyspace-events Ex``). Notifications are best effort and
+  come one key at a time.
+
+An operation that refreshes several timers at once (a create re-arms every directory above
+the new entry) hands them over with one ``arm_many`` call: one lock round for the wheel,
+one pipelined round trip for Redis. ``stats`` counts the timers refreshed that way, the
+refreshes the master left out because the timer was already armed within its refresh
+window, and the calls they would otherwise have cost.
+
+The master does not rely on the timers to hide expired entries: lookups compare the
+deadline themselves and treat an entry past it as absent (see ``Namespace.expired``). They
+report such entries with ``overdue``, which makes sure the timer fires on the next tick,
+so a backend that is late or lost a timer only delays reclaiming the space.
+"""
+import logging
+import threading
+import time
+
+
+WHEEL = "wheel"
+REDIS = "redis"
+# Slots per level and levels of the wheel: 64 ** 4 one-second ticks is about 194 days,
+# later deadlines wait on the last level until they come within range
+WHEEL_SLOTS = 64
+WHEEL_LEVELS = 4
+# Expired inodes handed to the master per call
+BATCH = 1024
+
+
+class Backend:
+    """Counters shared by the backends."""
+
+    def __init__(self):
+        self.expired = 0            # timers fired so far
+        self.calls = 0              # arm_many calls
+        self.refreshed = 0          # timers armed by them
+        self.coalesced = 0          # refreshes left out by the master
+
+    def overdue(self, ino, deadline):
+        """A lookup found ``ino`` past its ``deadline``: have it reclaimed right away."""
+        self.arm(ino, deadline)
+
+    def _count(self, timers, coalesced):
+        self.calls += 1
+        self.refreshed += len(timers)
+        self.coalesced += coalesced
+
+    def stats(self):
+        return {
+            "expired": self.expired,
+            "refresh_calls": self.calls,
+            "refreshed": self.refreshed,
+            "coalesced": self.coalesced,
+            # Refreshes that did not need a call of their own
+            "calls_saved": self.refreshed + self.coalesced - self.calls,
+        }
+
+
+class TimingWheel(Backend):
+    """Hierarchical timing wheel with one-second ticks.
+
+    Level ``l`` has ``slots`` slots of ``slots ** l`` ticks each. A timer goes to the lowest
+    level whose span covers its deadline, and moves one level down whenever the wheel turns
+    onto its slot, until it reaches level 0 and expires with the rest of its slot.
+    """
+
+    def __init__(self, slots=WHEEL_SLOTS, levels=WHEEL_LEVELS, batch=BATCH):
+        super().__init__()
+        self.slots = slots
+        self.levels = levels
+        self.batch = batch
+        self.lag = 0                # seconds the last tick ran behind its deadline
+        self._wheel = [[{} for _ in range(slots)] for _ in range(levels)]
+        self._where = {}            # ino -> (level, slot)
+        self._now = int(time.time())     # last tick processed
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._callback = None
+        self._thread = threading.Thread(target=self._run, name="expiry", daemon=True)
+
+    def __len__(self):
+        return len(self._where)
+
+    def start(self, callback):
+        self._callback = callback
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def load(self, timers):
+        """Arm ``(ino, deadline)`` pairs, as found in the namespace at start-up."""
+        with self._lock:
+            for ino, deadline in timers:
+                self._place(ino, deadline)
+
+    def arm(self, ino, deadline):
+        """(Re)arm the timer of ``ino`` for ``deadline`` (epoch seconds); None disarms it."""
+        with self._lock:
+            self._remove(ino)
+            if deadline is not None:
+                self._place(ino, deadline)
+
+    def arm_many(self, timers, coalesced=0):
+        """Re-arm ``(ino, deadline)`` pairs, all under one lock round; None disarms."""
+        with self._lock:
+            for ino, deadline in timers:
+                if deadline is None:
+                    self._remove(ino)
+                else:
+                    self._place(ino, deadline)
+        self._count(timers, coalesced)
+
+    def disarm(self, ino):
+        with self._lock:
+            self._remove(ino)
+
+    def stats(self):
+        stats = super().stats()
+        stats.update(timers=len(self), lag=self.lag)
+        return stats
+
+    def _remove(self, ino):
+        where = self._where.pop(ino, None)
+        if where is not None:
+            level, slot = where
+            del self._wheel[level][slot][ino]
+
+    def _place(self, ino, deadline, cascading=False):
+        """File a timer; called with the lock held. Deadlines already passed fire on the next
+        tick, or on this one for timers cascading down while it is processed."""
+        self._remove(ino)
+        due = max(deadline, self._now if cascading else self._now + 1)
+        delta = due - self._now
+        level, span = 0, 1
+        while delta >= span * self.slots and level < self.levels - 1:
+            level += 1
+            span *= self.slots
+        if delta >= span * self.slots:
+            # Beyond the wheel: park it in the farthest slot, it is filed again from there
+            due = self._now + span * self.slots - 1
+        slot = (due // span) % self.slots
+        self._wheel[level][slot][ino] = deadline
+        self._where[ino] = (level, slot)
+
+    def advance(self, now):
+        """Turn the wheel up to ``now``; returns the inodes that expired on the way."""
+        expired = []
+        with self._lock:
+            while self._now < now:
+                self._now += 1
+                # Higher levels first: their timers may land in the slots cascaded below
+                span = self.slots ** (self.levels - 1)
+                for level in range(self.levels - 1, 0, -1):
+                    if self._now % span == 0:
+                        timers = self._wheel[level][(self._now // span) % self.slots]
+                        self._wheel[level][(self._now // span) % self.slots] = {}
+                        for ino, deadline in timers.items():
+                            del self._where[ino]
+                            self._place(ino, deadline, cascading=True)
+                    span //= self.slots
+                slot = self._now % self.slots
+                timers, self._wheel[0][slot] = self._wheel[0][slot], {}
+                for ino, deadline in timers.items():
+                    del self._where[ino]
+                    self.lag = self._now - deadline
+                expired.extend(timers)
+        self.expired += len(expired)
+        return expired
+
+    def _run(self):
+        while not self._stop.wait(1 - time.time() % 1):
+            expired = self.advance(int(time.time()))
+            for start in range(0, len(expired), self.batch):
+                try:
+                    self._callback(expired[start:start + self.batch])
+                except Exception as e:
+                    logging.error(f"Expiring {len(expired[start:start + self.batch])} inodes failed: {e}")
+
+
+def expire_key(ino):
+    """Redis key of the expiry timer of an inode; inode numbers survive renames, paths do not"""
+    return f"ino:{ino}"
+
+
+class RedisExpiry(Backend):
+    """Expiry timers kept as Redis keys, fired by Redis keyspace notifications."""
+
+    def __init__(self, host="redis", port=6379):
+        import redis
+        super().__init__()
+        self.redis_conn = redis.Redis(host=host, port=port, db=0)
+        self.pubsub = None
+        self._worker = None
+        self._callback = None
+        self._overdue = set()       # inodes re-armed by lookups, until their key expires
+
+    def start(self, callback):
+        self._callback = callback
+        self.pubsub = self.redis_conn.pubsub()
+        self.pubsub.psubscribe(**{"__keyevent@0__:expired": self.event_handler})
+        self._worker = self.pubsub.run_in_thread(sleep_time=0.01)
+        return self
+
+    def stop(self):
+        if self._worker is not None:
+            self._worker.stop()
+
+    def event_handler(self, message):
+        try:
+            key = message["data"].decode("utf-8")
+            if not key.startswith("ino:"):
+                return
+            ino = int(key[len("ino:"):])
+            self._overdue.discard(ino)
+            self.expired += 1
+            self._callback([ino])
+        except Exception as e:
+            logging.error(f"Error processing message: {e}")
+
+    def load(self, timers):
+        # Keys lost by Redis (or never written) are set again from the metadata
+        pipe = self.redis_conn.pipeline(transaction=False)
+        now = int(time.time())
+        for ino, deadline in timers:
+            pipe.setex(expire_key(ino), max(1, deadline - now), 1)
+        pipe.execute()
+
+    def arm(self, ino, deadline):
+        if deadline is None:
+            self.redis_conn.delete(expire_key(ino))
+        else:
+            self.redis_conn.setex(expire_key(ino), max(1, deadline - int(time.time())), 1)
+
+    def arm_many(self, timers, coalesced=0):
+        """Re-arm ``(ino, deadline)`` pairs in one pipelined round trip; None disarms."""
+        pipe = self.redis_conn.pipeline(transaction=False)
+        now = int(time.time())
+        for ino, deadline in timers:
+            if deadline is None:
+                pipe.delete(expire_key(ino))
+            else:
+                pipe.setex(expire_key(ino), max(1, deadline - now), 1)
+        pipe.execute()
+        self._count(timers, coalesced)
+
+    def overdue(self, ino, deadline):
+        # Lookups of an expired entry keep coming until it is gone; one command is enough
+        if ino not in self._overdue:
+            self._overdue.add(ino)
+            self.arm(ino, deadline)
+
+    def disarm(self, ino):
+        self._overdue.discard(ino)
+        self.redis_conn.delete(expire_key(ino))
+
+
+def make_backend(name, batch=BATCH):
+    """The expiry backend called ``name`` in the configuration."""
+    if name == WHEEL:
+        return TimingWheel(batch=batch)
+    if name == REDIS:
+        return RedisExpiry()
+    raise ValueError(f"Unknown expiry backend {name!r}")
@@ -0,0 +1,140 @@
+""" Garbage collection of the blocks of deleted files.
+
+Unlinking, truncating or replacing a file only changes metadata: the blocks it loses are
+queued per minion in ``Namespace.garbage``, which the operation log and the checkpoints
+keep along with the tree. The collector thread takes a batch of a minion's garbage at a
+time, deletes it there with one ``deleteBlocks`` call and logs a ``COLLECT`` record for what the minion
+confirmed, so a restarted master carries on where it stopped. Deleting a block twice is
+harmless; a block the minion does not have counts as collected.
+
+A minion that fails is retried with exponential backoff while the others go on. When the
+reachable minions fall far behind, ``throttle`` briefly holds the callers that produce
+garbage, so the queue cannot grow without bounds.
+"""
+import itertools
+import logging
+import threading
+import time
+
+import grpc
+
+import minion_pb2
+import minion_pb2_grpc
+
+from . import oplog
+
+
+BATCH_BLOCKS = 256
+MAX_PENDING = 100000
+INTERVAL = 5
+RPC_TIMEOUT = 10
+BACKOFF_MAX = 60
+THROTTLE_TIMEOUT = 1
+
+
+class GarbageCollector:
+    """Background deletion of ``namespace.garbage`` on the ``minions`` (id -> address)."""
+
+    def __init__(self, namespace, log, minions, batch_blocks=BATCH_BLOCKS, max_pending=MAX_PENDING):
+        self.namespace = namespace
+        self.log = log
+        self.minions = minions
+        self.batch_blocks = batch_blocks
+        self.max_pending = max_pending
+        self.collected = 0
+        self._channels = {}
+        self._failures = {}     # node id -> (failures in a row, retry at)
+        self._cond = threading.Condition()
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name="gc", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+
+    def pending(self, reachable=False):
+        """Queued blocks, optionally only those of minions that are not backing off."""
+        with self.namespace.mutex:
+            return sum(len(pending) for node_id, pending in self.namespace.garbage.items()
+                       if not reachable or node_id not in self._failures)
+
+    def throttle(self, timeout=THROTTLE_TIMEOUT):
+        """Wake the collector; holds the caller for up to ``timeout`` seconds while the backlog
+        of reachable minions is over ``max_pending``."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._cond.notify_all()
+            while not self._stop and self.pending(reachable=True) > self.max_pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logging.warning("Block garbage collection is behind, %d blocks queued", self.pending())
+                    return
+                self._cond.wait(remaining)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._stop:
+                    return
+            worked = False
+            for node_id in list(self.namespace.garbage):
+                retry_at = self._failures.get(node_id, (0, 0))[1]
+                if retry_at <= time.monotonic():
+                    worked |= self._collect(node_id)
+            if not worked:
+                with self._cond:
+                    if not self._stop:
+                        self._cond.wait(INTERVAL)
+
+    def _collect(self, node_id):
+        """Delete one batch of the garbage on ``node_id``; False if there was nothing to do."""
+        with self.namespace.mutex:
+            batch = list(itertools.islice(self.namespace.garbage.get(node_id, ()), self.batch_blocks))
+        if not batch:
+            return False
+        try:
+            # The records that made these blocks garbage must be on disk before the blocks go
+            self.log.sync()
+            done = self._delete(node_id, batch)
+        except (grpc.RpcError, KeyError, oplog.LogError) as e:
+            failures = self._failures.get(node_id, (0, 0))[0] + 1
+            delay = min(BACKOFF_MAX, 2 ** failures)
+            self._failures[node_id] = (failures, time.monotonic() + delay)
+            self._channels.pop(node_id, None)
+            logging.error("Deleting %d blocks on minion %s failed, retrying in %ds: %r",
+                          len(batch), node_id, delay, e)
+            return False
+        if not done:
+            return False
+        self._failures.pop(node_id, None)
+        self.log.append(oplog.COLLECT, node_id, oplog.pack_uuids(done))
+        self.namespace.collected(node_id, done)
+        self.collected += len(done)
+        logging.info("Collected %d blocks on minion %s", len(done), node_id)
+        with self._cond:
+            self._cond.notify_all()
+        return True
+
+    def _stub(self, node_id):
+        channel = self._channels.get(node_id)
+        if channel is None:
+            channel = self._channels[node_id] = grpc.insecure_channel(self.minions[node_id])
+        return minion_pb2_grpc.MinionServiceStub(channel)
+
+    def _delete(self, node_id, batch):
+        """Delete ``batch`` on ``node_id``; returns the uuids that are gone from the minion."""
+        response = self._stub(node_id).deleteBlocks(minion_pb2.DeleteBlocksRequest(block_uuids=batch),
+                                                    timeout=RPC_TIMEOUT)
+        done = []
+        for result in response.results:
+            # A block that is not there was deleted before, it is done as well
+            if result.status in (minion_pb2.OK, minion_pb2.NOT_FOUND):
+                done.append(result.block_uuid)
+            else:
+                logging.warning("Minion %s could not delete block %s: %s", node_id, result.block_uuid, result.error)
+        return done
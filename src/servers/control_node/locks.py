@@ -0,0 +1,109 @@
+""" Namespace locking of the control node.
+
+Follows the GFS master: every operation takes read locks on the directories above the
+paths it touches and a read or write lock on the paths themselves. A write lock on a path
+is exclusive, so two creates of the same name serialize, while creates of different names
+in one directory only share read locks on the parent and run side by side. A directory
+cannot be deleted or renamed while anything below it is in use, since that needs a write
+lock on the directory itself.
+
+Locks are always acquired in one global order (shallower paths first, then by name), which
+is what keeps a rename, the only operation that locks two leaves, free of deadlocks.
+"""
+import threading
+from contextlib import contextmanager
+
+from .namespace import normalize, split
+
+
+class RWLock:
+    """Many readers or one writer. Waiting writers block new readers, so they do not starve."""
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    def acquire_read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+
+    def release_write(self):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+
+class LockManager:
+    """Path -> ``RWLock`` table; locks exist only while somebody holds or waits for them."""
+
+    def __init__(self):
+        self._locks = {}        # path -> [RWLock, users]
+        self._mutex = threading.Lock()
+
+    def _get(self, path):
+        with self._mutex:
+            entry = self._locks.get(path)
+            if entry is None:
+                entry = self._locks[path] = [RWLock(), 0]
+            entry[1] += 1
+            return entry[0]
+
+    def _put(self, path):
+        with self._mutex:
+            entry = self._locks[path]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[path]
+
+    @staticmethod
+    def plan(reads=(), writes=()):
+        """Sorted ``[(path, exclusive)]`` for the given leaves and all of their ancestors."""
+        wanted = {}
+        for path, exclusive in [(p, False) for p in reads] + [(p, True) for p in writes]:
+            names = split(path)
+            for depth in range(len(names)):
+                wanted.setdefault("/" + "/".join(names[:depth]), False)
+            leaf = normalize(path)
+            wanted[leaf] = wanted.get(leaf, False) or exclusive
+        return sorted(wanted.items(), key=lambda item: (len(split(item[0])), item[0]))
+
+    @contextmanager
+    def locked(self, reads=(), writes=()):
+        """Hold read locks on ``reads`` and write locks on ``writes`` (plus ancestors)."""
+        held = []
+        try:
+            for path, exclusive in self.plan(reads, writes):
+                lock = self._get(path)
+                try:
+                    lock.acquire_write() if exclusive else lock.acquire_read()
+                except BaseException:
+                    self._put(path)
+                    raise
+                held.append((path, lock, exclusive))
+            yield
+        finally:
+            for path, lock, exclusive in reversed(held):
+                lock.release_write() if exclusive else lock.release_read()
+                self._put(path)
+
+    def __len__(self):
+        with self._mutex:
+            return len(self._locks)
@@ -0,0 +1,474 @@
+""" Inode based namespace of the control node.
+
+Every file and directory is an ``Inode`` with a number that stays the same for its whole
+life, and every directory maps the names of its children to their inodes. Paths only
+exist at the edges: they are resolved one component at a time, and resolved paths are
+cached so a hot lookup costs one dict hit however large the tree is. Renaming a
+directory re-links a single inode; everything below it moves along.
+
+The master keeps the whole tree in RAM, so records are kept small: inodes are slotted
+objects holding their attributes as plain fields, names are interned, and a file's block
+map is a ``BlockMap`` of packed 16-byte uuids and 4-byte replica set numbers rather than
+a list of string tuples.
+
+Blocks a file loses (unlink, truncate, replacement by a rename) are not freed on the spot:
+they are listed per minion in ``Namespace.garbage`` until the garbage collector has
+deleted them there.
+"""
+import stat
+import sys
+import threading
+import uuid
+from array import array
+from time import time
+
+
+ROOT_INO = 1
+MAX_CACHED_PATHS = 1 << 20
+
+
+def split(path):
+    return [name for name in path.split("/") if name]
+
+
+def normalize(path):
+    return "/" + "/".join(split(path))
+
+
+def join_replicas(replica_sets):
+    """``[("A", "B"), ("C",)]`` -> ``"A+B,C"``, the form block placements are logged in."""
+    return ",".join("+".join(replicas) for replicas in replica_sets)
+
+
+def split_replicas(text):
+    """Inverse of ``join_replicas``; a plain ``"A,B"`` is one replica per block."""
+    return [tuple(replicas.split("+")) for replicas in text.split(",")] if text else []
+
+
+def blocks_of(inodes):
+    """All blocks of the files among ``inodes``."""
+    for inode in inodes:
+        if inode.blocks is not None:
+            yield from inode.blocks
+
+
+def reaped(inodes, now, nodes=()):
+    """Blocks of the ``inodes`` an expiry at ``now`` removed that are left to the garbage
+    collector: all those of files whose own deadline has not passed, and the copies on
+    ``nodes`` of the others. The minions delete the blocks of due files by themselves, having
+    been given the deadline with each block, except ``nodes``: those that send the master no
+    block inventory, and so get no TTL changes and run no reclaimer."""
+    for inode in inodes:
+        if inode.blocks is None:
+            continue
+        if inode.expire_at is None or inode.expire_at > now:
+            yield from inode.blocks
+        elif nodes:
+            for block_uuid, replicas, _ in inode.blocks:
+                replicas = tuple(node_id for node_id in replicas if node_id in nodes)
+                if replicas:
+                    yield block_uuid, replicas
+
+
+class NodeIds:
+    """Interning table between replica sets (tuples of minion ids such as ``("A", "C")``,
+    primary first) and small integers.
+
+    Lookups of known sets take no lock. New sets are added under ``_lock``, since the master
+    serves requests from a thread pool, and two sets given the same number would send
+    blocks to the wrong minions.
+    """
+
+    def __init__(self):
+        self.names = []
+        self.numbers = {}
+        self._lock = threading.Lock()
+
+    def number(self, replicas):
+        replicas = (replicas,) if isinstance(replicas, str) else tuple(replicas)
+        number = self.numbers.get(replicas)
+        if number is None:
+            with self._lock:
+                number = self.numbers.get(replicas)
+                if number is None:
+                    # The name goes in first: readers that find the number can look it up
+                    self.names.append(replicas)
+                    number = self.numbers[replicas] = len(self.names) - 1
+        return number
+
+
+NODE_IDS = NodeIds()
+
+
+class BlockMap:
+    """Blocks of one file in ``block_index`` order.
+
+    Stored as two packed columns, the uuids in a bytearray of 16-byte records and the
+    replica sets as ``NODE_IDS`` numbers in an ``array('I')``. Iterating yields
+    ``(block_uuid, replicas, block_index)`` tuples, ``replicas`` being a tuple of minion ids
+    with the primary first.
+    """
+
+    __slots__ = ("uuids", "nodes")
+
+    def __init__(self, blocks=()):
+        self.uuids = bytearray()
+        self.nodes = array("I")
+        for block_uuid, replicas, *_ in blocks:
+            self.append(block_uuid, replicas)
+
+    @classmethod
+    def from_packed(cls, uuids, replica_sets):
+        blocks = cls()
+        blocks.extend_packed(uuids, replica_sets)
+        return blocks
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.nodes)
+        if not 0 <= index < len(self.nodes):
+            raise IndexError(index)
+        block_uuid = str(uuid.UUID(bytes=bytes(self.uuids[index * 16:index * 16 + 16])))
+        return block_uuid, NODE_IDS.names[self.nodes[index]], index
+
+    def __iter__(self):
+        for index in range(len(self.nodes)):
+            yield self[index]
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def append(self, block_uuid, replicas):
+        """``replicas`` is a tuple of minion ids, or a single id."""
+        self.uuids += uuid.UUID(block_uuid).bytes
+        self.nodes.append(NODE_IDS.number(replicas))
+
+    def packed(self, start=0):
+        """Blocks from ``start`` on as ``(uuid bytes, [replicas, ...])``, see ``extend_packed``."""
+        return bytes(self.uuids[start * 16:]), [NODE_IDS.names[n] for n in self.nodes[start:]]
+
+    def extend_packed(self, uuids, replica_sets):
+        self.uuids += uuids
+        self.nodes.extend(NODE_IDS.number(replicas) for replicas in replica_sets)
+
+    def truncate(self, num):
+        """Keep the first ``num`` blocks; returns the dropped ones."""
+        dropped = [self[index] for index in range(num, len(self.nodes))]
+        del self.uuids[num * 16:]
+        del self.nodes[num:]
+        return dropped
+
+
+class Inode:
+    __slots__ = ("ino", "parent", "name", "mode", "nlink", "size", "atime", "mtime", "ctime",
+                 "expire_at", "version", "blocks", "children")
+
+    def __init__(self, ino, parent, name, mode, now):
+        self.ino = ino
+        self.parent = parent
+        self.name = sys.intern(name)
+        self.mode = mode
+        self.nlink = 2 if stat.S_ISDIR(mode) else 1
+        self.size = 0
+        self.atime = self.mtime = self.ctime = now
+        self.expire_at = None
+        # Bumped on every change of the block map, so leases handed out by open go stale
+        self.version = 0
+        if stat.S_ISDIR(mode):
+            self.blocks = None
+            self.children = {}
+        else:
+            self.blocks = BlockMap()
+            self.children = None
+
+    @property
+    def is_dir(self):
+        return self.children is not None
+
+    def attrs(self, block_size=0):
+        """The attribute dict handed to clients, ``st_*`` keys as in ``os.stat``."""
+        return {
+            "st_mode": self.mode,
+            "st_nlink": self.nlink,
+            "st_uid": 0,
+            "st_gid": 0,
+            "st_size": self.size,
+            "st_atime": self.atime,
+            "st_mtime": self.mtime,
+            "st_ctime": self.ctime,
+            "st_blocks": len(self.blocks) if self.blocks is not None else 0,
+            "st_blksize": block_size if self.blocks else 0,
+            "st_ino": self.ino,
+            "st_dev": 0,
+            "expire_at": self.expire_at,
+            "version": self.version,
+        }
+
+
+class Namespace:
+    """The file system tree: ``inodes`` maps inode numbers to ``Inode`` objects.
+
+    Mutating methods return ``None`` when the operation is not possible (missing parent,
+    name already taken, ...) rather than raising, like the rest of ``MasterService.Master``.
+    They hold ``mutex`` only while they relink inodes; keeping callers of different paths
+    apart is the job of the ``LockManager``.
+
+    ``files``, ``directories``, ``used_blocks`` and ``used_bytes`` are kept up to date by
+    every mutation, so usage can be reported without walking the tree. ``garbage`` maps
+    minion ids to the uuids of dead blocks still stored there, oldest first.
+    ``default_ttls`` maps the few directories that have one to the TTL new entries below
+    them get; it is kept out of ``Inode`` so the other inodes do not pay for it.
+    """
+
+    def __init__(self):
+        self.inodes = {}
+        self.next_ino = ROOT_INO
+        self.mutex = threading.RLock()
+        self.files = 0
+        self.directories = 0
+        self.used_blocks = 0
+        self.used_bytes = 0
+        self.garbage = {}
+        self.default_ttls = {}
+        self._paths = {}
+        self._new(None, "", stat.S_IFDIR | 0o755, int(time()))
+
+    @property
+    def root(self):
+        return self.inodes[ROOT_INO]
+
+    def _new(self, parent, name, mode, now, ino=None):
+        if ino is None:
+            ino = self.next_ino
+        self.next_ino = max(self.next_ino, ino + 1)
+        inode = self.inodes[ino] = Inode(ino, parent, name, mode, now)
+        self._count(inode, 1)
+        if parent is not None:
+            self._link(parent, inode, now)
+        return inode
+
+    def _count(self, inode, sign):
+        if inode.is_dir:
+            self.directories += sign
+        else:
+            self.files += sign
+            self.used_blocks += sign * len(inode.blocks)
+            self.used_bytes += sign * inode.size
+
+    def _link(self, parent, inode, now):
+        inode.parent = parent
+        parent.children[inode.name] = inode
+        if inode.is_dir:
+            parent.nlink += 1
+        parent.mtime = parent.ctime = now
+
+    def _unlink(self, inode, now):
+        parent = inode.parent
+        del parent.children[inode.name]
+        if inode.is_dir:
+            parent.nlink -= 1
+        parent.mtime = parent.ctime = now
+
+    def _forget(self, path, inode):
+        """Drop cached resolutions that may point at or below ``inode``."""
+        if inode.is_dir:
+            self._paths.clear()
+        else:
+            self._paths.pop(path, None)
+
+    def resolve(self, path):
+        path = normalize(path)
+        inode = self._paths.get(path)
+        if inode is not None:
+            return inode
+        inode = self.root
+        for name in split(path):
+            if inode.children is None:
+                return None
+            inode = inode.children.get(name)
+            if inode is None:
+                return None
+        if len(self._paths) >= MAX_CACHED_PATHS:
+            self._paths.clear()
+        self._paths[path] = inode
+        return inode
+
+    def _parent_of(self, path):
+        """Directory inode that would hold ``path`` and the entry name, or ``(None, name)``."""
+        path = normalize(path)
+        parent_path, _, name = path.rpartition("/")
+        parent = self.resolve(parent_path)
+        if parent is None or not parent.is_dir or not name:
+            return None, name
+        return parent, name
+
+    def path_of(self, inode):
+        names = []
+        while inode.parent is not None:
+            names.append(inode.name)
+            inode = inode.parent
+        return "/" + "/".join(reversed(names))
+
+    def expired(self, inode, now):
+        """The outermost entry at or above ``inode`` whose deadline has passed, or ``None``.
+        Such an entry and everything below it are as good as gone, whether or not its
+        expiry timer has fired yet."""
+        found = None
+        while inode is not None:
+            if inode.expire_at is not None and inode.expire_at <= now:
+                found = inode
+            inode = inode.parent
+        return found
+
+    def set_default_ttl(self, ino, ttl):
+        """TTL of new entries below directory ``ino``; ``None`` to inherit it again."""
+        with self.mutex:
+            if ttl is None:
+                self.default_ttls.pop(ino, None)
+            elif ino in self.inodes:
+                self.default_ttls[ino] = ttl
+
+    def default_ttl(self, inode):
+        """The default TTL of the nearest directory above ``inode`` that has one, or ``None``."""
+        if not self.default_ttls:
+            return None
+        inode = inode.parent
+        while inode is not None:
+            ttl = self.default_ttls.get(inode.ino)
+            if ttl is not None:
+                return ttl
+            inode = inode.parent
+        return None
+
+    def ancestors(self, inode):
+        """Parent directories of ``inode``, nearest first, excluding the root."""
+        inode = inode.parent
+        while inode is not None and inode.ino != ROOT_INO:
+            yield inode
+            inode = inode.parent
+
+    def mkdir(self, path, mode=0o755, now=None, ino=None):
+        return self._make(path, stat.S_IFDIR | stat.S_IMODE(mode), now, ino)
+
+    def create(self, path, mode=0o644, now=None, ino=None):
+        return self._make(path, stat.S_IFREG | stat.S_IMODE(mode), now, ino)
+
+    def _make(self, path, mode, now, ino):
+        """``ino`` is only passed when replaying, to recreate the inode under its old number."""
+        with self.mutex:
+            parent, name = self._parent_of(path)
+            if parent is None or name in parent.children:
+                return None
+            return self._new(parent, name, mode, int(time()) if now is None else now, ino)
+
+    def remove(self, path, now=None):
+        """Unlink ``path`` and everything below it; returns the removed inodes or ``None``."""
+        with self.mutex:
+            inode = self.resolve(path)
+            if inode is None or inode.parent is None:
+                return None
+            self._unlink(inode, int(time()) if now is None else now)
+            self._forget(normalize(path), inode)
+            removed, stack = [], [inode]
+            while stack:
+                node = stack.pop()
+                removed.append(node)
+                del self.inodes[node.ino]
+                self.default_ttls.pop(node.ino, None)
+                self._count(node, -1)
+                if node.children:
+                    stack.extend(node.children.values())
+        return removed
+
+    def rename(self, src, dest, now=None):
+        """Move ``src`` to ``dest``, replacing a file or empty directory already there.
+
+        Returns ``(inode, replaced)`` where ``replaced`` lists the inodes that were at
+        ``dest`` before, or ``None`` when the rename is not possible.
+        """
+        now = int(time()) if now is None else now
+        with self.mutex:
+            inode = self.resolve(src)
+            parent, name = self._parent_of(dest)
+            if inode is None or inode.parent is None or parent is None:
+                return None
+            # A directory cannot be moved below itself
+            ancestor = parent
+            while ancestor is not None:
+                if ancestor is inode:
+                    return None
+                ancestor = ancestor.parent
+            replaced = []
+            existing = parent.children.get(name)
+            if existing is inode:
+                return inode, replaced
+            if existing is not None:
+                if existing.is_dir != inode.is_dir or existing.children:
+                    return None
+                replaced = self.remove(dest, now)
+            self._unlink(inode, now)
+            self._forget(normalize(src), inode)
+            inode.name = sys.intern(name)
+            self._link(parent, inode, now)
+            inode.ctime = now
+            return inode, replaced
+
+    def written(self, inode, size, mtime, blocks_before):
+        """Account for a write that left ``inode.blocks`` changed from ``blocks_before`` blocks."""
+        with self.mutex:
+            self.used_blocks += len(inode.blocks) - blocks_before
+            self.used_bytes += size - inode.size
+            inode.size = size
+            inode.mtime = mtime
+            inode.version += 1
+
+    def discard(self, blocks):
+        """Queue ``(block_uuid, replicas, ...)`` blocks no file refers to any more for deletion
+        on each of their replicas."""
+        with self.mutex:
+            for block_uuid, replicas, *_ in blocks:
+                for node_id in replicas:
+                    self.garbage.setdefault(node_id, {})[block_uuid] = None
+
+    def collected(self, node_id, block_uuids):
+        """Forget garbage that was deleted from minion ``node_id``."""
+        with self.mutex:
+            pending = self.garbage.get(node_id, {})
+            for block_uuid in block_uuids:
+                pending.pop(block_uuid, None)
+            if not pending:
+                self.garbage.pop(node_id, None)
+
+    def walk(self):
+        """Every inode, parents before their children. Callers that run next to mutations
+        hold ``mutex`` while iterating."""
+        stack = [self.root]
+        while stack:
+            inode = stack.pop()
+            yield inode
+            if inode.children:
+                stack.extend(inode.children.values())
+
+    @classmethod
+    def restore(cls, records, next_ino):
+        """Rebuild a tree from ``(ino, parent_ino, name, mode, nlink, size, atime, mtime, ctime,
+        expire_at, version, blocks)`` records, parents first; ``blocks`` is a ``BlockMap``."""
+        namespace = cls()
+        namespace.inodes.clear()
+        namespace.directories = 0
+        for ino, parent_ino, name, mode, nlink, size, atime, mtime, ctime, expire_at, version, blocks \
+                in records:
+            parent = namespace.inodes.get(parent_ino)
+            inode = namespace.inodes[ino] = Inode(ino, parent, name, mode, ctime)
+            inode.nlink, inode.size, inode.atime, inode.mtime = nlink, size, atime, mtime
+            inode.expire_at, inode.version = expire_at, version
+            if inode.blocks is not None:
+                inode.blocks = blocks
+            namespace._count(inode, 1)
+            if parent is not None:
+                parent.children[inode.name] = inode
+        namespace.next_ino = next_ino
+        return namespace
@@ -0,0 +1,258 @@
+""" Live state of the storage nodes, fed by their heartbeats.
+
+Every minion sends a heartbeat every few seconds with its capacity, its load and the
+blocks it stored or deleted since the previous one. A node that has not been heard from
+for ``dead_after`` seconds is marked dead: placement stops choosing it and its capacity
+no longer counts in statfs.
+
+The registry also keeps each node's block inventory. After a master restart it asks the
+nodes for a full report, and from then on applies their deltas. Every
+``reconcile_interval`` seconds (and after each full report) the inventory is compared
+with the block maps of the namespace:
+
+- blocks a node stores that no file refers to are orphans. They are handed back to the
+  node to delete, but only when they were orphans on the previous pass as well, so that
+  a block which is being written while its file is allocated is never mistaken for one;
+- blocks the namespace places on a node that does not have them are missing replicas,
+  which are counted and logged.
+
+The namespace is walked ``batch`` inodes at a time, holding its mutex only for one batch,
+so a reconciliation does not stall metadata operations for a whole tree walk. Entries
+moved from the part not yet walked into the part already walked are missed, and their
+blocks look like orphans for one pass, which the two-pass rule above absorbs.
+
+The answers to the heartbeats also carry new deadlines for blocks whose file's TTL
+changed, which the nodes enforce by themselves (see ``storage_node.reclaim``). A batch of
+deadlines is numbered and sent with every answer until a heartbeat acknowledges that
+number, so an answer lost to a timeout loses no TTL extension; deadlines queued meanwhile
+wait for the next batch, which keeps them in order. After a full report the node is sent
+the deadlines of all its blocks again (0 for the blocks without one), since whatever was
+queued for it before may have been lost with a master restart or while it was away. Both
+are queued under the namespace mutex, along with the change they come from, so a resend
+never overtakes a newer deadline.
+"""
+import itertools
+import logging
+import threading
+import time
+
+
+DEAD_AFTER = 30
+RECONCILE_INTERVAL = 300
+# Stale uuids and block deadlines handed to a node per heartbeat response
+STALE_PER_HEARTBEAT = 10000
+DEADLINES_PER_HEARTBEAT = 10000
+# Inodes visited per hold of the namespace mutex while reconciling
+RECONCILE_BATCH = 4096
+
+
+def usable_bytes(sizes, replication):
+    """File bytes that fit in ``sizes`` (bytes per node) when every block is stored on
+    ``replication`` distinct nodes, or on all of them when there are fewer.
+
+    Besides dividing by the number of copies, no node can hold more than one copy of a
+    block: after setting aside the ``j`` largest nodes, the others still have to take
+    ``replication - j`` copies of every block.
+    """
+    sizes = sorted(sizes, reverse=True)
+    width = min(replication, len(sizes))
+    if not width:
+        return 0
+    rest = sum(sizes)
+    usable = rest // width
+    for j in range(1, width):
+        rest -= sizes[j - 1]
+        usable = min(usable, rest // (width - j))
+    return usable
+
+
+class NodeState:
+    __slots__ = ("node_id", "total_bytes", "free_bytes", "inflight", "latency", "last_seen", "alive",
+                 "inventory", "report", "suspects", "stale", "missing", "deadlines", "sent", "sent_seq",
+                 "resend")
+
+    def __init__(self, node_id):
+        self.node_id = node_id
+        self.total_bytes = self.free_bytes = self.inflight = 0
+        self.latency = 0.0
+        self.last_seen = 0.0
+        self.alive = False
+        self.inventory = None       # set of block uuids once a full report arrived
+        self.report = None          # full report being received
+        self.suspects = set()       # orphans of the last reconciliation
+        self.stale = []             # orphans waiting to be sent to the node
+        self.missing = 0
+        self.deadlines = {}         # block uuid -> new deadline (0 for none) to send
+        self.sent = {}              # the batch sent until the node acknowledges sent_seq
+        self.sent_seq = 0
+        self.resend = False         # send the deadlines of all blocks at the next reconciliation
+
+
+class NodeRegistry:
+    """Heartbeat bookkeeping for the ``minions`` (id -> address) of the master.
+
+    ``totals`` is what fits in files on the live nodes, each block taking ``replication``
+    copies.
+    """
+
+    def __init__(self, namespace, minions, dead_after=DEAD_AFTER, reconcile_interval=RECONCILE_INTERVAL,
+                 replication=1, batch=RECONCILE_BATCH):
+        self.namespace = namespace
+        self.minions = minions
+        self.dead_after = dead_after
+        self.reconcile_interval = reconcile_interval
+        self.replication = replication
+        self.batch = batch
+        self.totals = (0, 0)        # (total_bytes, free_bytes) over the live nodes
+        self.stats = {}             # live node id -> (total_bytes, free_bytes, latency, inflight)
+        self.nodes = {node_id: NodeState(node_id) for node_id in minions}
+        # Deadline batch numbers; starting from the clock, they do not repeat after a restart
+        self._seq = itertools.count(time.time_ns())
+        self._lock = threading.Lock()
+        self._reconcile = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="nodes", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def heartbeat(self, beat):
+        """Record ``beat`` (a ``Heartbeat``); returns ``(send_full_report, stale, deadlines,
+        deadlines_seq)``, or None for a node the master does not know."""
+        with self._lock:
+            node = self.nodes.get(beat.node_id)
+            if node is None:
+                return None
+            if not node.alive:
+                logging.info(f"Minion {node.node_id} is alive")
+            node.total_bytes, node.free_bytes = beat.total_bytes, beat.free_bytes
+            node.inflight, node.latency = beat.inflight, beat.latency
+            node.last_seen = time.monotonic()
+            node.alive = True
+            if beat.full_report:
+                if node.report is None or beat.page == 0:
+                    node.report = set()
+                node.report.update(beat.added)
+                if beat.last_page:
+                    node.inventory, node.report = node.report, None
+                    node.suspects = set()
+                    node.resend = True
+                    self._reconcile.set()
+            elif node.inventory is not None:
+                node.inventory.update(beat.added)
+                node.inventory.difference_update(beat.removed)
+            stale, node.stale = node.stale[:STALE_PER_HEARTBEAT], node.stale[STALE_PER_HEARTBEAT:]
+            if node.sent and beat.deadlines_ack == node.sent_seq:
+                node.sent = {}
+            if not node.sent and node.deadlines:
+                node.sent = dict(itertools.islice(node.deadlines.items(), DEADLINES_PER_HEARTBEAT))
+                for block_uuid in node.sent:
+                    del node.deadlines[block_uuid]
+                node.sent_seq = next(self._seq)
+            deadlines = list(node.sent.items())
+            deadlines_seq = node.sent_seq if deadlines else 0
+            send_full_report = node.inventory is None and node.report is None
+            self._publish()
+        return send_full_report, stale, deadlines, deadlines_seq
+
+    def unreported(self):
+        """Ids of the nodes without a block inventory: those that send no heartbeats, and
+        those given up for dead that have not reported again"""
+        with self._lock:
+            return sorted(node.node_id for node in self.nodes.values() if node.inventory is None)
+
+    def push_deadlines(self, blocks, expire_at):
+        """Have the nodes holding ``blocks`` (``(uuid, replicas, index)``) expire them at
+        ``expire_at`` (None for never)."""
+        with self._lock:
+            for block_uuid, replicas, _ in blocks:
+                for node_id in replicas:
+                    node = self.nodes.get(node_id)
+                    if node is not None:
+                        node.deadlines[block_uuid] = expire_at or 0
+
+    def _publish(self):
+        """Recompute the snapshots read by placement and statfs; called with the lock held"""
+        stats = {node.node_id: (node.total_bytes, node.free_bytes, node.latency, node.inflight)
+                 for node in self.nodes.values() if node.alive}
+        self.stats = stats
+        self.totals = (usable_bytes((s[0] for s in stats.values()), self.replication),
+                       usable_bytes((s[1] for s in stats.values()), self.replication))
+
+    def _run(self):
+        last_reconcile = time.monotonic()
+        while True:
+            self._reconcile.wait(min(self.dead_after, self.reconcile_interval) / 2)
+            now = time.monotonic()
+            with self._lock:
+                for node in self.nodes.values():
+                    if node.alive and now - node.last_seen > self.dead_after:
+                        logging.warning(f"Minion {node.node_id} missed its heartbeats, marking it dead")
+                        node.alive = False
+                        # Whatever happened while it was away is unknown: start over with a full report
+                        node.inventory = node.report = None
+                        node.deadlines, node.sent = {}, {}
+                self._publish()
+            if self._reconcile.is_set() or now - last_reconcile >= self.reconcile_interval:
+                self._reconcile.clear()
+                last_reconcile = now
+                try:
+                    self.reconcile()
+                except Exception as e:
+                    logging.error(f"Reconciling block inventories failed: {e}")
+
+    def reconcile(self):
+        """Compare every known inventory with the namespace, see the module docstring."""
+        with self._lock:
+            inventories = {node.node_id: set(node.inventory) for node in self.nodes.values()
+                           if node.inventory is not None}
+            resend = {node_id for node_id in inventories if self.nodes[node_id].resend}
+            for node_id in resend:
+                self.nodes[node_id].resend = False
+        if not inventories:
+            return
+        expected = {node_id: set() for node_id in inventories}
+        stack = [self.namespace.root]
+        while stack:
+            with self.namespace.mutex:
+                deadlines = self._reconcile_batch(stack, expected, resend)
+                if deadlines:
+                    # Still under the namespace mutex, so no newer deadline pushed meanwhile is overwritten
+                    with self._lock:
+                        for node_id, items in deadlines.items():
+                            self.nodes[node_id].deadlines.update(items)
+                if not stack:
+                    garbage = {node_id: set(self.namespace.garbage.get(node_id, ())) for node_id in inventories}
+        with self._lock:
+            for node_id, inventory in inventories.items():
+                node = self.nodes[node_id]
+                orphans = inventory - expected[node_id] - garbage[node_id]
+                confirmed = orphans & node.suspects
+                node.suspects = orphans - confirmed
+                node.stale.extend(confirmed - set(node.stale))
+                node.missing = len(expected[node_id] - inventory)
+                if confirmed or node.missing:
+                    logging.warning(f"Minion {node_id}: {len(confirmed)} orphaned blocks to delete, "
+                                    f"{node.missing} blocks missing")
+
+    def _reconcile_batch(self, stack, expected, resend):
+        """Walk up to ``batch`` inodes from ``stack``, adding their blocks to ``expected``;
+        returns the deadlines of the blocks on the ``resend`` nodes. Called under the
+        namespace mutex."""
+        deadlines = {}
+        for _ in range(self.batch):
+            if not stack:
+                break
+            inode = stack.pop()
+            if self.namespace.inodes.get(inode.ino) is not inode:
+                # Removed since it was queued
+                continue
+            if inode.children:
+                stack.extend(inode.children.values())
+            for block_uuid, replicas, _ in inode.blocks or ():
+                for node_id in replicas:
+                    if node_id in expected:
+                        expected[node_id].add(block_uuid)
+                    if node_id in resend:
+                        deadlines.setdefault(node_id, {})[block_uuid] = inode.expire_at or 0
+        return deadlines
@@ -0,0 +1,429 @@
+""" Write-ahead operation log and checkpoints of the control node.
+
+Every metadata mutation is appended to the log before the client gets its answer. Records
+are small binary frames::
+
+    [payload length u32][crc32 u32][seq u64][opcode u8][payload]
+
+and carry everything needed to redo the operation exactly (inode numbers, timestamps,
+block uuids), so replaying them rebuilds the same tree. Appends from all RPC threads are
+gathered by one writer thread and made durable with a single ``fsync`` per batch (group
+commit).
+
+The log is split into segments named after their first sequence number. Every
+``checkpoint_every`` records the writer starts a new segment and a background thread folds
+the finished segments into a new checkpoint, by replaying them on top of the previous
+checkpoint in a separate namespace; the live tree is never paused. Recovery loads the
+newest checkpoint and replays the segments after it, so restart time follows the change
+rate since the last checkpoint, not the size of the namespace.
+
+Dead blocks are part of the state too: replaying a remove, rename or truncating write
+queues the blocks it dropped in ``Namespace.garbage`` (an expiry, ``REAP``, only those of
+files that were not due themselves, plus all of them on the minions the record names), a
+``COLLECT`` record takes them off
+again once a minion deleted them, and checkpoints store what is still queued. Directory
+default TTLs are stored the same way, as ``DEFAULT_TTL`` records after the inodes.
+"""
+import logging
+import os
+import struct
+import threading
+import uuid
+import zlib
+
+from .namespace import BlockMap, Namespace, blocks_of, join_replicas, reaped, split_replicas
+
+
+CHECKPOINT_EVERY = 100000
+
+MKDIR, CREATE, WRITE, REMOVE, RENAME, EXPIRE, INODE, COLLECT, GARBAGE, DEFAULT_TTL, REAP = range(1, 12)
+# Garbage uuids stored per checkpoint record
+GARBAGE_RECORD_BLOCKS = 4096
+
+HEADER = struct.Struct("<IIQB")
+CHECKPOINT_MAGIC = b"DEEDSCK1"
+CHECKPOINT_HEADER = struct.Struct("<8sQQ")
+INT = struct.Struct("<q")
+LEN = struct.Struct("<I")
+
+
+class LogError(Exception):
+    """The log could not be written; the mutation it belongs to is not durable."""
+
+
+def encode(fields):
+    """Pack a tuple of ``None``/int/str/bytes values into a record payload."""
+    out = bytearray()
+    for value in fields:
+        if value is None:
+            out += b"n"
+        elif isinstance(value, int):
+            out += b"i" + INT.pack(value)
+        elif isinstance(value, str):
+            data = value.encode()
+            out += b"s" + LEN.pack(len(data)) + data
+        else:
+            out += b"b" + LEN.pack(len(value)) + value
+    return bytes(out)
+
+
+def decode(payload):
+    fields, pos = [], 0
+    while pos < len(payload):
+        tag = payload[pos:pos + 1]
+        pos += 1
+        if tag == b"n":
+            fields.append(None)
+        elif tag == b"i":
+            fields.append(INT.unpack_from(payload, pos)[0])
+            pos += INT.size
+        else:
+            (length,) = LEN.unpack_from(payload, pos)
+            pos += LEN.size
+            data = payload[pos:pos + length]
+            fields.append(data.decode() if tag == b"s" else bytes(data))
+            pos += length
+    return fields
+
+
+def pack_uuids(block_uuids):
+    return b"".join(uuid.UUID(block_uuid).bytes for block_uuid in block_uuids)
+
+
+def unpack_uuids(data):
+    return [str(uuid.UUID(bytes=data[pos:pos + 16])) for pos in range(0, len(data), 16)]
+
+
+def frame(seq, opcode, payload):
+    body = struct.pack("<QB", seq, opcode) + payload
+    return HEADER.pack(len(payload), zlib.crc32(body), seq, opcode) + payload
+
+
+def read_raw(path, offset=0):
+    """Yield ``(seq, opcode, frame, end_offset)`` from ``offset`` on, until the end of the
+    file or a torn frame."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    pos = 0
+    while pos + HEADER.size <= len(data):
+        length, crc, seq, opcode = HEADER.unpack_from(data, pos)
+        end = pos + HEADER.size + length
+        payload = data[pos + HEADER.size:end]
+        if end > len(data) or zlib.crc32(struct.pack("<QB", seq, opcode) + payload) != crc:
+            return
+        yield seq, opcode, data[pos:end], offset + end
+        pos = end
+
+
+def read_frames(path):
+    """Yield ``(seq, opcode, fields, end_offset)`` until the end of the file or a torn frame."""
+    for seq, opcode, raw, end in read_raw(path):
+        yield seq, opcode, decode(raw[HEADER.size:]), end
+
+
+def list_files(directory, prefix):
+    """``[(seq, path)]`` of the ``<prefix><seq>`` files in ``directory``, oldest first."""
+    return sorted(
+        (int(name[len(prefix):]), os.path.join(directory, name))
+        for name in os.listdir(directory)
+        if name.startswith(prefix) and name[len(prefix):].isdigit()
+    )
+
+
+def apply(namespace, opcode, fields):
+    """Redo one logged operation on ``namespace``."""
+    if opcode in (MKDIR, CREATE):
+        ino, path, mode, now = fields
+        make = namespace.mkdir if opcode == MKDIR else namespace.create
+        make(path, mode, now, ino=ino)
+    elif opcode == WRITE:
+        ino, size, mtime, keep, uuids, replicas = fields
+        inode = namespace.inodes[ino]
+        before = len(inode.blocks)
+        namespace.discard(inode.blocks.truncate(keep))
+        inode.blocks.extend_packed(uuids, split_replicas(replicas))
+        namespace.written(inode, size, mtime, before)
+    elif opcode == REMOVE:
+        path, now = fields
+        removed = namespace.remove(path, now)
+        if removed is not None:
+            namespace.discard(blocks_of(removed))
+    elif opcode == REAP:
+        path, now, nodes = fields
+        removed = namespace.remove(path, now)
+        if removed is not None:
+            namespace.discard(reaped(removed, now, nodes.split(",") if nodes else ()))
+    elif opcode == RENAME:
+        src, dest, now = fields
+        moved = namespace.rename(src, dest, now)
+        if moved is not None:
+            namespace.discard(blocks_of(moved[1]))
+    elif opcode == EXPIRE:
+        ino, expire_at = fields
+        inode = namespace.inodes.get(ino)
+        if inode is not None:
+            inode.expire_at = expire_at
+    elif opcode == COLLECT:
+        node_id, uuids = fields
+        namespace.collected(node_id, unpack_uuids(uuids))
+    elif opcode == DEFAULT_TTL:
+        ino, ttl = fields
+        namespace.set_default_ttl(ino, ttl)
+    else:
+        raise LogError(f"Unknown opcode {opcode}")
+
+
+def write_checkpoint(path, namespace, seq):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(CHECKPOINT_HEADER.pack(CHECKPOINT_MAGIC, seq, namespace.next_ino))
+        for inode in namespace.walk():
+            uuids, replicas = inode.blocks.packed() if inode.blocks is not None else (b"", [])
+            f.write(frame(0, INODE, encode((
+                inode.ino, inode.parent.ino if inode.parent else 0, inode.name, inode.mode,
+                inode.nlink, inode.size, inode.atime, inode.mtime, inode.ctime,
+                inode.expire_at, inode.version, uuids, join_replicas(replicas),
+            ))))
+        for node_id, pending in namespace.garbage.items():
+            pending = list(pending)
+            for start in range(0, len(pending), GARBAGE_RECORD_BLOCKS):
+                chunk = pending[start:start + GARBAGE_RECORD_BLOCKS]
+                f.write(frame(0, GARBAGE, encode((node_id, pack_uuids(chunk)))))
+        for ino, ttl in namespace.default_ttls.items():
+            f.write(frame(0, DEFAULT_TTL, encode((ino, ttl))))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    fsync_dir(os.path.dirname(path))
+
+
+def read_checkpoint(path):
+    """``(seq, namespace)`` stored in the checkpoint at ``path``."""
+    with open(path, "rb") as f:
+        magic, seq, next_ino = CHECKPOINT_HEADER.unpack(f.read(CHECKPOINT_HEADER.size))
+    if magic != CHECKPOINT_MAGIC:
+        raise LogError(f"{path} is not a checkpoint")
+    garbage = []
+    default_ttls = []
+
+    def records():
+        with open(path, "rb") as f:
+            f.seek(CHECKPOINT_HEADER.size)
+            data = f.read()
+        pos = 0
+        while pos < len(data):
+            length, crc, frame_seq, opcode = HEADER.unpack_from(data, pos)
+            payload = data[pos + HEADER.size:pos + HEADER.size + length]
+            if zlib.crc32(struct.pack("<QB", frame_seq, opcode) + payload) != crc:
+                raise LogError(f"{path} is corrupt at offset {pos}")
+            pos += HEADER.size + length
+            if opcode == GARBAGE:
+                node_id, uuids = decode(payload)
+                garbage.extend((block_uuid, (node_id,)) for block_uuid in unpack_uuids(uuids))
+                continue
+            if opcode == DEFAULT_TTL:
+                default_ttls.append(decode(payload))
+                continue
+            *attrs, uuids, replicas = decode(payload)
+            yield (*attrs, BlockMap.from_packed(uuids, split_replicas(replicas)))
+
+    namespace = Namespace.restore(records(), next_ino)
+    namespace.discard(garbage)
+    for ino, ttl in default_ttls:
+        namespace.set_default_ttl(ino, ttl)
+    return seq, namespace
+
+
+def fsync_dir(directory):
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class OpLog:
+    """Durable log of namespace mutations in ``directory``.
+
+    ``recover`` must be called once before ``append``. ``append`` only queues the record
+    and returns its sequence number; ``sync`` blocks until that record is on disk. Once
+    ``close`` was called, ``append`` raises ``LogError`` and ``sync`` raises for records
+    that were never written instead of waiting for them.
+    """
+
+    def __init__(self, directory, checkpoint_every=CHECKPOINT_EVERY):
+        self.directory = os.path.expanduser(directory)
+        self.checkpoint_every = checkpoint_every
+        self.last_seq = 0           # last sequence number handed out
+        self.durable_seq = 0        # everything up to here is on disk
+        self.error = None
+        self._pending = []
+        self._since_roll = 0
+        self._file = None
+        self._cond = threading.Condition()
+        self._closing = False
+        self._closed = False
+        self._writer = None
+        self._checkpointer = None
+        # Set whenever new records became durable, for the replicator tailing the segments
+        self.durable = threading.Event()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def segments(self):
+        """``[(first_seq, path)]`` of all log segments, oldest first."""
+        return list_files(self.directory, "log.")
+
+    def checkpoints(self):
+        return list_files(self.directory, "checkpoint.")
+
+    def is_empty(self):
+        """Nothing was ever logged here (segments left by a recovery may exist but are empty)."""
+        return not self.checkpoints() and all(os.path.getsize(path) == 0 for _, path in self.segments())
+
+    def _load_checkpoint(self):
+        for seq, path in reversed(self.checkpoints()):
+            try:
+                return read_checkpoint(path)
+            except (LogError, OSError, struct.error) as e:
+                logging.error("Skipping checkpoint %s: %s", path, e)
+        return 0, Namespace()
+
+    def recover(self):
+        """Rebuild the namespace from disk and open a fresh segment for new records.
+
+        Only the last segment may end in a torn frame, left by a crash in the middle of a
+        write; it is cut off there. A torn frame anywhere else means records after it are
+        lost, and recovery fails with ``LogError`` rather than skip them.
+        """
+        seq, namespace = self._load_checkpoint()
+        replayed = 0
+        segments = self.segments()
+        for position, (_, path) in enumerate(segments):
+            end = 0
+            for record_seq, opcode, fields, end in read_frames(path):
+                if record_seq <= seq:
+                    continue
+                apply(namespace, opcode, fields)
+                seq = record_seq
+                replayed += 1
+            if end < os.path.getsize(path):
+                if position < len(segments) - 1:
+                    raise LogError(f"{path} is corrupt at offset {end}, and later segments depend on it")
+                logging.warning("Truncating torn tail of %s at offset %d", path, end)
+                os.truncate(path, end)
+        logging.info("Recovered namespace at seq %d, %d records replayed", seq, replayed)
+        self.last_seq = self.durable_seq = seq
+        self._open_segment(seq + 1)
+        self._writer = threading.Thread(target=self._write_loop, name="oplog-writer", daemon=True)
+        self._writer.start()
+        return namespace
+
+    def _open_segment(self, first_seq):
+        if self._file is not None:
+            self._file.close()
+        self._file = open(os.path.join(self.directory, f"log.{first_seq:020d}"), "ab")
+        fsync_dir(self.directory)
+        self._since_roll = 0
+
+    def append(self, opcode, *fields):
+        payload = encode(fields)
+        with self._cond:
+            if self.error is not None:
+                raise LogError(f"Operation log is unusable: {self.error}")
+            if self._closing:
+                raise LogError("Operation log is closed")
+            self.last_seq += 1
+            self._pending.append(frame(self.last_seq, opcode, payload))
+            self._cond.notify_all()
+            return self.last_seq
+
+    def sync(self, seq=None):
+        """Wait until record ``seq`` (default: everything appended so far) is durable."""
+        with self._cond:
+            seq = self.last_seq if seq is None else seq
+            while self.durable_seq < seq and self.error is None and not self._closed:
+                self._cond.wait()
+            if self.durable_seq < seq:
+                raise LogError(f"Operation log is unusable: {self.error or 'closed'}")
+
+    def _write_loop(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closing:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                batch, self._pending = self._pending, []
+                last = self.last_seq
+            try:
+                self._file.write(b"".join(batch))
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            except OSError as e:
+                logging.error("Writing the operation log failed: %s", e)
+                with self._cond:
+                    self.error = e
+                    self._cond.notify_all()
+                return
+            with self._cond:
+                self.durable_seq = last
+                self._cond.notify_all()
+            self.durable.set()
+            self._since_roll += len(batch)
+            if self._since_roll >= self.checkpoint_every:
+                self.checkpoint()
+
+    def checkpoint(self, wait=False):
+        """Start a new segment and fold the finished ones into a checkpoint in the background.
+
+        Only called from the writer thread or once the writer has stopped.
+        """
+        if self._checkpointer is not None and self._checkpointer.is_alive():
+            return
+        upto = self.durable_seq
+        self._open_segment(upto + 1)
+        self._checkpointer = threading.Thread(target=self._checkpoint, args=(upto,),
+                                              name="oplog-checkpoint", daemon=True)
+        self._checkpointer.start()
+        if wait:
+            self._checkpointer.join()
+
+    def _checkpoint(self, upto):
+        try:
+            seq, shadow = self._load_checkpoint()
+            for first_seq, path in self.segments():
+                if first_seq > upto:
+                    break
+                for record_seq, opcode, fields, _ in read_frames(path):
+                    if seq < record_seq <= upto:
+                        apply(shadow, opcode, fields)
+                        seq = record_seq
+            write_checkpoint(os.path.join(self.directory, f"checkpoint.{upto:020d}"), shadow, upto)
+            # Segments wholly covered by the checkpoint and older checkpoints are not needed any more
+            for first_seq, path in self.segments():
+                if first_seq <= upto:
+                    os.remove(path)
+            for seq, path in self.checkpoints():
+                if seq < upto:
+                    os.remove(path)
+            logging.info("Checkpoint written at seq %d", upto)
+        except Exception as e:
+            logging.error("Checkpoint at seq %d failed: %s", upto, e)
+
+    def close(self):
+        """Write out everything appended so far; the log accepts no records afterwards."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        if self._writer is not None:
+            self._writer.join()
+        with self._cond:
+            # Whatever is not durable now never will be: wake up whoever still waits for it
+            self._closed = True
+            self._cond.notify_all()
+        if self._checkpointer is not None:
+            self._checkpointer.join()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
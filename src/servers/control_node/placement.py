@@ -0,0 +1,111 @@
+""" Block placement of the control node.
+
+Every new block gets ``replication`` distinct minions, the first of which is the primary
+the client writes to (it forwards the data along the rest of the chain). Minions are
+drawn at random, weighted by what their heartbeats (see ``nodes``) last reported:
+
+- their free space (a full or dead minion gets nothing),
+- the requests they are serving, plus the blocks recently placed on them, which are
+  about to be written,
+- their recent request latency,
+
+and, when minions are labelled with a failure domain (a fourth field in
+``chunkServers``, e.g. ``A:storage1:50051:rack1``), the replicas of a block go to as many
+different domains as there are.
+"""
+import bisect
+import logging
+import random
+import threading
+import time
+
+
+# Blocks recently placed on a node that halve its weight, and their half-life in seconds
+LOAD_BLOCKS = 1000
+LOAD_HALF_LIFE = 10
+# Requests in flight on a node that halve its weight
+LOAD_REQUESTS = 16
+# Request latency (seconds) that halves a node's weight
+LATENCY = 0.01
+
+
+class Placement:
+    """Chooses replica sets for new blocks among ``minions`` (id -> address).
+
+    ``domains`` maps node ids to failure domains; ``nodes`` is the ``NodeRegistry`` whose
+    stats weigh the choice (without one every node weighs the same).
+    """
+
+    def __init__(self, minions, replication=1, domains=None, nodes=None):
+        self.minions = minions
+        self.replication = replication
+        self.domains = domains or {}
+        self.nodes = nodes
+        self._load = {}          # node id -> (recent blocks, as of monotonic time)
+        self._lock = threading.Lock()
+
+    def _recent(self, node_id, now):
+        blocks, since = self._load.get(node_id, (0.0, now))
+        return blocks * 0.5 ** ((now - since) / LOAD_HALF_LIFE)
+
+    def weights(self):
+        """``{node_id: weight}`` of the nodes that can take blocks right now."""
+        now = time.monotonic()
+        stats = self.nodes.stats if self.nodes is not None else {}
+        most_free = max((s[1] for s in stats.values()), default=0)
+        weights = {}
+        for node_id in self.minions:
+            weight = 1.0
+            if stats:
+                if node_id not in stats or not most_free:
+                    continue
+                _, free, latency, inflight = stats[node_id]
+                weight = free / most_free / (1 + latency / LATENCY) / (1 + inflight / LOAD_REQUESTS)
+            weight /= 1 + self._recent(node_id, now) / LOAD_BLOCKS
+            if weight > 0:
+                weights[node_id] = weight
+        if not weights:
+            # Nothing reported yet (or everything looks full): fall back to all nodes alike
+            weights = dict.fromkeys(self.minions, 1.0)
+        return weights
+
+    def choose(self, count):
+        """``count`` replica sets, each a tuple of up to ``replication`` distinct node ids."""
+        with self._lock:
+            weights = self.weights()
+            nodes = list(weights)
+            cumulative = []
+            total = 0.0
+            for node_id in nodes:
+                total += weights[node_id]
+                cumulative.append(total)
+            width = min(self.replication, len(nodes))
+            if width < self.replication:
+                logging.warning(f"Only {width} minion(s) available for replication {self.replication}")
+            placements = [self._pick(nodes, cumulative, width) for _ in range(count)]
+            now = time.monotonic()
+            for replicas in placements:
+                for node_id in replicas:
+                    self._load[node_id] = (self._recent(node_id, now) + 1, now)
+            return placements
+
+    def _pick(self, nodes, cumulative, width):
+        """Weighted draw of ``width`` distinct nodes, preferring unused failure domains."""
+        chosen, domains = [], set()
+        attempts = 0
+        while len(chosen) < width:
+            node_id = nodes[min(bisect.bisect(cumulative, random.random() * cumulative[-1]), len(nodes) - 1)]
+            attempts += 1
+            if attempts > 8 * width:
+                # Unlucky draws among a few heavy nodes: take the next free one
+                node_id = next(n for n in nodes if n not in chosen)
+            elif node_id in chosen:
+                continue
+            elif self.domains.get(node_id) in domains and any(
+                    self.domains.get(n) not in domains for n in nodes if n not in chosen):
+                # Another domain is still free for this block
+                continue
+            chosen.append(node_id)
+            if self.domains.get(node_id) is not None:
+                domains.add(self.domains[node_id])
+        return tuple(chosen)
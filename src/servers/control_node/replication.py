@@ -0,0 +1,143 @@
+""" Shipping the master's operation log to the backup server.
+
+The replicator tails the log segments on disk and streams every durable record to the
+backup in sequence-numbered batches. Each session starts by asking the backup how far it
+got, so after a disconnect or a restart of either side shipping resumes right after the
+last record the backup stored. When the records the backup needs have already been folded
+into a checkpoint (or a newer checkpoint exists at all), the checkpoint is sent first.
+"""
+import logging
+import os
+import threading
+
+import grpc
+
+import backup_master_pb2
+import backup_master_pb2_grpc
+
+from .oplog import read_raw
+
+
+BATCH_RECORDS = 1000
+CHUNK_BYTES = 1024 * 1024
+BACKOFF_MAX = 30
+
+
+class Replicator:
+    """Background log shipping from ``log`` (an ``OpLog``) to the backup at ``address``."""
+
+    def __init__(self, log, address, batch_records=BATCH_RECORDS):
+        self.log = log
+        self.address = address
+        self.batch_records = batch_records
+        self.acked_seq = 0
+        self.shipped_checkpoint = -1
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="replicator", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self.log.durable.set()
+
+    def _run(self):
+        failures = 0
+        while not self._stop.is_set():
+            try:
+                with grpc.insecure_channel(self.address) as channel:
+                    self._session(backup_master_pb2_grpc.BackUpServiceStub(channel))
+                failures = 0
+            except Exception as e:
+                # An RPC error, or an OSError reading the log: the thread must outlive both
+                failures += 1
+                delay = min(BACKOFF_MAX, 2 ** failures)
+                logging.error("Replication to %s failed, retrying in %ds: %s", self.address, delay, e)
+                self._stop.wait(delay)
+
+    def _session(self, stub):
+        position = stub.getPosition(backup_master_pb2.Empty()).seq
+        segments = self.log.segments()
+        checkpoints = self.log.checkpoints()
+        if checkpoints:
+            seq, path = checkpoints[-1]
+            # The backup is missing records that only survive inside the checkpoint, or it
+            # can use the newer checkpoint to drop its own old records
+            behind = not segments or position + 1 < segments[0][0]
+            if (behind and position < seq) or seq > self.shipped_checkpoint:
+                position = max(position, stub.installSnapshot(self._chunks(path)).seq)
+                self.shipped_checkpoint = seq
+        logging.info("Replicating to %s from seq %d", self.address, position)
+        for ack in stub.replicate(self._batches(position)):
+            self.acked_seq = ack.seq
+
+    @staticmethod
+    def _chunks(path):
+        name = os.path.basename(path)
+        with open(path, "rb") as f:
+            while True:
+                data = f.read(CHUNK_BYTES)
+                yield backup_master_pb2.FileChunk(name=name, data=data)
+                if len(data) < CHUNK_BYTES:
+                    return
+
+    def _batches(self, position):
+        """Stream records after ``position``; ends when the backup needs a new checkpoint."""
+        path, offset = None, 0
+        while not self._stop.is_set():
+            segments = self.log.segments()
+            if not segments or position + 1 < segments[0][0]:
+                return
+            if path is None:
+                path = [p for first, p in segments if first <= position + 1][-1]
+            self.log.durable.clear()
+            records = []
+            try:
+                for seq, _, frame, end in read_raw(path, offset):
+                    offset = end
+                    if seq > position:
+                        records.append(backup_master_pb2.LogRecord(seq=seq, frame=frame))
+                        position = seq
+                    if len(records) >= self.batch_records:
+                        yield backup_master_pb2.LogBatch(records=records)
+                        records = []
+            except FileNotFoundError:
+                # Folded into a checkpoint under our feet: start over with a snapshot
+                return
+            if records:
+                yield backup_master_pb2.LogBatch(records=records)
+                continue
+            newer = [p for first, p in segments if first > position]
+            if newer and newer[0] != path:
+                # The writer only rolls once the old segment is complete
+                path, offset = newer[0], 0
+                continue
+            if self.log.checkpoints() and self.log.checkpoints()[-1][0] > self.shipped_checkpoint:
+                return
+            self.log.durable.wait(timeout=1)
+
+
+def download(address, directory, timeout=10):
+    """Copy the backup's checkpoint and log into the empty ``directory``; False if unreachable."""
+    files = {}
+    try:
+        with grpc.insecure_channel(address) as channel:
+            grpc.channel_ready_future(channel).result(timeout=timeout)
+            stub = backup_master_pb2_grpc.BackUpServiceStub(channel)
+            for chunk in stub.download(backup_master_pb2.Empty()):
+                if chunk.name not in files:
+                    files[chunk.name] = open(os.path.join(directory, chunk.name + ".tmp"), "wb")
+                files[chunk.name].write(chunk.data)
+    except (grpc.RpcError, grpc.FutureTimeoutError) as e:
+        logging.error("Could not download the backup from %s: %s", address, e)
+        for f in files.values():
+            f.close()
+            os.remove(f.name)
+        return False
+    for name, f in files.items():
+        f.close()
+        os.replace(f.name, os.path.join(directory, name))
+    logging.info("Downloaded %d file(s) from the backup", len(files))
+    return True
@@ -0,0 +1,119 @@
+""" TTL changes over whole subtrees of the control node.
+
+``setExpireTimes`` gives a directory and everything below it a new TTL (optionally only
+the entries whose name matches a glob) in one RPC. The change runs as a background job
+that walks the subtree a batch of entries at a time: per batch it holds the namespace
+mutex once, logs an ``EXPIRE`` record per entry, arms all their timers with one
+``arm_many`` call and waits for the log once. ``getExpireJob`` reports how far a job got.
+
+A job holds a read lock on the root of its subtree, so the root cannot be renamed or
+removed while it runs. Entries created below it in the meantime get their TTL from the
+create (see ``Namespace.default_ttl``) and may or may not be visited.
+"""
+import fnmatch
+import itertools
+import logging
+import threading
+import time
+
+from . import oplog
+from .namespace import ROOT_INO
+
+
+BATCH = 1024
+# Finished jobs remembered for getExpireJob
+KEEP_FINISHED = 100
+
+
+class Job:
+    __slots__ = ("job_id", "path", "ttl", "recursive", "pattern", "scanned", "updated", "done", "error")
+
+    def __init__(self, job_id, path, ttl, recursive, pattern):
+        self.job_id = job_id
+        self.path = path
+        self.ttl = ttl
+        self.recursive = recursive
+        self.pattern = pattern
+        self.scanned = 0
+        self.updated = 0
+        self.done = False
+        self.error = ""
+
+
+class RetentionJobs:
+    """Runs subtree TTL jobs on ``namespace``; ``log`` is the ``OpLog``, ``expiry`` the expiry
+    backend and ``nodes`` the ``NodeRegistry`` that passes new deadlines on to the minions
+    (each may be None)."""
+
+    def __init__(self, namespace, locks, log, expiry, nodes=None, batch=BATCH):
+        self.namespace = namespace
+        self.locks = locks
+        self.log = log
+        self.expiry = expiry
+        self.nodes = nodes
+        self.batch = batch
+        self.jobs = {}              # job id -> Job
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, path, ttl, recursive=True, pattern=""):
+        """Start a job; returns its ``Job``, which is updated as the job goes."""
+        with self._lock:
+            job = Job(next(self._ids), path, ttl, recursive, pattern)
+            self.jobs[job.job_id] = job
+            finished = [job_id for job_id, old in self.jobs.items() if old.done]
+            for job_id in finished[:max(0, len(finished) - KEEP_FINISHED)]:
+                del self.jobs[job_id]
+        threading.Thread(target=self._run, args=(job,), name=f"expire-job-{job.job_id}", daemon=True).start()
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def _run(self, job):
+        try:
+            with self.locks.locked(reads=[job.path]):
+                root = self.namespace.resolve(job.path)
+                if root is None:
+                    job.error = "No such file or directory"
+                    return
+                stack = [root]
+                while stack:
+                    self._step(job, stack)
+            logging.info(f"Expire job {job.job_id} on {job.path}: {job.updated} of {job.scanned} entries updated")
+        except Exception as e:
+            job.error = str(e)
+            logging.error(f"Expire job {job.job_id} on {job.path} failed: {e}")
+        finally:
+            job.done = True
+
+    def _step(self, job, stack):
+        """Visit up to ``batch`` entries from ``stack`` and give the matching ones the new deadline."""
+        deadline = int(time.time()) + job.ttl if job.ttl > 0 else None
+        timers = []
+        with self.namespace.mutex:
+            for _ in range(self.batch):
+                if not stack:
+                    break
+                inode = stack.pop()
+                if self.namespace.inodes.get(inode.ino) is not inode:
+                    # Removed since it was queued
+                    continue
+                job.scanned += 1
+                if job.recursive and inode.children:
+                    stack.extend(inode.children.values())
+                if inode.ino == ROOT_INO or (job.pattern and not fnmatch.fnmatchcase(inode.name, job.pattern)):
+                    continue
+                inode.expire_at = deadline
+                if self.log is not None:
+                    self.log.append(oplog.EXPIRE, inode.ino, deadline)
+                timers.append((inode.ino, deadline))
+                if inode.blocks and self.nodes is not None:
+                    self.nodes.push_deadlines(inode.blocks, deadline)
+        if timers:
+            if self.expiry is not None:
+                self.expiry.arm_many(timers)
+            if self.log is not None:
+                self.log.sync()
+        job.updated += len(timers)
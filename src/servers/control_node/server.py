@@ -1,9 +1,7 @@
 import os
-import stat
 from time import time
 import uuid
 import math
-import random
 import configparser
 import signal
 import sys
@@ -15,19 +13,13 @@ from concurrent import futures
 import master_pb2
 import master_pb2_grpc
 
-import backup_master_pb2
-import backup_master_pb2_grpc
-
-import minion_pb2
-import minion_pb2_grpc
-import redis
-
-
-class SetEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, set):
-            return list(obj)
-        return json.JSONEncoder.default(self, obj)
+from .locks import LockManager
+from .gc import GarbageCollector
+from .namespace import Namespace, ROOT_INO, blocks_of, join_replicas, normalize, reaped
+from .nodes import NodeRegistry
+from .placement import Placement
+from .retention import RetentionJobs
+from . import expiry, gc, nodes, oplog, replication
 
 
 # Configure logging
@@ -35,18 +27,39 @@ logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %
 
 DEEDS_BACKUP_ADDR = os.environ.get("DEEDS_BACKUP_ADDR", "backup:50051")
 TTL = 30
+LEASE_TTL = 10
+# Ancestors whose deadline is less than this many seconds older than a refresh keep it
+REFRESH_WINDOW = 1
+WORKERS = 10
+META_DIR = "~/deeds.meta"
+MAX_FILES = 1 << 32
+
+
+def block_message(block):
+    """master_pb2.Block of a (block_uuid, replicas, block_index) tuple; node_id is the primary"""
+    block_uuid, replicas, block_index = block
+    return master_pb2.Block(block_uuid=block_uuid, node_id=replicas[0], block_index=block_index,
+                            replicas=replicas)
+
+
+def job_message(job):
+    """master_pb2.ExpireJob of a retention Job"""
+    return master_pb2.ExpireJob(job_id=job.job_id, done=job.done, scanned=job.scanned, updated=job.updated,
+                                error=job.error)
+
 
 # Handle graceful shutdown
 def int_handler(signal, frame):
-    try:
-        con = grpc.insecure_channel(DEEDS_BACKUP_ADDR)
-        stub = backup_master_pb2_grpc.BackUpServiceStub(con)
-        content = MasterService.Master.file_table
-        file_table_string = json.dumps(content)
-        stub.updateFileTable(backup_master_pb2.FileTable(file_table_json=file_table_string))
-    except grpc.RpcError as e:
-        logging.error("Primary backup Server not found: %s", e)
-        logging.error("Master Server memory lost")
+    # Every mutation is already in the operation log, only the last batch may still be in flight
+    if MasterService.Master.oplog is not None:
+        MasterService.Master.oplog.close()
+    if MasterService.Master.replicator is not None:
+        MasterService.Master.replicator.stop()
+    if MasterService.Master.gc is not None:
+        MasterService.Master.gc.stop()
+    if MasterService.Master.expiry is not None:
+        MasterService.Master.expiry.stop()
+        logging.info(f"Expiry: {MasterService.Master.expiry.stats()}")
     sys.exit(0)
 
 # Read configuration from the config file
@@ -58,242 +71,408 @@ def set_conf():
         logging.error("Error reading configuration file: %s", e)
         sys.exit(1)
     MasterService.Master.block_size = int(conf.get('master', 'block_size'))
-    global TTL
+    global TTL, LEASE_TTL, REFRESH_WINDOW, WORKERS, MAX_FILES
     TTL = int(conf.get('master', 'ttl') or TTL)
+    LEASE_TTL = conf.getint('master', 'lease_ttl', fallback=LEASE_TTL)
+    REFRESH_WINDOW = conf.getint('master', 'refresh_window', fallback=REFRESH_WINDOW)
+    WORKERS = conf.getint('master', 'workers', fallback=WORKERS)
+    meta_dir = os.environ.get("DEEDS_META_DIR", conf.get('master', 'meta_dir', fallback=META_DIR))
+    checkpoint_every = conf.getint('master', 'checkpoint_every', fallback=oplog.CHECKPOINT_EVERY)
+    gc_batch = conf.getint('master', 'gc_batch', fallback=gc.BATCH_BLOCKS)
+    gc_max_pending = conf.getint('master', 'gc_max_pending', fallback=gc.MAX_PENDING)
+    dead_after = conf.getint('master', 'dead_after', fallback=nodes.DEAD_AFTER)
+    reconcile_interval = conf.getint('master', 'reconcile_interval', fallback=nodes.RECONCILE_INTERVAL)
+    replication_factor = conf.getint('master', 'replication', fallback=1)
+    expiry_backend = conf.get('master', 'expiry_backend', fallback=expiry.WHEEL)
+    expiry_batch = conf.getint('master', 'expiry_batch', fallback=expiry.BATCH)
+    MAX_FILES = conf.getint('master', 'max_files', fallback=MAX_FILES)
     minions = conf.get('master', 'chunkServers').split(',')
 
+    domains = {}
     for m in minions:
-        id, host, port = m.split(":")
+        # An optional fourth field names the failure domain (rack, host, zone) of the minion
+        id, host, port, *domain = m.split(":")
         MasterService.Master.minions[id] = f"{host}:{port}"
+        if domain:
+            domains[id] = domain[0]
 
-    try:
-        con = grpc.insecure_channel(DEEDS_BACKUP_ADDR)
-        stub = backup_master_pb2_grpc.BackUpServiceStub(con)
-        file_table_backup = stub.getFileTable(backup_master_pb2.Empty())
-        MasterService.Master.file_table = json.loads(file_table_backup.file_table_json)
-    except grpc.RpcError as e:
-        logging.error("Primary backup Server not found: %s", e)
+    log = oplog.OpLog(meta_dir, checkpoint_every)
+    if log.is_empty() and not replication.download(DEEDS_BACKUP_ADDR, log.directory):
+        # Nothing on local disk and no backup to start from
         logging.error("Start the primary_backup_server")
-
-
-class FileExpireHandler:
-    def __init__(self):
-        self.redis_conn = redis.Redis(host='redis', port=6379, db=0)
-        self.pubsub = self.redis_conn.pubsub()
-        self.pubsub.psubscribe(**{"__keyevent@0__:expired": self.event_handler})
-        self.pubsub.run_in_thread(sleep_time=0.01)
-
-    def event_handler(self, message):
-        logging.info(f"Received message: {message}")
-        try:
-            key = message["data"].decode("utf-8")
-            logging.info(f"Received message: {message}")
-            if key in MasterService.Master.file_table:
-                MasterService.Master.delete(key)
-        except Exception as e:
-            logging.error(f"Error processing message: {e}")
-
-    def add_key(self, key, ttl):
-        self.redis_conn.setex(key, ttl, 1)
-
-    def remove_key(self, key):
-        self.redis_conn.delete(key)
-
-    def reset_expire(self, key, ttl):
-        if self.redis_conn.exists(key):
-            if ttl == 0:
-                self.redis_conn.delete(key)
-            if ttl < 0:
-                self.redis_conn.persist(key)
-            self.redis_conn.expire(key, ttl)
-
-
-class ChunkManager:
-    def _get_minion_stub(self, host, port=None):
-        if port is None:
-            channel = grpc.insecure_channel(host)
-        else:
-            channel = grpc.insecure_channel(f"{host}:{port}")
-        # wait for the channel to be ready with timeout of 10 seconds
-        try:
-            grpc.channel_ready_future(channel).result(timeout=10)
-        except grpc.FutureTimeoutError:
-            raise Exception("Connection to Minion timed out")
-        return minion_pb2_grpc.MinionServiceStub(channel)
-
-    def delete_chunk(self, deletion_blocks):
-        logging.info(f"Deleting blocks: {deletion_blocks}")
-        for (block_uuid, node_id, block_index) in deletion_blocks:
-            minion = MasterService.Master.minions[node_id]
-            minion_stub = self._get_minion_stub(minion)
-            delete_request = minion_pb2.DeleteRequest(block_uuid=block_uuid)
-            delete_response = minion_stub.deleteBlock(delete_request)
-            logging.info(f"Delete response: {delete_response}")
+    MasterService.Master.namespace = log.recover()
+    MasterService.Master.oplog = log
+    MasterService.Master.replicator = replication.Replicator(log, DEEDS_BACKUP_ADDR).start()
+    MasterService.Master.gc = GarbageCollector(MasterService.Master.namespace, log, MasterService.Master.minions,
+                                               gc_batch, gc_max_pending).start()
+    MasterService.Master.nodes = NodeRegistry(MasterService.Master.namespace, MasterService.Master.minions,
+                                              dead_after, reconcile_interval, replication_factor).start()
+    MasterService.Master.placement = Placement(MasterService.Master.minions, replication_factor, domains,
+                                               MasterService.Master.nodes)
+    # The deadlines are part of the recovered metadata, the timers are rebuilt from them
+    backend = expiry.make_backend(expiry_backend, expiry_batch)
+    with MasterService.Master.namespace.mutex:
+        backend.load((inode.ino, inode.expire_at) for inode in MasterService.Master.namespace.walk()
+                     if inode.expire_at is not None)
+    MasterService.Master.expiry = backend.start(MasterService.Master.expire)
+    MasterService.Master.retention = RetentionJobs(MasterService.Master.namespace, MasterService.Master.locks,
+                                                   log, MasterService.Master.expiry, MasterService.Master.nodes)
 
 
 # Implement the MasterService class
 class MasterService(master_pb2_grpc.MasterServiceServicer):
-    expire_handler = FileExpireHandler()
     class Master:
-        file_attributes = {}
-        file_table = {}
+        namespace = Namespace()
+        # Path locks: an operation read-locks the directories above its paths and locks the
+        # paths themselves, so work on unrelated subtrees runs in parallel
+        locks = LockManager()
+        oplog = None
+        replicator = None
+        gc = None
+        nodes = None
+        placement = None
+        expiry = None
+        retention = None
         minions = {}
-        # locks = {}
         block_size = 0
 
+        @staticmethod
+        def _log(opcode, *fields):
+            """Record a mutation; called under the locks that ordered it"""
+            if MasterService.Master.oplog is not None:
+                MasterService.Master.oplog.append(opcode, *fields)
+
+        @staticmethod
+        def _sync():
+            """Wait until the logged mutations of this call are durable, after the locks are released"""
+            if MasterService.Master.oplog is not None:
+                MasterService.Master.oplog.sync()
+
+        @staticmethod
+        def _resolve(path):
+            """Inode at path, or None if there is none or it expired; the caller holds a lock on path.
+
+            An entry past its deadline (or below a directory past it) is absent even if its
+            timer has not fired yet, and is handed to the expiry backend to be reclaimed.
+            """
+            namespace = MasterService.Master.namespace
+            inode = namespace.resolve(path)
+            if inode is None:
+                return None
+            expired = namespace.expired(inode, int(time()))
+            if expired is not None:
+                MasterService.Master._overdue(expired)
+                return None
+            return inode
+
+        @staticmethod
+        def _overdue(inode):
+            if MasterService.Master.expiry is not None:
+                MasterService.Master.expiry.overdue(inode.ino, inode.expire_at)
+
+        @staticmethod
+        def _blocks(fname):
+            """Snapshot of the block map of fname; the caller holds a lock on fname"""
+            inode = MasterService.Master._resolve(fname)
+            if inode is None:
+                return None
+            return list(inode.blocks) if inode.blocks is not None else []
+
         @staticmethod
         def read(fname):
-            return MasterService.Master.file_table[fname]
+            with MasterService.Master.locks.locked(reads=[fname]):
+                return MasterService.Master._blocks(fname)
 
         @staticmethod
         def write(dest, size):
-            if dest in MasterService.Master.file_table:
-                pass
-            else:
-                MasterService.Master.create(dest, 0o644)
+            with MasterService.Master.locks.locked(writes=[dest]):
+                inode = MasterService.Master._resolve(dest)
+                reaped = None
+                if inode is None:
+                    inode, reaped = MasterService.Master._make(oplog.CREATE, dest, 0o644)
+                    if inode is None:
+                        return None
+
+                num_blocks = MasterService.Master.calc_num_blocks(size)
+                before = len(inode.blocks)
+                keep = min(before, num_blocks)
+                blocks, dropped = MasterService.Master.alloc_blocks(inode, num_blocks, size)
+                MasterService.Master.namespace.written(inode, size, int(time()), before)
+                uuids, node_ids = inode.blocks.packed(keep)
+                MasterService.Master._log(oplog.WRITE, inode.ino, size, inode.mtime, keep, uuids, join_replicas(node_ids))
+                MasterService.Master._discard(dropped)
+                version, expire_at = inode.version, inode.expire_at
+            MasterService.Master._sync()
+            if reaped:
+                MasterService.Master._release(reaped)
+            elif dropped:
+                MasterService.Master._collect()
+            return blocks, version, expire_at
 
-            num_blocks = MasterService.Master.calc_num_blocks(size)
-            blocks = MasterService.Master.alloc_blocks(dest, num_blocks, size)
-            now = int(time())
-            MasterService.Master.file_attributes[dest].update({
-                "st_size": size,
-                "st_mtime": now,
-                "st_blocks": num_blocks,
-                "st_blksize": MasterService.Master.block_size,
+        @staticmethod
+        def mkdir(dest, mode=0o755):
+            with MasterService.Master.locks.locked(writes=[dest]):
+                inode, reaped = MasterService.Master._make(oplog.MKDIR, dest, mode)
+            MasterService.Master._sync()
+            if reaped:
+                MasterService.Master._release(reaped)
+            return inode
 
-            })
-            return blocks
+        @staticmethod
+        def create(fname, mode):
+            with MasterService.Master.locks.locked(writes=[fname]):
+                inode, reaped = MasterService.Master._make(oplog.CREATE, fname, mode)
+            MasterService.Master._sync()
+            if reaped:
+                MasterService.Master._release(reaped)
+            return inode
 
         @staticmethod
-        def mkdir(dest, mode=0o755):
-            if dest in MasterService.Master.file_table:
-                return None
-            MasterService.Master.file_table[dest] = []
+        def _make(opcode, path, mode):
+            """Create path; returns the new inode (None if that is not possible) and the inodes of
+            an expired entry it replaced, which the caller releases once the log is synced"""
+            namespace = MasterService.Master.namespace
             now = int(time())
-            MasterService.Master.file_attributes[dest] = {
-                "st_mode": stat.S_IFDIR | mode,
-                "st_nlink": 1,      # Need to implement this with reference counting
-                "st_uid": 0,
-                "st_gid": 0,
-                "st_size": 0,
-                "st_atime": now,
-                "st_mtime": now,
-                "st_ctime": now,
-                "st_blocks": 0,
-                "st_blksize": 0,
-                "st_ino": 0,
-                "st_dev": 0,
-                "files": set(),
-                "folders": set()
-            }
-            # add the directory to the parent directory
-            if not dest == "/":
-                MasterService.Master.file_attributes[os.path.dirname(dest)]["folders"].add(os.path.basename(dest))
-                MasterService.expire_handler.add_key(dest, TTL)
-            parent_dir = dest
-            while parent_dir != "/":
-                parent_dir = os.path.dirname(dest)
-                MasterService.Master.file_attributes[parent_dir]["st_nlink"] += 1
-                dest = parent_dir
-
-            return dest
+            parent = namespace.resolve(normalize(path).rpartition("/")[0] or "/")
+            if parent is not None and namespace.expired(parent, now) is not None:
+                MasterService.Master._overdue(namespace.expired(parent, now))
+                return None, None
+            reaped = MasterService.Master._reap(path, now)
+            inode = (namespace.mkdir if opcode == oplog.MKDIR else namespace.create)(path, mode, now)
+            if inode is None:
+                return None, reaped
+            MasterService.Master._log(opcode, inode.ino, path, inode.mode, now)
+            MasterService.Master._refresh(inode)
+            return inode, reaped
 
         @staticmethod
-        def create(fname, mode):
-            if fname in MasterService.Master.file_table:
+        def _reap(path, now):
+            """Remove the entry at path if it is past its deadline, so the name can be used
+            again; the caller holds a write lock on path. Returns the removed inodes or None"""
+            namespace = MasterService.Master.namespace
+            inode = namespace.resolve(path)
+            if inode is None or inode.expire_at is None or inode.expire_at > now:
                 return None
-            MasterService.Master.file_table[fname] = []
-            now = int(time())
-            MasterService.Master.file_attributes[fname] = {
-                "st_mode": stat.S_IFREG | mode,
-                "st_nlink": 1,
-                "st_uid": 0,
-                "st_gid": 0,
-                "st_size": 0,
-                "st_atime": now,
-                "st_mtime": now,
-                "st_ctime": now,
-                "st_blocks": 0,
-                "st_blksize": 0,
-                "st_ino": 0,
-                "st_dev": 0,
-            }
-            MasterService.expire_handler.add_key(fname, TTL)
-            MasterService.Master._link_add(fname)
+            nodes = MasterService.Master._unreported()
+            removed = namespace.remove(path, now)
+            MasterService.Master._log(oplog.REAP, path, now, ",".join(nodes))
+            MasterService.Master._discard(reaped(removed, now, nodes))
+            return removed
 
+        @staticmethod
+        def _unreported():
+            """Minions the master has no block inventory from, on which the garbage collector
+            deletes the blocks of expired files too (see ``reaped``)"""
+            if MasterService.Master.nodes is None:
+                return sorted(MasterService.Master.minions)
+            return MasterService.Master.nodes.unreported()
 
         @staticmethod
-        def _link_add(fname):
-            # add the file to the parent directory
-            parent_dir = os.path.dirname(fname)
-            MasterService.Master.file_attributes[parent_dir]["files"].add(os.path.basename(fname))
-            orig_ = fname
-            parent_dir = fname
-            while parent_dir != "/":
-                parent_dir = os.path.dirname(fname)
-                MasterService.Master.file_attributes[parent_dir]["st_nlink"] += 1
-                fname = parent_dir
-                MasterService.expire_handler.reset_expire(parent_dir, TTL)
-            return orig_
+        def _refresh(inode):
+            """Give a new entry its TTL and keep the directories above it alive for another
+            one, arming all of their timers with a single call to the expiry backend.
+
+            The entry's TTL is the default TTL of the nearest directory above it that has one,
+            else the master's. Directories without a deadline stay without one. Those already
+            refreshed within the last REFRESH_WINDOW seconds, or holding a later deadline, are
+            left alone, so a burst of creates below one directory refreshes it once.
+
+            The caller only read-locks the directories, so their deadlines are compared,
+            changed and logged under the namespace mutex: concurrent creates below one
+            directory (or a retention job) must not log an older deadline after a newer one.
+            """
+            namespace = MasterService.Master.namespace
+            now = int(time())
+            deadline = now + TTL
+            coalesced = 0
+            with namespace.mutex:
+                ttl = namespace.default_ttl(inode)
+                if ttl is None:
+                    ttl = TTL
+                inode.expire_at = now + ttl if ttl > 0 else None
+                MasterService.Master._log(oplog.EXPIRE, inode.ino, inode.expire_at)
+                timers = [(inode.ino, inode.expire_at)] if inode.expire_at is not None else []
+                for parent in namespace.ancestors(inode) if TTL > 0 else ():
+                    if parent.expire_at is None or parent.expire_at > deadline:
+                        continue
+                    if 0 <= deadline - parent.expire_at < REFRESH_WINDOW:
+                        coalesced += 1
+                        continue
+                    parent.expire_at = deadline
+                    MasterService.Master._log(oplog.EXPIRE, parent.ino, deadline)
+                    timers.append((parent.ino, deadline))
+            if MasterService.Master.expiry is not None and (timers or coalesced):
+                MasterService.Master.expiry.arm_many(timers, coalesced)
 
         @staticmethod
-        def _link_delete(fname):
-            parent_dir = os.path.dirname(fname)
-            MasterService.expire_handler.remove_key(fname)
-            MasterService.Master.file_attributes[parent_dir]["st_nlink"] -= 1
-            logging.info(f"Parent dir: {parent_dir}")
-            logging.info(f"File attributes: {MasterService.Master.file_attributes[parent_dir]}")
-            if os.path.basename(fname) in MasterService.Master.file_attributes[parent_dir]["files"]:
-                MasterService.Master.file_attributes[parent_dir]["files"].remove(os.path.basename(fname))
-            else:
-                MasterService.Master.file_attributes[parent_dir]["folders"].remove(os.path.basename(fname))
-            if MasterService.Master.file_attributes[parent_dir]["st_nlink"] == 0 and parent_dir != "/":
-                MasterService.Master.delete(parent_dir)
-                MasterService.Master._link_delete(parent_dir)
+        def set_default_ttl(path, ttl):
+            """Default TTL of new entries below directory path (< 0: the master's again); False
+            if path is not a directory"""
+            with MasterService.Master.locks.locked(writes=[path]):
+                inode = MasterService.Master._resolve(path)
+                if inode is None or not inode.is_dir:
+                    return False
+                ttl = ttl if ttl >= 0 else None
+                MasterService.Master.namespace.set_default_ttl(inode.ino, ttl)
+                MasterService.Master._log(oplog.DEFAULT_TTL, inode.ino, ttl)
+            MasterService.Master._sync()
+            return True
+
+        @staticmethod
+        def _set_expire(inode, ttl):
+            """Record the absolute deadline of inode (none for ttl <= 0) and arm its timer.
+
+            Creates below inode change deadlines under read locks only, so this holds the
+            namespace mutex too.
+            """
+            if inode.ino == ROOT_INO:
+                return
+            with MasterService.Master.namespace.mutex:
+                inode.expire_at = deadline = int(time()) + ttl if ttl > 0 else None
+                MasterService.Master._log(oplog.EXPIRE, inode.ino, deadline)
+            if MasterService.Master.expiry is not None:
+                MasterService.Master.expiry.arm(inode.ino, deadline)
+            if inode.blocks and MasterService.Master.nodes is not None:
+                # The minions holding its blocks expire them by themselves
+                MasterService.Master.nodes.push_deadlines(inode.blocks, deadline)
 
         @staticmethod
         def delete(fname):
-            if fname not in MasterService.Master.file_table:
+            with MasterService.Master.locks.locked(writes=[fname]):
+                now = int(time())
+                removed = MasterService.Master.namespace.remove(fname, now)
+                if removed is not None:
+                    MasterService.Master._log(oplog.REMOVE, fname, now)
+                    MasterService.Master._discard(blocks_of(removed))
+            MasterService.Master._sync()
+            if removed is None:
                 return None
+            return MasterService.Master._release(removed)
 
-            # Delete the chunk
-            if fname in MasterService.Master.file_table:
-                deletion_blocks = MasterService.Master.file_table[fname]
-                ChunkManager().delete_chunk(deletion_blocks)
-            if MasterService.Master.file_attributes[fname]["st_mode"] == stat.S_IFDIR:
-                for file in MasterService.Master.file_attributes[fname]["files"]:
-                    MasterService.Master.delete(os.path.join(fname, file))
-                for folder in MasterService.Master.file_attributes[fname]["folders"]:
-                    MasterService.Master.delete(os.path.join(fname, folder))
-            MasterService.Master._link_delete(fname)
-            MasterService.Master.file_attributes.pop(fname)
-            return MasterService.Master.file_table.pop(fname, None)
+        @staticmethod
+        def expire(inos):
+            """Remove the inodes of a batch of fired timers whose deadline has passed"""
+            namespace = MasterService.Master.namespace
+            now = int(time())
+            with namespace.mutex:
+                inodes = [inode for inode in map(namespace.inodes.get, inos)
+                          if inode is not None and inode.expire_at is not None]
+                due = [(namespace.path_of(inode), inode.ino) for inode in inodes if inode.expire_at <= now]
+                # Deadlines are moved under read locks and their timers armed after the
+                # mutex is released, so a timer can fire for an older deadline: arm it again
+                later = [(inode.ino, inode.expire_at) for inode in inodes if inode.expire_at > now]
+            if MasterService.Master.expiry is not None:
+                for ino, deadline in later:
+                    MasterService.Master.expiry.arm(ino, deadline)
+            removed = []
+            nodes = MasterService.Master._unreported()
+            for path, ino in due:
+                # Renamed or refreshed since the paths were taken: only the inode itself decides
+                with MasterService.Master.locks.locked(writes=[path]):
+                    inode = namespace.resolve(path)
+                    if inode is None or inode.ino != ino or inode.expire_at is None or inode.expire_at > now:
+                        continue
+                    gone = namespace.remove(path, now)
+                    if gone is not None:
+                        # Blocks of the files that expired themselves are deleted by their minions,
+                        # but for those without an inventory
+                        MasterService.Master._log(oplog.REAP, path, now, ",".join(nodes))
+                        MasterService.Master._discard(reaped(gone, now, nodes))
+                        removed.extend(gone)
+            # One log sync for the whole batch
+            MasterService.Master._sync()
+            if removed:
+                logging.info(f"Expired {len(due)} entries, {len(removed)} inodes removed")
+                MasterService.Master._release(removed)
+
+        @staticmethod
+        def _discard(blocks):
+            """Queue dropped blocks for the garbage collector; called after logging the drop"""
+            MasterService.Master.namespace.discard(blocks)
+
+        @staticmethod
+        def _release(removed):
+            """Drop expiry timers of removed inodes; returns their blocks"""
+            if MasterService.Master.expiry is not None:
+                for inode in removed:
+                    if inode.expire_at is not None:
+                        MasterService.Master.expiry.disarm(inode.ino)
+            MasterService.Master._collect()
+            return list(blocks_of(removed))
+
+        @staticmethod
+        def _gone(node_id, block_uuids):
+            """Blocks a minion deleted by itself need no garbage collection there any more"""
+            namespace = MasterService.Master.namespace
+            with namespace.mutex:
+                pending = namespace.garbage.get(node_id, {})
+                done = [block_uuid for block_uuid in block_uuids if block_uuid in pending]
+                if done:
+                    MasterService.Master._log(oplog.COLLECT, node_id, oplog.pack_uuids(done))
+                    namespace.collected(node_id, done)
+
+        @staticmethod
+        def _collect():
+            """Let the garbage collector know about new garbage, waiting a little if it is far behind"""
+            if MasterService.Master.gc is not None:
+                MasterService.Master.gc.throttle()
 
         @staticmethod
         def rename(src, dest):
-            if src not in MasterService.Master.file_table:
+            with MasterService.Master.locks.locked(writes=[src, dest]):
+                now = int(time())
+                moved = MasterService.Master.namespace.rename(src, dest, now)
+                if moved is not None:
+                    MasterService.Master._log(oplog.RENAME, src, dest, now)
+                    MasterService.Master._discard(blocks_of(moved[1]))
+            MasterService.Master._sync()
+            if moved is None:
                 return None
-            MasterService.Master.file_table[dest] = MasterService.Master.file_table.pop(src)
-            MasterService.Master.file_attributes[dest] = MasterService.Master.file_attributes.pop(src)
-            MasterService.Master._link_add(dest)
-            MasterService.Master._link_delete(src)
-            return dest
+            inode, replaced = moved
+            MasterService.Master._release(replaced)
+            return inode
+
+        @staticmethod
+        def open(fname):
+            """Block map, version and lease duration of fname, or None if it does not exist"""
+            with MasterService.Master.locks.locked(reads=[fname]):
+                inode = MasterService.Master._resolve(fname)
+                if inode is None:
+                    return None
+                lease_ttl = LEASE_TTL
+                if inode.expire_at is not None:
+                    lease_ttl = max(0, min(lease_ttl, inode.expire_at - int(time())))
+                return MasterService.Master._blocks(fname), inode.version, lease_ttl
 
         @staticmethod
         def getFileTableEntry(fname):
-            return MasterService.Master.file_table.get(fname, None)
+            with MasterService.Master.locks.locked(reads=[fname]):
+                return MasterService.Master._blocks(fname)
 
         @staticmethod
         def getFileAttributes(fname):
-            return MasterService.Master.file_attributes.get(fname, None)
+            with MasterService.Master.locks.locked(reads=[fname]):
+                inode = MasterService.Master._resolve(fname)
+                if inode is None:
+                    return None
+                return inode.attrs(MasterService.Master.block_size)
 
         @staticmethod
         def getListOfFiles(path="/"):
-            if path not in MasterService.Master.file_table:
-                return []
-            folders = MasterService.Master.file_attributes[path]["folders"]
-            files = MasterService.Master.file_attributes[path]["files"]
-            return list(folders) + list(files)
+            with MasterService.Master.locks.locked(reads=[path]):
+                inode = MasterService.Master._resolve(path)
+                if inode is None or not inode.is_dir:
+                    return []
+                now = int(time())
+                with MasterService.Master.namespace.mutex:
+                    children = list(inode.children.values())
+                names = []
+                for child in children:
+                    if child.expire_at is not None and child.expire_at <= now:
+                        MasterService.Master._overdue(child)
+                    else:
+                        names.append(child.name)
+                return names
 
         @staticmethod
         def getBlockSize():
@@ -309,95 +488,110 @@ class MasterService(master_pb2_grpc.MasterServiceServicer):
 
 
         @staticmethod
-        def alloc_blocks(dest, num, size=0):
-            blocks = MasterService.Master.file_table[dest]
-            _blocks = [
-                master_pb2.Block(block_uuid=block_uuid, node_id=nodes_id, block_index=block_index)
-                for (block_uuid, nodes_id, block_index) in blocks
-            ]
-            for i in range(len(blocks), num):
-                block_uuid = str(uuid.uuid1())
-                nodes_id = random.choice(list(MasterService.Master.minions.keys()))
-                _blocks.append(master_pb2.Block(block_uuid=block_uuid, node_id=nodes_id, block_index=i))
-
-                MasterService.Master.file_table[dest].append((block_uuid, nodes_id, i))
-            # Remove extra blocks if file size is reduced
-            deletion_blocks = []
+        def alloc_blocks(inode, num, size=0):
+            """Grow or shrink the block map of inode to num blocks; returns (blocks, dropped blocks)"""
+            blocks = inode.blocks
+            _blocks = [block_message(block) for block in blocks]
+            if num > len(blocks):
+                for replicas in MasterService.Master.placement.choose(num - len(blocks)):
+                    block_uuid = str(uuid.uuid1())
+                    _blocks.append(block_message((block_uuid, replicas, len(blocks))))
+                    blocks.append(block_uuid, replicas)
+            # Extra blocks of a file that got shorter are left to the garbage collector
+            dropped = []
             if num < len(blocks):
-                for i in range(num, len(blocks)):
-                    block_uuid, nodes_id, block_index = MasterService.Master.file_table[dest].pop()
-                    deletion_blocks.append(_blocks.pop())
-                    ChunkManager().delete_chunk(deletion_blocks)
-            return _blocks
+                dropped = blocks.truncate(num)
+                del _blocks[num:]
+            return _blocks, dropped
 
     def __init__(self):
-        """Adds root directory to the file table"""
+        """The root directory is created along with the namespace"""
         super().__init__()
-        if "/" not in MasterService.Master.file_table:
-            MasterService.Master.mkdir("/")
-            logging.info("Root directory created")
 
     # Implement the gRPC service methods
+    def ping(self, request, context):
+        return master_pb2.Empty()
+
     def statfs(self, request, context):
-        total_blocks = sum([len(x) for x in MasterService.Master.file_table.values()])
-        free_blocks = 10*3 - total_blocks
+        # Counters kept up to date by the namespace and the heartbeats; no walk
+        namespace = MasterService.Master.namespace
+        registry = MasterService.Master.nodes
         block_size = MasterService.Master.block_size
-        total_files = sum([len(x.get("files", [])) for x in MasterService.Master.file_attributes.values()])
-        free_files = 10 - total_files
+        total_bytes, free_bytes = registry.totals if registry is not None else (0, 0)
+        total_files = namespace.files + namespace.directories
         return master_pb2.StatfsResponse(
-            total_blocks=total_blocks,
-            free_blocks=free_blocks,
+            total_blocks=total_bytes // block_size,
+            free_blocks=free_bytes // block_size,
             block_size=block_size,
             total_files=total_files,
-            free_files=free_files,
+            free_files=max(0, MAX_FILES - total_files),
+            used_blocks=namespace.used_blocks,
+            used_bytes=namespace.used_bytes,
+        )
+
+    def open(self, request, context):
+        lease = MasterService.Master.open(request.fname)
+        if lease is None:
+            context.set_details("File not found.")
+            context.set_code(grpc.StatusCode.NOT_FOUND)
+            return master_pb2.FileLease()
+        mapping, version, lease_ttl = lease
+        return master_pb2.FileLease(
+            blocks=[block_message(x) for x in mapping],
+            block_size=MasterService.Master.block_size,
+            version=version,
+            lease_ttl=lease_ttl,
         )
 
     def read(self, request, context):
         mapping = MasterService.Master.read(request.fname)
-        mapping_blocks = list(map(lambda x: master_pb2.Block(block_uuid=x[0], node_id=x[1], block_index=x[2]), mapping))
-        return master_pb2.FileMapping(blocks=mapping_blocks)
+        if mapping is None:
+            context.set_details("File not found.")
+            context.set_code(grpc.StatusCode.NOT_FOUND)
+            return master_pb2.FileMapping()
+        mapping_blocks = [block_message(x) for x in mapping]
+        version = (MasterService.Master.getFileAttributes(request.fname) or {}).get("version", 0)
+        return master_pb2.FileMapping(blocks=mapping_blocks, version=version)
 
     def create(self, request, context):
-        dest = MasterService.Master.create(request.path, request.mode)
-        return master_pb2.Location(path=dest)
+        inode = MasterService.Master.create(request.path, request.mode)
+        return master_pb2.Location(path=request.path if inode else None)
 
     def mkdir(self, request, context):
-        dest = MasterService.Master.mkdir(request.path, request.mode)
-        return master_pb2.Location(path=dest)
+        inode = MasterService.Master.mkdir(request.path, request.mode)
+        return master_pb2.Location(path=request.path if inode else None)
 
     def rename(self, request, context):
-        src = request.src
-        dest = request.dest
-        if src not in MasterService.Master.file_table:
-            return master_pb2.Empty()
-        MasterService.Master.file_table[dest] = MasterService.Master.file_table.pop(src)
-        MasterService.Master.file_attributes[dest] = MasterService.Master.file_attributes.pop(src)
-        MasterService.Master.file_attributes[os.path.dirname(dest)]["files"].add(os.path.basename(dest))
-        return master_pb2.Empty()
+        inode = MasterService.Master.rename(request.src, request.dest)
+        return master_pb2.Location(path=request.dest if inode else None)
 
     def write(self, request, context):
-        blocks = MasterService.Master.write(request.dest, request.size)
-        return master_pb2.BlockList(blocks=blocks)
+        written = MasterService.Master.write(request.dest, request.size)
+        if written is None:
+            context.set_details("Parent directory not found.")
+            context.set_code(grpc.StatusCode.NOT_FOUND)
+            return master_pb2.BlockList()
+        blocks, version, expire_at = written
+        return master_pb2.BlockList(blocks=blocks, version=version, expire_at=expire_at or 0)
 
     def delete(self, request, context):
         mapping_to_delete = MasterService.Master.delete(request.fname)
         if mapping_to_delete is None:
             return master_pb2.FileMapping(blocks=[])
-        blocks = list(map(lambda x: master_pb2.Block(block_uuid=x[0], node_id=x[1], block_index=x[2]), mapping_to_delete))
+        blocks = [block_message(x) for x in mapping_to_delete]
         return master_pb2.FileMapping(blocks=blocks)
 
     def getFileTableEntry(self, request, context):
         file_entry = MasterService.Master.getFileTableEntry(request.fname)
         if file_entry is None:
             logging.warning(f"File {request.fname} not found")
-            logging.info(f"File table: {MasterService.Master.file_table}")
             return master_pb2.FileMapping(blocks=[])
-        file_block_list = list(map(lambda x: master_pb2.Block(block_uuid=x[0], node_id=x[1], block_index=x[2]), file_entry))
+        file_block_list = [block_message(x) for x in file_entry]
         file_attributes = MasterService.Master.getFileAttributes(request.fname)
         logging.info(f"File {request.fname} found")
 
         return master_pb2.FileMapping(
-            attrs=json.dumps(file_attributes, cls=SetEncoder),
+            attrs=json.dumps(file_attributes),
             blocks=file_block_list
         )
 
@@ -415,13 +609,61 @@ class MasterService(master_pb2_grpc.MasterServiceServicer):
         return master_pb2.MinionList(minions=minions)
 
     def setExpireTime(self, request, context):
-        MasterService.expire_handler.reset_expire(request.fname, request.ttl)
+        with MasterService.Master.locks.locked(writes=[request.path]):
+            # An entry past its deadline is gone, it does not get a new one
+            inode = MasterService.Master._resolve(request.path)
+            if inode is not None:
+                MasterService.Master._set_expire(inode, request.ttl)
+        if inode is None:
+            context.abort(grpc.StatusCode.NOT_FOUND, f"No such file or directory {request.path}")
+        MasterService.Master._sync()
         return master_pb2.Empty()
 
+    def setExpireTimes(self, request, context):
+        if request.pattern and not request.recursive:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, "A pattern only applies to recursive requests")
+        if request.WhichOneof("expire_time") is None and request.WhichOneof("defaults") is None:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, "Neither ttl nor default_ttl given")
+        if request.WhichOneof("defaults") is not None:
+            if not MasterService.Master.set_default_ttl(request.path, request.default_ttl):
+                context.abort(grpc.StatusCode.NOT_FOUND, f"No directory {request.path}")
+            if request.WhichOneof("expire_time") is None:
+                return master_pb2.ExpireJob(done=True)
+        with MasterService.Master.locks.locked(reads=[request.path]):
+            found = MasterService.Master._resolve(request.path) is not None
+        if not found:
+            context.abort(grpc.StatusCode.NOT_FOUND, f"No such file or directory {request.path}")
+        job = MasterService.Master.retention.submit(request.path, request.ttl, request.recursive, request.pattern)
+        return job_message(job)
+
+    def getExpireJob(self, request, context):
+        job = MasterService.Master.retention.get(request.job_id)
+        if job is None:
+            context.abort(grpc.StatusCode.NOT_FOUND, f"No expire job {request.job_id}")
+        return job_message(job)
+
+    def getExpiryStats(self, request, context):
+        return master_pb2.ExpiryStats(**MasterService.Master.expiry.stats())
+
+    def heartbeat(self, request, context):
+        answer = MasterService.Master.nodes.heartbeat(request)
+        if answer is None:
+            context.abort(grpc.StatusCode.NOT_FOUND, f"Unknown minion {request.node_id}")
+        send_full_report, stale, deadlines, deadlines_seq = answer
+        if request.removed:
+            MasterService.Master._gone(request.node_id, request.removed)
+        return master_pb2.HeartbeatResponse(
+            send_full_report=send_full_report,
+            stale=stale,
+            deadlines=[master_pb2.BlockDeadline(block_uuid=block_uuid, expire_at=expire_at)
+                       for block_uuid, expire_at in deadlines],
+            deadlines_seq=deadlines_seq,
+        )
+
 
 def serve(address):
     set_conf()
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=WORKERS))
     master_pb2_grpc.add_MasterServiceServicer_to_server(MasterService(), server)
     server.add_insecure_port(address)
     server.start()
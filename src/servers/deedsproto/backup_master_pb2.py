@@ -24,17 +24,23 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x13\x62\x61\x63kup_master.proto\x12\x06\x62\x61\x63kup\"$\n\tFileTable\x12\x17\n\x0f\x66ile_table_json\x18\x01 \x01(\t\"\x07\n\x05\x45mpty2v\n\rBackUpService\x12\x30\n\x0cgetFileTable\x12\r.backup.Empty\x1a\x11.backup.FileTable\x12\x33\n\x0fupdateFileTable\x12\x11.backup.FileTable\x1a\r.backup.Emptyb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x13\x62\x61\x63kup_master.proto\x12\x06\x62\x61\x63kup\"\'\n\tLogRecord\x12\x0b\n\x03seq\x18\x01 \x01(\x04\x12\r\n\x05\x66rame\x18\x02 \x01(\x0c\".\n\x08LogBatch\x12\"\n\x07records\x18\x01 \x03(\x0b\x32\x11.backup.LogRecord\"\x17\n\x08Position\x12\x0b\n\x03seq\x18\x01 \x01(\x04\"\'\n\tFileChunk\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x0c\n\x04\x64\x61ta\x18\x02 \x01(\x0c\"\x07\n\x05\x45mpty2\xde\x01\n\rBackUpService\x12.\n\x0bgetPosition\x12\r.backup.Empty\x1a\x10.backup.Position\x12\x33\n\treplicate\x12\x10.backup.LogBatch\x1a\x10.backup.Position(\x01\x30\x01\x12\x38\n\x0finstallSnapshot\x12\x11.backup.FileChunk\x1a\x10.backup.Position(\x01\x12.\n\x08\x64ownload\x12\r.backup.Empty\x1a\x11.backup.FileChunk0\x01\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'backup_master_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
-  _globals['_FILETABLE']._serialized_start=31
-  _globals['_FILETABLE']._serialized_end=67
-  _globals['_EMPTY']._serialized_start=69
-  _globals['_EMPTY']._serialized_end=76
-  _globals['_BACKUPSERVICE']._serialized_start=78
-  _globals['_BACKUPSERVICE']._serialized_end=196
+  _globals['_LOGRECORD']._serialized_start=31
+  _globals['_LOGRECORD']._serialized_end=70
+  _globals['_LOGBATCH']._serialized_start=72
+  _globals['_LOGBATCH']._serialized_end=118
+  _globals['_POSITION']._serialized_start=120
+  _globals['_POSITION']._serialized_end=143
+  _globals['_FILECHUNK']._serialized_start=145
+  _globals['_FILECHUNK']._serialized_end=184
+  _globals['_EMPTY']._serialized_start=186
+  _globals['_EMPTY']._serialized_end=193
+  _globals['_BACKUPSERVICE']._serialized_start=196
+  _globals['_BACKUPSERVICE']._serialized_end=418
 # @@protoc_insertion_point(module_scope)
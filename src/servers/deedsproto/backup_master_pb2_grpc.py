@@ -26,7 +26,9 @@ if _version_not_supported:
 
 
 class BackUpServiceStub(object):
-    """Missing associated documentation comment in .proto file."""
+    """The backup keeps a copy of the master's operation log: a checkpoint plus the log
+    records after it, in the same on-disk format the master uses.
+    """
 
     def __init__(self, channel):
         """Constructor.
@@ -34,29 +36,58 @@ class BackUpServiceStub(object):
         Args:
             channel: A grpc.Channel.
         """
-        self.getFileTable = channel.unary_unary(
-                '/backup.BackUpService/getFileTable',
+        self.getPosition = channel.unary_unary(
+                '/backup.BackUpService/getPosition',
                 request_serializer=backup__master__pb2.Empty.SerializeToString,
-                response_deserializer=backup__master__pb2.FileTable.FromString,
+                response_deserializer=backup__master__pb2.Position.FromString,
                 _registered_method=True)
-        self.updateFileTable = channel.unary_unary(
-                '/backup.BackUpService/updateFileTable',
-                request_serializer=backup__master__pb2.FileTable.SerializeToString,
-                response_deserializer=backup__master__pb2.Empty.FromString,
+        self.replicate = channel.stream_stream(
+                '/backup.BackUpService/replicate',
+                request_serializer=backup__master__pb2.LogBatch.SerializeToString,
+                response_deserializer=backup__master__pb2.Position.FromString,
+                _registered_method=True)
+        self.installSnapshot = channel.stream_unary(
+                '/backup.BackUpService/installSnapshot',
+                request_serializer=backup__master__pb2.FileChunk.SerializeToString,
+                response_deserializer=backup__master__pb2.Position.FromString,
+                _registered_method=True)
+        self.download = channel.unary_stream(
+                '/backup.BackUpService/download',
+                request_serializer=backup__master__pb2.Empty.SerializeToString,
+                response_deserializer=backup__master__pb2.FileChunk.FromString,
                 _registered_method=True)
 
 
 class BackUpServiceServicer(object):
-    """Missing associated documentation comment in .proto file."""
+    """The backup keeps a copy of the master's operation log: a checkpoint plus the log
+    records after it, in the same on-disk format the master uses.
+    """
+
+    def getPosition(self, request, context):
+        """Last sequence number the backup has stored; the master resumes right after it
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
 
-    def getFileTable(self, request, context):
-        """Missing associated documentation comment in .proto file."""
+    def replicate(self, request_iterator, context):
+        """Master -> backup log shipping, acknowledged after every stored batch
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def installSnapshot(self, request_iterator, context):
+        """Master -> backup checkpoint, sent when the backup is behind the master's oldest
+        log segment and after every new checkpoint so the backup can drop old records
+        """
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
-    def updateFileTable(self, request, context):
-        """Missing associated documentation comment in .proto file."""
+    def download(self, request, context):
+        """Backup -> master checkpoint and log, to bootstrap a master with an empty disk
+        """
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
@@ -64,15 +95,25 @@ class BackUpServiceServicer(object):
 
 def add_BackUpServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
-            'getFileTable': grpc.unary_unary_rpc_method_handler(
-                    servicer.getFileTable,
+            'getPosition': grpc.unary_unary_rpc_method_handler(
+                    servicer.getPosition,
                     request_deserializer=backup__master__pb2.Empty.FromString,
-                    response_serializer=backup__master__pb2.FileTable.SerializeToString,
+                    response_serializer=backup__master__pb2.Position.SerializeToString,
+            ),
+            'replicate': grpc.stream_stream_rpc_method_handler(
+                    servicer.replicate,
+                    request_deserializer=backup__master__pb2.LogBatch.FromString,
+                    response_serializer=backup__master__pb2.Position.SerializeToString,
             ),
-            'updateFileTable': grpc.unary_unary_rpc_method_handler(
-                    servicer.updateFileTable,
-                    request_deserializer=backup__master__pb2.FileTable.FromString,
-                    response_serializer=backup__master__pb2.Empty.SerializeToString,
+            'installSnapshot': grpc.stream_unary_rpc_method_handler(
+                    servicer.installSnapshot,
+                    request_deserializer=backup__master__pb2.FileChunk.FromString,
+                    response_serializer=backup__master__pb2.Position.SerializeToString,
+            ),
+            'download': grpc.unary_stream_rpc_method_handler(
+                    servicer.download,
+                    request_deserializer=backup__master__pb2.Empty.FromString,
+                    response_serializer=backup__master__pb2.FileChunk.SerializeToString,
             ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
@@ -83,10 +124,12 @@ def add_BackUpServiceServicer_to_server(servicer, server):
 
  # This class is part of an EXPERIMENTAL API.
 class BackUpService(object):
-    """Missing associated documentation comment in .proto file."""
+    """The backup keeps a copy of the master's operation log: a checkpoint plus the log
+    records after it, in the same on-disk format the master uses.
+    """
 
     @staticmethod
-    def getFileTable(request,
+    def getPosition(request,
             target,
             options=(),
             channel_credentials=None,
@@ -99,9 +142,9 @@ class BackUpService(object):
         return grpc.experimental.unary_unary(
             request,
             target,
-            '/backup.BackUpService/getFileTable',
+            '/backup.BackUpService/getPosition',
             backup__master__pb2.Empty.SerializeToString,
-            backup__master__pb2.FileTable.FromString,
+            backup__master__pb2.Position.FromString,
             options,
             channel_credentials,
             insecure,
@@ -113,7 +156,7 @@ class BackUpService(object):
             _registered_method=True)
 
     @staticmethod
-    def updateFileTable(request,
+    def replicate(request_iterator,
             target,
             options=(),
             channel_credentials=None,
@@ -123,12 +166,66 @@ class BackUpService(object):
             wait_for_ready=None,
             timeout=None,
             metadata=None):
-        return grpc.experimental.unary_unary(
+        return grpc.experimental.stream_stream(
+            request_iterator,
+            target,
+            '/backup.BackUpService/replicate',
+            backup__master__pb2.LogBatch.SerializeToString,
+            backup__master__pb2.Position.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def installSnapshot(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_unary(
+            request_iterator,
+            target,
+            '/backup.BackUpService/installSnapshot',
+            backup__master__pb2.FileChunk.SerializeToString,
+            backup__master__pb2.Position.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def download(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
             request,
             target,
-            '/backup.BackUpService/updateFileTable',
-            backup__master__pb2.FileTable.SerializeToString,
-            backup__master__pb2.Empty.FromString,
+            '/backup.BackUpService/download',
+            backup__master__pb2.Empty.SerializeToString,
+            backup__master__pb2.FileChunk.FromString,
             options,
             channel_credentials,
             insecure,
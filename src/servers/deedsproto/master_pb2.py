@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# NO CHECKED-IN PROTOBUF GENCODE
+# source: master.proto
+# Protobuf Python Version: 5.28.1
+"""Generated protocol buffer code."""
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import runtime_version as _runtime_version
+from google.protobuf import symbol_database as _symbol_database
+from google.protobuf.internal import builder as _builder
+_runtime_version.ValidateProtobufRuntimeVersion(
+    _runtime_version.Domain.PUBLIC,
+    5,
+    28,
+    1,
+    '',
+    'master.proto'
+)
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0cmaster.proto\x12\x06master\"*\n\rRenameRequest\x12\x0b\n\x03src\x18\x01 \x01(\t\x12\x0c\n\x04\x64\x65st\x18\x02 \x01(\t\"\xa1\x01\n\x0eStatfsResponse\x12\x14\n\x0ctotal_blocks\x18\x01 \x01(\x03\x12\x13\n\x0b\x66ree_blocks\x18\x02 \x01(\x03\x12\x12\n\nblock_size\x18\x03 \x01(\x05\x12\x13\n\x0btotal_files\x18\x04 \x01(\x03\x12\x12\n\nfree_files\x18\x05 \x01(\x03\x12\x13\n\x0bused_blocks\x18\x06 \x01(\x03\x12\x12\n\nused_bytes\x18\x07 \x01(\x03\"P\n\x08Location\x12\x0c\n\x04path\x18\x01 \x01(\t\x12\x0e\n\x04mode\x18\x02 \x01(\x05H\x00\x12\r\n\x03ttl\x18\x03 \x01(\x05H\x01\x42\x08\n\x06\x65xtrasB\r\n\x0b\x65xpire_time\"X\n\x0b\x46ileMapping\x12\x1d\n\x06\x62locks\x18\x01 \x03(\x0b\x32\r.master.Block\x12\x0f\n\x05\x61ttrs\x18\x02 \x01(\tH\x00\x12\x0f\n\x07version\x18\x03 \x01(\x03\x42\x08\n\x06\x65xtras\"S\n\x05\x42lock\x12\x12\n\nblock_uuid\x18\x01 \x01(\t\x12\x0f\n\x07node_id\x18\x02 \x01(\t\x12\x13\n\x0b\x62lock_index\x18\x03 \x01(\x05\x12\x10\n\x08replicas\x18\x04 \x03(\t\"*\n\x0cWriteRequest\x12\x0c\n\x04\x64\x65st\x18\x01 \x01(\t\x12\x0c\n\x04size\x18\x02 \x01(\x05\"N\n\tBlockList\x12\x1d\n\x06\x62locks\x18\x01 \x03(\x0b\x32\r.master.Block\x12\x0f\n\x07version\x18\x02 \x01(\x03\x12\x11\n\texpire_at\x18\x03 \x01(\x03\"+\n\x0bOpenRequest\x12\r\n\x05\x66name\x18\x01 \x01(\t\x12\r\n\x05\x66lags\x18\x02 \x01(\x05\"b\n\tFileLease\x12\x1d\n\x06\x62locks\x18\x01 \x03(\x0b\x32\r.master.Block\x12\x12\n\nblock_size\x18\x02 \x01(\x05\x12\x0f\n\x07version\x18\x03 \x01(\x03\x12\x11\n\tlease_ttl\x18\x04 \x01(\x05\"\x1c\n\x0bReadRequest\x12\r\n\x05\x66name\x18\x01 \x01(\t\"\x1e\n\rDeleteRequest\x12\r\n\x05\x66name\x18\x01 \x01(\t\")\n\x18GetFileTableEntryRequest\x12\r\n\x05\x66name\x18\x01 \x01(\t\"\x19\n\x08\x46ileList\x12\r\n\x05\x66iles\x18\x01 \x03(\t\"\x19\n\tBlockSize\x12\x0c\n\x04size\x18\x01 \x01(\x05\"n\n\nMinionList\x12\x30\n\x07minions\x18\x01 \x03(\x0b\x32\x1f.master.MinionList.MinionsEntry\x1a.\n\x0cMinionsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"\xd5\x01\n\tHeartbeat\x12\x0f\n\x07node_id\x18\x01 \x01(\t\x12\x13\n\x0btotal_bytes\x18\x02 \x01(\x03\x12\x12\n\nfree_bytes\x18\x03 \x01(\x03\x12\x10\n\x08inflight\x18\x04 \x01(\x05\x12\x0f\n\x07latency\x18\x05 \x01(\x01\x12\r\n\x05\x61\x64\x64\x65\x64\x18\x06 \x03(\t\x12\x0f\n\x07removed\x18\x07 \x03(\t\x12\x13\n\x0b\x66ull_report\x18\x08 \x01(\x08\x12\x11\n\tlast_page\x18\t \x01(\x08\x12\x0c\n\x04page\x18\n \x01(\x05\x12\x15\n\rdeadlines_ack\x18\x0b \x01(\x03\"}\n\x11HeartbeatResponse\x12\x18\n\x10send_full_report\x18\x01 \x01(\x08\x12\r\n\x05stale\x18\x02 \x03(\t\x12(\n\tdeadlines\x18\x03 \x03(\x0b\x32\x15.master.BlockDeadline\x12\x15\n\rdeadlines_seq\x18\x04 \x01(\x03\"6\n\rBlockDeadline\x12\x12\n\nblock_uuid\x18\x01 \x01(\t\x12\x11\n\texpire_at\x18\x02 \x01(\x03\"\x82\x01\n\rExpireRequest\x12\x0c\n\x04path\x18\x01 \x01(\t\x12\r\n\x03ttl\x18\x02 \x01(\x05H\x00\x12\x11\n\trecursive\x18\x03 \x01(\x08\x12\x0f\n\x07pattern\x18\x04 \x01(\t\x12\x15\n\x0b\x64\x65\x66\x61ult_ttl\x18\x05 \x01(\x05H\x01\x42\r\n\x0b\x65xpire_timeB\n\n\x08\x64\x65\x66\x61ults\"Z\n\tExpireJob\x12\x0e\n\x06job_id\x18\x01 \x01(\x03\x12\x0c\n\x04\x64one\x18\x02 \x01(\x08\x12\x0f\n\x07scanned\x18\x03 \x01(\x03\x12\x0f\n\x07updated\x18\x04 \x01(\x03\x12\r\n\x05\x65rror\x18\x05 \x01(\t\"\x8d\x01\n\x0b\x45xpiryStats\x12\x0f\n\x07\x65xpired\x18\x01 \x01(\x03\x12\x15\n\rrefresh_calls\x18\x02 \x01(\x03\x12\x11\n\trefreshed\x18\x03 \x01(\x03\x12\x11\n\tcoalesced\x18\x04 \x01(\x03\x12\x13\n\x0b\x63\x61lls_saved\x18\x05 \x01(\x03\x12\x0e\n\x06timers\x18\x06 \x01(\x03\x12\x0b\n\x03lag\x18\x07 \x01(\x03\"\x07\n\x05\x45mpty2\xb8\x07\n\rMasterService\x12$\n\x04ping\x12\r.master.Empty\x1a\r.master.Empty\x12/\n\x06statfs\x12\r.master.Empty\x1a\x16.master.StatfsResponse\x12,\n\x06\x63reate\x12\x10.master.Location\x1a\x10.master.Location\x12+\n\x05mkdir\x12\x10.master.Location\x1a\x10.master.Location\x12\x31\n\x06rename\x12\x15.master.RenameRequest\x1a\x10.master.Location\x12.\n\x04open\x12\x13.master.OpenRequest\x1a\x11.master.FileLease\x12\x30\n\x04read\x12\x13.master.ReadRequest\x1a\x13.master.FileMapping\x12\x30\n\x05write\x12\x14.master.WriteRequest\x1a\x11.master.BlockList\x12\x34\n\x06\x64\x65lete\x12\x15.master.DeleteRequest\x1a\x13.master.FileMapping\x12J\n\x11getFileTableEntry\x12 .master.GetFileTableEntryRequest\x1a\x13.master.FileMapping\x12\x34\n\x0egetListOfFiles\x12\x10.master.Location\x1a\x10.master.FileList\x12\x30\n\x0cgetBlockSize\x12\r.master.Empty\x1a\x11.master.BlockSize\x12/\n\ngetMinions\x12\r.master.Empty\x1a\x12.master.MinionList\x12\x30\n\rsetExpireTime\x12\x10.master.Location\x1a\r.master.Empty\x12:\n\x0esetExpireTimes\x12\x15.master.ExpireRequest\x1a\x11.master.ExpireJob\x12\x34\n\x0cgetExpireJob\x12\x11.master.ExpireJob\x1a\x11.master.ExpireJob\x12\x34\n\x0egetExpiryStats\x12\r.master.Empty\x1a\x13.master.ExpiryStats\x12\x39\n\theartbeat\x12\x11.master.Heartbeat\x1a\x19.master.HeartbeatResponseb\x06proto3')
+
+_globals = globals()
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'master_pb2', _globals)
+if not _descriptor._USE_C_DESCRIPTORS:
+  DESCRIPTOR._loaded_options = None
+  _globals['_MINIONLIST_MINIONSENTRY']._loaded_options = None
+  _globals['_MINIONLIST_MINIONSENTRY']._serialized_options = b'8\001'
+  _globals['_RENAMEREQUEST']._serialized_start=24
+  _globals['_RENAMEREQUEST']._serialized_end=66
+  _globals['_STATFSRESPONSE']._serialized_start=69
+  _globals['_STATFSRESPONSE']._serialized_end=230
+  _globals['_LOCATION']._serialized_start=232
+  _globals['_LOCATION']._serialized_end=312
+  _globals['_FILEMAPPING']._serialized_start=314
+  _globals['_FILEMAPPING']._serialized_end=402
+  _globals['_BLOCK']._serialized_start=404
+  _globals['_BLOCK']._serialized_end=487
+  _globals['_WRITEREQUEST']._serialized_start=489
+  _globals['_WRITEREQUEST']._serialized_end=531
+  _globals['_BLOCKLIST']._serialized_start=533
+  _globals['_BLOCKLIST']._serialized_end=611
+  _globals['_OPENREQUEST']._serialized_start=613
+  _globals['_OPENREQUEST']._serialized_end=656
+  _globals['_FILELEASE']._serialized_start=658
+  _globals['_FILELEASE']._serialized_end=756
+  _globals['_READREQUEST']._serialized_start=758
+  _globals['_READREQUEST']._serialized_end=786
+  _globals['_DELETEREQUEST']._serialized_start=788
+  _globals['_DELETEREQUEST']._serialized_end=818
+  _globals['_GETFILETABLEENTRYREQUEST']._serialized_start=820
+  _globals['_GETFILETABLEENTRYREQUEST']._serialized_end=861
+  _globals['_FILELIST']._serialized_start=863
+  _globals['_FILELIST']._serialized_end=888
+  _globals['_BLOCKSIZE']._serialized_start=890
+  _globals['_BLOCKSIZE']._serialized_end=915
+  _globals['_MINIONLIST']._serialized_start=917
+  _globals['_MINIONLIST']._serialized_end=1027
+  _globals['_MINIONLIST_MINIONSENTRY']._serialized_start=981
+  _globals['_MINIONLIST_MINIONSENTRY']._serialized_end=1027
+  _globals['_HEARTBEAT']._serialized_start=1030
+  _globals['_HEARTBEAT']._serialized_end=1243
+  _globals['_HEARTBEATRESPONSE']._serialized_start=1245
+  _globals['_HEARTBEATRESPONSE']._serialized_end=1370
+  _globals['_BLOCKDEADLINE']._serialized_start=1372
+  _globals['_BLOCKDEADLINE']._serialized_end=1426
+  _globals['_EXPIREREQUEST']._serialized_start=1429
+  _globals['_EXPIREREQUEST']._serialized_end=1559
+  _globals['_EXPIREJOB']._serialized_start=1561
+  _globals['_EXPIREJOB']._serialized_end=1651
+  _globals['_EXPIRYSTATS']._serialized_start=1654
+  _globals['_EXPIRYSTATS']._serialized_end=1795
+  _globals['_EMPTY']._serialized_start=1797
+  _globals['_EMPTY']._serialized_end=1804
+  _globals['_MASTERSERVICE']._serialized_start=1807
+  _globals['_MASTERSERVICE']._serialized_end=2759
+# @@protoc_insertion_point(module_scope)
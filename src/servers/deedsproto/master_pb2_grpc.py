@@ -0,0 +1,830 @@
+# Generated by the gRPC Python protocol compiler plugin. DO NOT EDIT!
+"""Client and server classes corresponding to protobuf-defined services."""
+import grpc
+import warnings
+
+import master_pb2 as master__pb2
+
+GRPC_GENERATED_VERSION = '1.68.0'
+GRPC_VERSION = grpc.__version__
+_version_not_supported = False
+
+try:
+    from grpc._utilities import first_version_is_lower
+    _version_not_supported = first_version_is_lower(GRPC_VERSION, GRPC_GENERATED_VERSION)
+except ImportError:
+    _version_not_supported = True
+
+if _version_not_supported:
+    raise RuntimeError(
+        f'The grpc package installed is at version {GRPC_VERSION},'
+        + f' but the generated code in master_pb2_grpc.py depends on'
+        + f' grpcio>={GRPC_GENERATED_VERSION}.'
+        + f' Please upgrade your grpc module to grpcio>={GRPC_GENERATED_VERSION}'
+        + f' or downgrade your generated code using grpcio-tools<={GRPC_VERSION}.'
+    )
+
+
+class MasterServiceStub(object):
+    """Missing associated documentation comment in .proto file."""
+
+    def __init__(self, channel):
+        """Constructor.
+
+        Args:
+            channel: A grpc.Channel.
+        """
+        self.ping = channel.unary_unary(
+                '/master.MasterService/ping',
+                request_serializer=master__pb2.Empty.SerializeToString,
+                response_deserializer=master__pb2.Empty.FromString,
+                _registered_method=True)
+        self.statfs = channel.unary_unary(
+                '/master.MasterService/statfs',
+                request_serializer=master__pb2.Empty.SerializeToString,
+                response_deserializer=master__pb2.StatfsResponse.FromString,
+                _registered_method=True)
+        self.create = channel.unary_unary(
+                '/master.MasterService/create',
+                request_serializer=master__pb2.Location.SerializeToString,
+                response_deserializer=master__pb2.Location.FromString,
+                _registered_method=True)
+        self.mkdir = channel.unary_unary(
+                '/master.MasterService/mkdir',
+                request_serializer=master__pb2.Location.SerializeToString,
+                response_deserializer=master__pb2.Location.FromString,
+                _registered_method=True)
+        self.rename = channel.unary_unary(
+                '/master.MasterService/rename',
+                request_serializer=master__pb2.RenameRequest.SerializeToString,
+                response_deserializer=master__pb2.Location.FromString,
+                _registered_method=True)
+        self.open = channel.unary_unary(
+                '/master.MasterService/open',
+                request_serializer=master__pb2.OpenRequest.SerializeToString,
+                response_deserializer=master__pb2.FileLease.FromString,
+                _registered_method=True)
+        self.read = channel.unary_unary(
+                '/master.MasterService/read',
+                request_serializer=master__pb2.ReadRequest.SerializeToString,
+                response_deserializer=master__pb2.FileMapping.FromString,
+                _registered_method=True)
+        self.write = channel.unary_unary(
+                '/master.MasterService/write',
+                request_serializer=master__pb2.WriteRequest.SerializeToString,
+                response_deserializer=master__pb2.BlockList.FromString,
+                _registered_method=True)
+        self.delete = channel.unary_unary(
+                '/master.MasterService/delete',
+                request_serializer=master__pb2.DeleteRequest.SerializeToString,
+                response_deserializer=master__pb2.FileMapping.FromString,
+                _registered_method=True)
+        self.getFileTableEntry = channel.unary_unary(
+                '/master.MasterService/getFileTableEntry',
+                request_serializer=master__pb2.GetFileTableEntryRequest.SerializeToString,
+                response_deserializer=master__pb2.FileMapping.FromString,
+                _registered_method=True)
+        self.getListOfFiles = channel.unary_unary(
+                '/master.MasterService/getListOfFiles',
+                request_serializer=master__pb2.Location.SerializeToString,
+                response_deserializer=master__pb2.FileList.FromString,
+                _registered_method=True)
+        self.getBlockSize = channel.unary_unary(
+                '/master.MasterService/getBlockSize',
+                request_serializer=master__pb2.Empty.SerializeToString,
+                response_deserializer=master__pb2.BlockSize.FromString,
+                _registered_method=True)
+        self.getMinions = channel.unary_unary(
+                '/master.MasterService/getMinions',
+                request_serializer=master__pb2.Empty.SerializeToString,
+                response_deserializer=master__pb2.MinionList.FromString,
+                _registered_method=True)
+        self.setExpireTime = channel.unary_unary(
+                '/master.MasterService/setExpireTime',
+                request_serializer=master__pb2.Location.SerializeToString,
+                response_deserializer=master__pb2.Empty.FromString,
+                _registered_method=True)
+        self.setExpireTimes = channel.unary_unary(
+                '/master.MasterService/setExpireTimes',
+                request_serializer=master__pb2.ExpireRequest.SerializeToString,
+                response_deserializer=master__pb2.ExpireJob.FromString,
+                _registered_method=True)
+        self.getExpireJob = channel.unary_unary(
+                '/master.MasterService/getExpireJob',
+                request_serializer=master__pb2.ExpireJob.SerializeToString,
+                response_deserializer=master__pb2.ExpireJob.FromString,
+                _registered_method=True)
+        self.getExpiryStats = channel.unary_unary(
+                '/master.MasterService/getExpiryStats',
+                request_serializer=master__pb2.Empty.SerializeToString,
+                response_deserializer=master__pb2.ExpiryStats.FromString,
+                _registered_method=True)
+        self.heartbeat = channel.unary_unary(
+                '/master.MasterService/heartbeat',
+                request_serializer=master__pb2.Heartbeat.SerializeToString,
+                response_deserializer=master__pb2.HeartbeatResponse.FromString,
+                _registered_method=True)
+
+
+class MasterServiceServicer(object):
+    """Missing associated documentation comment in .proto file."""
+
+    def ping(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def statfs(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def create(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def mkdir(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def rename(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def open(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def read(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def write(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def delete(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def getFileTableEntry(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def getListOfFiles(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def getBlockSize(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def getMinions(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def setExpireTime(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def setExpireTimes(self, request, context):
+        """TTL of a whole subtree, applied by a background job
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def getExpireJob(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def getExpiryStats(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def heartbeat(self, request, context):
+        """Storage nodes report in every few seconds
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+
+def add_MasterServiceServicer_to_server(servicer, server):
+    rpc_method_handlers = {
+            'ping': grpc.unary_unary_rpc_method_handler(
+                    servicer.ping,
+                    request_deserializer=master__pb2.Empty.FromString,
+                    response_serializer=master__pb2.Empty.SerializeToString,
+            ),
+            'statfs': grpc.unary_unary_rpc_method_handler(
+                    servicer.statfs,
+                    request_deserializer=master__pb2.Empty.FromString,
+                    response_serializer=master__pb2.StatfsResponse.SerializeToString,
+            ),
+            'create': grpc.unary_unary_rpc_method_handler(
+                    servicer.create,
+                    request_deserializer=master__pb2.Location.FromString,
+                    response_serializer=master__pb2.Location.SerializeToString,
+            ),
+            'mkdir': grpc.unary_unary_rpc_method_handler(
+                    servicer.mkdir,
+                    request_deserializer=master__pb2.Location.FromString,
+                    response_serializer=master__pb2.Location.SerializeToString,
+            ),
+            'rename': grpc.unary_unary_rpc_method_handler(
+                    servicer.rename,
+                    request_deserializer=master__pb2.RenameRequest.FromString,
+                    response_serializer=master__pb2.Location.SerializeToString,
+            ),
+            'open': grpc.unary_unary_rpc_method_handler(
+                    servicer.open,
+                    request_deserializer=master__pb2.OpenRequest.FromString,
+                    response_serializer=master__pb2.FileLease.SerializeToString,
+            ),
+            'read': grpc.unary_unary_rpc_method_handler(
+                    servicer.read,
+                    request_deserializer=master__pb2.ReadRequest.FromString,
+                    response_serializer=master__pb2.FileMapping.SerializeToString,
+            ),
+            'write': grpc.unary_unary_rpc_method_handler(
+                    servicer.write,
+                    request_deserializer=master__pb2.WriteRequest.FromString,
+                    response_serializer=master__pb2.BlockList.SerializeToString,
+            ),
+            'delete': grpc.unary_unary_rpc_method_handler(
+                    servicer.delete,
+                    request_deserializer=master__pb2.DeleteRequest.FromString,
+                    response_serializer=master__pb2.FileMapping.SerializeToString,
+            ),
+            'getFileTableEntry': grpc.unary_unary_rpc_method_handler(
+                    servicer.getFileTableEntry,
+                    request_deserializer=master__pb2.GetFileTableEntryRequest.FromString,
+                    response_serializer=master__pb2.FileMapping.SerializeToString,
+            ),
+            'getListOfFiles': grpc.unary_unary_rpc_method_handler(
+                    servicer.getListOfFiles,
+                    request_deserializer=master__pb2.Location.FromString,
+                    response_serializer=master__pb2.FileList.SerializeToString,
+            ),
+            'getBlockSize': grpc.unary_unary_rpc_method_handler(
+                    servicer.getBlockSize,
+                    request_deserializer=master__pb2.Empty.FromString,
+                    response_serializer=master__pb2.BlockSize.SerializeToString,
+            ),
+            'getMinions': grpc.unary_unary_rpc_method_handler(
+                    servicer.getMinions,
+                    request_deserializer=master__pb2.Empty.FromString,
+                    response_serializer=master__pb2.MinionList.SerializeToString,
+            ),
+            'setExpireTime': grpc.unary_unary_rpc_method_handler(
+                    servicer.setExpireTime,
+                    request_deserializer=master__pb2.Location.FromString,
+                    response_serializer=master__pb2.Empty.SerializeToString,
+            ),
+            'setExpireTimes': grpc.unary_unary_rpc_method_handler(
+                    servicer.setExpireTimes,
+                    request_deserializer=master__pb2.ExpireRequest.FromString,
+                    response_serializer=master__pb2.ExpireJob.SerializeToString,
+            ),
+            'getExpireJob': grpc.unary_unary_rpc_method_handler(
+                    servicer.getExpireJob,
+                    request_deserializer=master__pb2.ExpireJob.FromString,
+                    response_serializer=master__pb2.ExpireJob.SerializeToString,
+            ),
+            'getExpiryStats': grpc.unary_unary_rpc_method_handler(
+                    servicer.getExpiryStats,
+                    request_deserializer=master__pb2.Empty.FromString,
+                    response_serializer=master__pb2.ExpiryStats.SerializeToString,
+            ),
+            'heartbeat': grpc.unary_unary_rpc_method_handler(
+                    servicer.heartbeat,
+                    request_deserializer=master__pb2.Heartbeat.FromString,
+                    response_serializer=master__pb2.HeartbeatResponse.SerializeToString,
+            ),
+    }
+    generic_handler = grpc.method_handlers_generic_handler(
+            'master.MasterService', rpc_method_handlers)
+    server.add_generic_rpc_handlers((generic_handler,))
+    server.add_registered_method_handlers('master.MasterService', rpc_method_handlers)
+
+
+ # This class is part of an EXPERIMENTAL API.
+class MasterService(object):
+    """Missing associated documentation comment in .proto file."""
+
+    @staticmethod
+    def ping(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/master.MasterService/ping',
+            master__pb2.Empty.SerializeToString,
+            master__pb2.Empty.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def statfs(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/master.MasterService/statfs',
+            master__pb2.Empty.SerializeToString,
+            master__pb2.StatfsResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def create(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/master.MasterService/create',
+            master__pb2.Location.SerializeToString,
+            master__pb2.Location.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def mkdir(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/master.MasterService/mkdir',
+            master__pb2.Location.SerializeToString,
+            master__pb2.Location.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def rename(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/master.MasterService/rename',
+            master__pb2.RenameRequest.SerializeToString,
+            master__pb2.Location.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def open(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/master.MasterService/open',
+            master__pb2.OpenRequest.SerializeToString,
+            master__pb2.FileLease.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def read(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/master.MasterService/read',
+            master__pb2.ReadRequest.SerializeToString,
+            master__pb2.FileMapping.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def write(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/master.MasterService/write',
+            master__pb2.WriteRequest.SerializeToString,
+            master__pb2.BlockList.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def delete(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/master.MasterService/delete',
+            master__pb2.DeleteRequest.SerializeToString,
+            master__pb2.FileMapping.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def getFileTableEntry(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/master.MasterService/getFileTableEntry',
+            master__pb2.GetFileTableEntryRequest.SerializeToString,
+            master__pb2.FileMapping.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def getListOfFiles(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/master.MasterService/getListOfFiles',
+            master__pb2.Location.SerializeToString,
+            master__pb2.FileList.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def getBlockSize(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/master.MasterService/getBlockSize',
+            master__pb2.Empty.SerializeToString,
+            master__pb2.BlockSize.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def getMinions(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/master.MasterService/getMinions',
+            master__pb2.Empty.SerializeToString,
+            master__pb2.MinionList.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def setExpireTime(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/master.MasterService/setExpireTime',
+            master__pb2.Location.SerializeToString,
+            master__pb2.Empty.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def setExpireTimes(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/master.MasterService/setExpireTimes',
+            master__pb2.ExpireRequest.SerializeToString,
+            master__pb2.ExpireJob.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def getExpireJob(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/master.MasterService/getExpireJob',
+            master__pb2.ExpireJob.SerializeToString,
+            master__pb2.ExpireJob.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def getExpiryStats(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/master.MasterService/getExpiryStats',
+            master__pb2.Empty.SerializeToString,
+            master__pb2.ExpiryStats.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def heartbeat(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/master.MasterService/heartbeat',
+            master__pb2.Heartbeat.SerializeToString,
+            master__pb2.HeartbeatResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# NO CHECKED-IN PROTOBUF GENCODE
+# source: minion.proto
+# Protobuf Python Version: 5.28.1
+"""Generated protocol buffer code."""
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import runtime_version as _runtime_version
+from google.protobuf import symbol_database as _symbol_database
+from google.protobuf.internal import builder as _builder
+_runtime_version.ValidateProtobufRuntimeVersion(
+    _runtime_version.Domain.PUBLIC,
+    5,
+    28,
+    1,
+    '',
+    'minion.proto'
+)
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0cminion.proto\x12\x06minion\"b\n\nPutRequest\x12\x12\n\nblock_uuid\x18\x01 \x01(\t\x12\x0c\n\x04\x64\x61ta\x18\x02 \x01(\x0c\x12\x1f\n\x07minions\x18\x03 \x03(\x0b\x32\x0e.minion.Minion\x12\x11\n\texpire_at\x18\x04 \x01(\x03\" \n\nGetRequest\x12\x12\n\nblock_uuid\x18\x01 \x01(\t\"\x1b\n\x0bGetResponse\x12\x0c\n\x04\x64\x61ta\x18\x01 \x01(\x0c\"#\n\rDeleteRequest\x12\x12\n\nblock_uuid\x18\x01 \x01(\t\"!\n\x0e\x44\x65leteResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\"*\n\x13\x44\x65leteBlocksRequest\x12\x13\n\x0b\x62lock_uuids\x18\x01 \x03(\t\"<\n\x14\x44\x65leteBlocksResponse\x12$\n\x07results\x18\x01 \x03(\x0b\x32\x13.minion.BlockResult\"U\n\x0b\x42lockResult\x12\x12\n\nblock_uuid\x18\x01 \x01(\t\x12#\n\x06status\x18\x02 \x01(\x0e\x32\x13.minion.BlockStatus\x12\r\n\x05\x65rror\x18\x03 \x01(\t\"&\n\x0fMultiGetRequest\x12\x13\n\x0b\x62lock_uuids\x18\x01 \x03(\t\"R\n\tBlockData\x12\x12\n\nblock_uuid\x18\x01 \x01(\t\x12#\n\x06status\x18\x02 \x01(\x0e\x32\x13.minion.BlockStatus\x12\x0c\n\x04\x64\x61ta\x18\x03 \x01(\x0c\"f\n\x0e\x46orwardRequest\x12\x12\n\nblock_uuid\x18\x01 \x01(\t\x12\x0c\n\x04\x64\x61ta\x18\x02 \x01(\x0c\x12\x1f\n\x07minions\x18\x03 \x03(\x0b\x32\x0e.minion.Minion\x12\x11\n\texpire_at\x18\x04 \x01(\x03\"$\n\x06Minion\x12\x0c\n\x04host\x18\x01 \x01(\t\x12\x0c\n\x04port\x18\x02 \x01(\x05\"\x07\n\x05\x45mpty*0\n\x0b\x42lockStatus\x12\x06\n\x02OK\x10\x00\x12\r\n\tNOT_FOUND\x10\x01\x12\n\n\x06\x46\x41ILED\x10\x02\x32\xde\x02\n\rMinionService\x12(\n\x03put\x12\x12.minion.PutRequest\x1a\r.minion.Empty\x12.\n\x03get\x12\x12.minion.GetRequest\x1a\x13.minion.GetResponse\x12<\n\x0b\x64\x65leteBlock\x12\x15.minion.DeleteRequest\x1a\x16.minion.DeleteResponse\x12I\n\x0c\x64\x65leteBlocks\x12\x1b.minion.DeleteBlocksRequest\x1a\x1c.minion.DeleteBlocksResponse\x12\x38\n\x08multiGet\x12\x17.minion.MultiGetRequest\x1a\x11.minion.BlockData0\x01\x12\x30\n\x07\x66orward\x12\x16.minion.ForwardRequest\x1a\r.minion.Emptyb\x06proto3')
+
+_globals = globals()
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'minion_pb2', _globals)
+if not _descriptor._USE_C_DESCRIPTORS:
+  DESCRIPTOR._loaded_options = None
+  _globals['_BLOCKSTATUS']._serialized_start=727
+  _globals['_BLOCKSTATUS']._serialized_end=775
+  _globals['_PUTREQUEST']._serialized_start=24
+  _globals['_PUTREQUEST']._serialized_end=122
+  _globals['_GETREQUEST']._serialized_start=124
+  _globals['_GETREQUEST']._serialized_end=156
+  _globals['_GETRESPONSE']._serialized_start=158
+  _globals['_GETRESPONSE']._serialized_end=185
+  _globals['_DELETEREQUEST']._serialized_start=187
+  _globals['_DELETEREQUEST']._serialized_end=222
+  _globals['_DELETERESPONSE']._serialized_start=224
+  _globals['_DELETERESPONSE']._serialized_end=257
+  _globals['_DELETEBLOCKSREQUEST']._serialized_start=259
+  _globals['_DELETEBLOCKSREQUEST']._serialized_end=301
+  _globals['_DELETEBLOCKSRESPONSE']._serialized_start=303
+  _globals['_DELETEBLOCKSRESPONSE']._serialized_end=363
+  _globals['_BLOCKRESULT']._serialized_start=365
+  _globals['_BLOCKRESULT']._serialized_end=450
+  _globals['_MULTIGETREQUEST']._serialized_start=452
+  _globals['_MULTIGETREQUEST']._serialized_end=490
+  _globals['_BLOCKDATA']._serialized_start=492
+  _globals['_BLOCKDATA']._serialized_end=574
+  _globals['_FORWARDREQUEST']._serialized_start=576
+  _globals['_FORWARDREQUEST']._serialized_end=678
+  _globals['_MINION']._serialized_start=680
+  _globals['_MINION']._serialized_end=716
+  _globals['_EMPTY']._serialized_start=718
+  _globals['_EMPTY']._serialized_end=725
+  _globals['_MINIONSERVICE']._serialized_start=778
+  _globals['_MINIONSERVICE']._serialized_end=1128
+# @@protoc_insertion_point(module_scope)
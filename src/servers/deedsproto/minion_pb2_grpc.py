@@ -0,0 +1,312 @@
+# Generated by the gRPC Python protocol compiler plugin. DO NOT EDIT!
+"""Client and server classes corresponding to protobuf-defined services."""
+import grpc
+import warnings
+
+import minion_pb2 as minion__pb2
+
+GRPC_GENERATED_VERSION = '1.68.0'
+GRPC_VERSION = grpc.__version__
+_version_not_supported = False
+
+try:
+    from grpc._utilities import first_version_is_lower
+    _version_not_supported = first_version_is_lower(GRPC_VERSION, GRPC_GENERATED_VERSION)
+except ImportError:
+    _version_not_supported = True
+
+if _version_not_supported:
+    raise RuntimeError(
+        f'The grpc package installed is at version {GRPC_VERSION},'
+        + f' but the generated code in minion_pb2_grpc.py depends on'
+        + f' grpcio>={GRPC_GENERATED_VERSION}.'
+        + f' Please upgrade your grpc module to grpcio>={GRPC_GENERATED_VERSION}'
+        + f' or downgrade your generated code using grpcio-tools<={GRPC_VERSION}.'
+    )
+
+
+class MinionServiceStub(object):
+    """Missing associated documentation comment in .proto file."""
+
+    def __init__(self, channel):
+        """Constructor.
+
+        Args:
+            channel: A grpc.Channel.
+        """
+        self.put = channel.unary_unary(
+                '/minion.MinionService/put',
+                request_serializer=minion__pb2.PutRequest.SerializeToString,
+                response_deserializer=minion__pb2.Empty.FromString,
+                _registered_method=True)
+        self.get = channel.unary_unary(
+                '/minion.MinionService/get',
+                request_serializer=minion__pb2.GetRequest.SerializeToString,
+                response_deserializer=minion__pb2.GetResponse.FromString,
+                _registered_method=True)
+        self.deleteBlock = channel.unary_unary(
+                '/minion.MinionService/deleteBlock',
+                request_serializer=minion__pb2.DeleteRequest.SerializeToString,
+                response_deserializer=minion__pb2.DeleteResponse.FromString,
+                _registered_method=True)
+        self.deleteBlocks = channel.unary_unary(
+                '/minion.MinionService/deleteBlocks',
+                request_serializer=minion__pb2.DeleteBlocksRequest.SerializeToString,
+                response_deserializer=minion__pb2.DeleteBlocksResponse.FromString,
+                _registered_method=True)
+        self.multiGet = channel.unary_stream(
+                '/minion.MinionService/multiGet',
+                request_serializer=minion__pb2.MultiGetRequest.SerializeToString,
+                response_deserializer=minion__pb2.BlockData.FromString,
+                _registered_method=True)
+        self.forward = channel.unary_unary(
+                '/minion.MinionService/forward',
+                request_serializer=minion__pb2.ForwardRequest.SerializeToString,
+                response_deserializer=minion__pb2.Empty.FromString,
+                _registered_method=True)
+
+
+class MinionServiceServicer(object):
+    """Missing associated documentation comment in .proto file."""
+
+    def put(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def get(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def deleteBlock(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def deleteBlocks(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def multiGet(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def forward(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+
+def add_MinionServiceServicer_to_server(servicer, server):
+    rpc_method_handlers = {
+            'put': grpc.unary_unary_rpc_method_handler(
+                    servicer.put,
+                    request_deserializer=minion__pb2.PutRequest.FromString,
+                    response_serializer=minion__pb2.Empty.SerializeToString,
+            ),
+            'get': grpc.unary_unary_rpc_method_handler(
+                    servicer.get,
+                    request_deserializer=minion__pb2.GetRequest.FromString,
+                    response_serializer=minion__pb2.GetResponse.SerializeToString,
+            ),
+            'deleteBlock': grpc.unary_unary_rpc_method_handler(
+                    servicer.deleteBlock,
+                    request_deserializer=minion__pb2.DeleteRequest.FromString,
+                    response_serializer=minion__pb2.DeleteResponse.SerializeToString,
+            ),
+            'deleteBlocks': grpc.unary_unary_rpc_method_handler(
+                    servicer.deleteBlocks,
+                    request_deserializer=minion__pb2.DeleteBlocksRequest.FromString,
+                    response_serializer=minion__pb2.DeleteBlocksResponse.SerializeToString,
+            ),
+            'multiGet': grpc.unary_stream_rpc_method_handler(
+                    servicer.multiGet,
+                    request_deserializer=minion__pb2.MultiGetRequest.FromString,
+                    response_serializer=minion__pb2.BlockData.SerializeToString,
+            ),
+            'forward': grpc.unary_unary_rpc_method_handler(
+                    servicer.forward,
+                    request_deserializer=minion__pb2.ForwardRequest.FromString,
+                    response_serializer=minion__pb2.Empty.SerializeToString,
+            ),
+    }
+    generic_handler = grpc.method_handlers_generic_handler(
+            'minion.MinionService', rpc_method_handlers)
+    server.add_generic_rpc_handlers((generic_handler,))
+    server.add_registered_method_handlers('minion.MinionService', rpc_method_handlers)
+
+
+ # This class is part of an EXPERIMENTAL API.
+class MinionService(object):
+    """Missing associated documentation comment in .proto file."""
+
+    @staticmethod
+    def put(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/minion.MinionService/put',
+            minion__pb2.PutRequest.SerializeToString,
+            minion__pb2.Empty.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def get(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/minion.MinionService/get',
+            minion__pb2.GetRequest.SerializeToString,
+            minion__pb2.GetResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def deleteBlock(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/minion.MinionService/deleteBlock',
+            minion__pb2.DeleteRequest.SerializeToString,
+            minion__pb2.DeleteResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def deleteBlocks(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/minion.MinionService/deleteBlocks',
+            minion__pb2.DeleteBlocksRequest.SerializeToString,
+            minion__pb2.DeleteBlocksResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def multiGet(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/minion.MinionService/multiGet',
+            minion__pb2.MultiGetRequest.SerializeToString,
+            minion__pb2.BlockData.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def forward(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/minion.MinionService/forward',
+            minion__pb2.ForwardRequest.SerializeToString,
+            minion__pb2.Empty.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -0,0 +1,173 @@
+""" Heartbeats from a storage node to the master.
+
+Every ``DEEDS_HEARTBEAT_INTERVAL`` seconds the node tells the master at
+``DEEDS_MASTER_ADDRESS`` who it is (``DEEDS_NODE_ID``, the id it has in the master's
+``chunkServers``), how much space it has, how busy it is, and which blocks it stored or
+deleted since the last heartbeat the master answered. Changes that could not be delivered
+are sent again with the next one. When the master asks for it (after its own restart, or
+after it gave the node up for dead) the whole inventory is sent in pages instead.
+
+The master answers with blocks that no file refers to any more, which are deleted here,
+and with the new deadlines of blocks whose file's TTL changed (see ``reclaim``). The master
+sends those again until a heartbeat acknowledges them, which the node does only once they
+are applied.
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import grpc
+
+import master_pb2
+import master_pb2_grpc
+
+
+logger = logging.getLogger(__name__)
+
+INTERVAL = 5
+REPORT_PAGE = 50000
+# Weight of the newest request in the latency average
+LATENCY_ALPHA = 0.1
+
+
+class Inventory:
+    """The blocks stored on this node, and the changes the master has not seen yet."""
+
+    def __init__(self):
+        self.blocks = set()
+        self.added = set()
+        self.removed = set()
+        self.lock = threading.Lock()
+
+    def scan(self, directory):
+        with self.lock:
+            self.blocks = {name for name in os.listdir(directory) if not name.startswith(".")}
+
+    def add(self, block_uuid):
+        with self.lock:
+            self.blocks.add(block_uuid)
+            self.added.add(block_uuid)
+            self.removed.discard(block_uuid)
+
+    def remove(self, block_uuid):
+        with self.lock:
+            self.blocks.discard(block_uuid)
+            self.removed.add(block_uuid)
+            self.added.discard(block_uuid)
+
+    def take(self):
+        """The pending ``(added, removed)`` changes; ``give_back`` them if they were not delivered."""
+        with self.lock:
+            changes = (self.added, self.removed)
+            self.added, self.removed = set(), set()
+            return changes
+
+    def give_back(self, added, removed):
+        with self.lock:
+            # Newer changes win over the ones being returned
+            self.added |= added - self.removed
+            self.removed |= removed - self.added
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.blocks)
+
+
+class Load:
+    """Requests in flight and an average of their duration."""
+
+    def __init__(self):
+        self.inflight = 0
+        self.latency = 0.0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self):
+        start = time.monotonic()
+        with self._lock:
+            self.inflight += 1
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - start
+            with self._lock:
+                self.inflight -= 1
+                self.latency += LATENCY_ALPHA * (elapsed - self.latency)
+
+
+INVENTORY = Inventory()
+LOAD = Load()
+
+
+class Heartbeater:
+    """Background heartbeats of node ``node_id`` to the master at ``address``.
+
+    ``delete`` is called with the stale block uuids the master returns, ``deadlines`` (if
+    given) with the ``(block_uuid, expire_at)`` pairs it sends.
+    """
+
+    def __init__(self, node_id, address, data_dir, delete, interval=INTERVAL, deadlines=None):
+        self.node_id = node_id
+        self.address = address
+        self.data_dir = data_dir
+        self.delete = delete
+        self.deadlines = deadlines
+        self.interval = interval
+        self.deadlines_ack = 0      # deadlines_seq of the last deadlines applied
+        self._thread = threading.Thread(target=self._run, name="heartbeat", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _beat(self, **fields):
+        st = os.statvfs(self.data_dir)
+        return master_pb2.Heartbeat(
+            node_id=self.node_id,
+            total_bytes=st.f_blocks * st.f_frsize,
+            free_bytes=st.f_bavail * st.f_frsize,
+            inflight=LOAD.inflight,
+            latency=LOAD.latency,
+            deadlines_ack=self.deadlines_ack,
+            **fields,
+        )
+
+    def _run(self):
+        channel = grpc.insecure_channel(self.address)
+        stub = master_pb2_grpc.MasterServiceStub(channel)
+        full_report = True
+        while True:
+            try:
+                if full_report:
+                    response = self._report(stub)
+                else:
+                    added, removed = INVENTORY.take()
+                    try:
+                        response = stub.heartbeat(self._beat(added=added, removed=removed), timeout=self.interval)
+                    except grpc.RpcError:
+                        INVENTORY.give_back(added, removed)
+                        raise
+                full_report = response.send_full_report
+                if response.deadlines:
+                    if self.deadlines is not None:
+                        self.deadlines([(d.block_uuid, d.expire_at) for d in response.deadlines])
+                    self.deadlines_ack = response.deadlines_seq
+                if response.stale:
+                    logger.info(f"Master reports {len(response.stale)} stale blocks")
+                    self.delete(response.stale)
+            except grpc.RpcError as e:
+                logger.warning(f"Heartbeat to {self.address} failed: {e.code()}")
+            time.sleep(self.interval)
+
+    def _report(self, stub):
+        """Send the whole inventory; changes from before it are part of it."""
+        INVENTORY.take()
+        blocks = INVENTORY.snapshot()
+        logger.info(f"Sending a full report of {len(blocks)} blocks")
+        pages = [blocks[start:start + REPORT_PAGE] for start in range(0, len(blocks), REPORT_PAGE)] or [[]]
+        for number, page in enumerate(pages):
+            beat = self._beat(added=page, full_report=True, page=number, last_page=number == len(pages) - 1)
+            response = stub.heartbeat(beat, timeout=self.interval)
+        return response
@@ -0,0 +1,145 @@
+""" Expiry of blocks on the storage node itself.
+
+Blocks of files with a TTL arrive with the file's deadline (``PutRequest.expire_at``), and
+the master sends new deadlines in its heartbeat answers when a file's TTL changes. The
+node keeps them in an index and deletes the blocks that are due in batches, without
+waiting for the master: expiry goes on while the master is down, and the master does not
+have to send a delete per block when a file expires. The deletions reach the master as the
+``removed`` blocks of the next heartbeat.
+
+A block is only deleted ``DEEDS_EXPIRY_GRACE`` seconds after its deadline, which leaves
+time for a TTL extension made at the last moment to arrive.
+
+Only nodes that send heartbeats expire blocks: the others would never hear of a TTL
+extension, so the master has the blocks of expired files deleted there like any other
+garbage.
+
+The index is a journal file (``.expiry`` in the data directory) of ``uuid deadline``
+lines, a deadline of 0 dropping the entry. It is compacted when the node starts.
+"""
+import heapq
+import logging
+import os
+import threading
+import time
+
+import minion_pb2
+
+
+logger = logging.getLogger(__name__)
+
+GRACE = 60
+INTERVAL = 1
+BATCH = 1024
+JOURNAL = ".expiry"
+
+
+class ExpiryIndex:
+    """Deadlines of the blocks in ``data_dir`` that have one."""
+
+    def __init__(self, data_dir):
+        self.path = os.path.join(data_dir, JOURNAL)
+        self.deadlines = {}         # block uuid -> deadline (epoch seconds)
+        self._due = []              # heap of (deadline, block uuid), stale entries included
+        self._journal = None
+        self._lock = threading.Lock()
+
+    def load(self, blocks):
+        """Read the journal, keeping the entries of ``blocks`` (the uuids on disk), and rewrite it."""
+        deadlines = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        block_uuid, deadline = line.split()
+                        deadline = int(deadline)
+                    except ValueError:
+                        # Torn last line
+                        continue
+                    if deadline:
+                        deadlines[block_uuid] = deadline
+                    else:
+                        deadlines.pop(block_uuid, None)
+        with self._lock:
+            self.deadlines = {block_uuid: deadline for block_uuid, deadline in deadlines.items()
+                              if block_uuid in blocks}
+            self._due = [(deadline, block_uuid) for block_uuid, deadline in self.deadlines.items()]
+            heapq.heapify(self._due)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                f.writelines(f"{block_uuid} {deadline}\n" for block_uuid, deadline in self.deadlines.items())
+            os.replace(tmp, self.path)
+            self._journal = open(self.path, "a")
+        logger.info(f"{len(self.deadlines)} blocks with a deadline")
+
+    def set(self, items):
+        """Record ``(block_uuid, deadline)`` pairs; a deadline of 0 drops the entry."""
+        with self._lock:
+            lines = []
+            for block_uuid, deadline in items:
+                if deadline:
+                    self.deadlines[block_uuid] = deadline
+                    heapq.heappush(self._due, (deadline, block_uuid))
+                elif self.deadlines.pop(block_uuid, None) is None:
+                    continue
+                lines.append(f"{block_uuid} {deadline}\n")
+            if lines and self._journal is not None:
+                self._journal.writelines(lines)
+                self._journal.flush()
+
+    def forget(self, block_uuids):
+        """The blocks are gone; their entries follow."""
+        self.set((block_uuid, 0) for block_uuid in block_uuids)
+
+    def due(self, now, limit=BATCH):
+        """Up to ``limit`` blocks whose deadline is at or before ``now``."""
+        found = []
+        with self._lock:
+            while self._due and self._due[0][0] <= now and len(found) < limit:
+                deadline, block_uuid = heapq.heappop(self._due)
+                # Superseded by a later deadline, or dropped
+                if self.deadlines.get(block_uuid) == deadline:
+                    found.append(block_uuid)
+        return found
+
+
+class Reclaimer:
+    """Background deletion of the due blocks of ``index`` with ``delete`` (a batch delete
+    returning ``[(block_uuid, status, error)]``)."""
+
+    def __init__(self, index, delete, grace=GRACE, interval=INTERVAL, batch=BATCH):
+        self.index = index
+        self.delete = delete
+        self.grace = grace
+        self.interval = interval
+        self.batch = batch
+        self.reclaimed = 0
+        self._thread = threading.Thread(target=self._run, name="reclaim", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            try:
+                self.reclaim(int(time.time()))
+            except Exception as e:
+                logger.error(f"Reclaiming expired blocks failed: {e}")
+            time.sleep(self.interval)
+
+    def reclaim(self, now):
+        """Delete everything due at ``now``, a batch at a time; returns the number deleted."""
+        total = 0
+        while True:
+            batch = self.index.due(now - self.grace, self.batch)
+            if not batch:
+                break
+            results = self.delete(batch)
+            total += sum(1 for _, status, _ in results if status == minion_pb2.OK)
+            # Blocks that could not be deleted are left to the master's reconciliation
+            self.index.forget(block_uuid for block_uuid, _, _ in results)
+        if total:
+            self.reclaimed += total
+            logger.info(f"Reclaimed {total} expired blocks")
+        return total
@@ -5,6 +5,9 @@ import minion_pb2
 import minion_pb2_grpc
 from concurrent import futures
 
+from .heartbeat import Heartbeater, INVENTORY, LOAD
+from .reclaim import ExpiryIndex, Reclaimer
+
 # Configure logging
 logging.basicConfig(level=logging.DEBUG if os.getenv("DEBUG_MODE", "false").lower() == "true" else logging.INFO,
                     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -21,31 +24,73 @@ if not os.path.exists(DATA_DIR):
     os.makedirs(DATA_DIR)
     logger.info(f"Created data directory at {DATA_DIR}")
 
+# Id of this node in the master's chunkServers, and where to send heartbeats
+NODE_ID = os.getenv("DEEDS_NODE_ID")
+MASTER_ADDRESS = os.getenv("DEEDS_MASTER_ADDRESS")
+HEARTBEAT_INTERVAL = float(os.getenv("DEEDS_HEARTBEAT_INTERVAL", "5"))
+# Seconds past their deadline after which blocks are deleted here
+EXPIRY_GRACE = int(os.getenv("DEEDS_EXPIRY_GRACE", "60"))
+
+EXPIRY = ExpiryIndex(DATA_DIR)
+
 
 class MinionService(minion_pb2_grpc.MinionServiceServicer):
     class Chunks:
         blocks = {}
 
-        def put(self, block_uuid, data, minions):
+        def put(self, block_uuid, data, minions, expire_at=0):
             block_addr = os.path.join(DATA_DIR, str(block_uuid))
-            with open(block_addr, 'w') as f:
+            with open(block_addr, 'wb') as f:
                 f.write(data)
+            INVENTORY.add(str(block_uuid))
+            # A block rewritten without a deadline loses the old one
+            EXPIRY.set([(str(block_uuid), expire_at)])
             logger.info(f"Stored block {block_uuid} at {block_addr}")
 
             # If there are more minions, forward the data
             if len(minions) > 0:
-                self.forward(block_uuid, data, minions)
+                self.forward(block_uuid, data, minions, expire_at)
 
         def get(self, block_uuid):
             block_addr = os.path.join(DATA_DIR, str(block_uuid))
             if not os.path.isfile(block_addr):
                 logger.warning(f"Block {block_uuid} not found at {block_addr}")
                 return None
-            with open(block_addr, 'r') as f:
+            with open(block_addr, 'rb') as f:
                 logger.info(f"Retrieved block {block_uuid} from {block_addr}")
                 return f.read()
 
-        def forward(self, block_uuid, data, minions):
+        def get_many(self, block_uuids):
+            """Yield ``(block_uuid, status, data)`` for each block, reading through raw file
+            descriptors: one open, fstat and positioned read per block."""
+            for block_uuid in block_uuids:
+                try:
+                    fd = os.open(os.path.join(DATA_DIR, str(block_uuid)), os.O_RDONLY)
+                except FileNotFoundError:
+                    yield block_uuid, minion_pb2.NOT_FOUND, b""
+                    continue
+                except OSError as e:
+                    logger.error(f"Reading block {block_uuid} failed: {e}")
+                    yield block_uuid, minion_pb2.FAILED, b""
+                    continue
+                status, data = minion_pb2.OK, b""
+                try:
+                    size = os.fstat(fd).st_size
+                    data = os.pread(fd, size, 0)
+                    # Regular files rarely return short reads, but they may
+                    while len(data) < size:
+                        chunk = os.pread(fd, size - len(data), len(data))
+                        if not chunk:
+                            break
+                        data += chunk
+                except OSError as e:
+                    logger.error(f"Reading block {block_uuid} failed: {e}")
+                    status, data = minion_pb2.FAILED, b""
+                finally:
+                    os.close(fd)
+                yield block_uuid, status, data
+
+        def forward(self, block_uuid, data, minions, expire_at=0):
             logger.debug(f"Forwarding block {block_uuid} to minions: {minions}")
             minion = minions[0]
             minions = minions[1:]
@@ -54,7 +99,8 @@ class MinionService(minion_pb2_grpc.MinionServiceServicer):
             # Create a gRPC channel and stub to call the next Minion
             with grpc.insecure_channel(f"{host}:{port}") as channel:
                 stub = minion_pb2_grpc.MinionServiceStub(channel)
-                stub.put(minion_pb2.PutRequest(block_uuid=block_uuid, data=data, minions=[minion_pb2.Minion(host=h, port=p) for h, p in minions]))
+                stub.put(minion_pb2.PutRequest(block_uuid=block_uuid, data=data, minions=[minion_pb2.Minion(host=h, port=p) for h, p in minions],
+                                               expire_at=expire_at))
             logger.info(f"Forwarded block {block_uuid} to {host}:{port}")
 
         def _secure_delete(self, path, passes=1):
@@ -66,6 +112,48 @@ class MinionService(minion_pb2_grpc.MinionServiceServicer):
                     delfile.write(os.urandom(length))
             os.remove(path)
 
+        def delete_many(self, block_uuids):
+            """Overwrite and remove a batch of blocks; returns ``[(block_uuid, status, error)]``.
+
+            The random bytes for the whole batch come from a single ``os.urandom`` call and are
+            written with ``pwrite`` slices of it.
+            """
+            results, victims = [], []
+            for block_uuid in block_uuids:
+                path = os.path.join(DATA_DIR, str(block_uuid))
+                try:
+                    fd = os.open(path, os.O_WRONLY)
+                except FileNotFoundError:
+                    results.append((block_uuid, minion_pb2.NOT_FOUND, ""))
+                    continue
+                except OSError as e:
+                    results.append((block_uuid, minion_pb2.FAILED, str(e)))
+                    continue
+                try:
+                    size = os.fstat(fd).st_size
+                except OSError as e:
+                    os.close(fd)
+                    results.append((block_uuid, minion_pb2.FAILED, str(e)))
+                    continue
+                results.append(None)
+                victims.append((len(results) - 1, block_uuid, path, fd, size))
+            noise = memoryview(os.urandom(sum(size for *_, size in victims)))
+            offset = 0
+            for position, block_uuid, path, fd, size in victims:
+                try:
+                    os.pwrite(fd, noise[offset:offset + size], 0)
+                    os.remove(path)
+                    INVENTORY.remove(str(block_uuid))
+                    EXPIRY.forget([str(block_uuid)])
+                    results[position] = (block_uuid, minion_pb2.OK, "")
+                except OSError as e:
+                    results[position] = (block_uuid, minion_pb2.FAILED, str(e))
+                finally:
+                    os.close(fd)
+                offset += size
+            logger.info(f"Deleted {len(victims)} of {len(block_uuids)} blocks")
+            return results
+
         def delete_block(self, block_uuid):
             block_addr = os.path.join(DATA_DIR, str(block_uuid))
             if not os.path.isfile(block_addr):
@@ -73,6 +161,8 @@ class MinionService(minion_pb2_grpc.MinionServiceServicer):
                 return minion_pb2.DeleteResponse(success=False)
             # os.remove(block_addr)
             self._secure_delete(block_addr)
+            INVENTORY.remove(str(block_uuid))
+            EXPIRY.forget([str(block_uuid)])
             logger.info(f"Deleted block {block_uuid} from {block_addr}")
             return minion_pb2.DeleteResponse(success=True)
 
@@ -81,17 +171,19 @@ class MinionService(minion_pb2_grpc.MinionServiceServicer):
         data = request.data
         minions = [(m.host, m.port) for m in request.minions]
         logger.debug(f"Received put request for block {block_uuid} with data size {len(data)} and minions {minions}")
-        self.Chunks().put(block_uuid, data, minions)
+        with LOAD.track():
+            self.Chunks().put(block_uuid, data, minions, request.expire_at)
         return minion_pb2.Empty()
 
     def get(self, request, context):
         block_uuid = request.block_uuid
         logger.debug(f"Received get request for block {block_uuid}")
-        data = self.Chunks().get(block_uuid)
+        with LOAD.track():
+            data = self.Chunks().get(block_uuid)
         if data is None:
             context.set_details("Block not found.")
             context.set_code(grpc.StatusCode.NOT_FOUND)
-            return minion_pb2.GetResponse(data="")
+            return minion_pb2.GetResponse(data=b"")
         return minion_pb2.GetResponse(data=data)
 
     def deleteBlock(self, request, context):
@@ -100,21 +192,44 @@ class MinionService(minion_pb2_grpc.MinionServiceServicer):
         response = self.Chunks().delete_block(block_uuid)
         return response
 
+    def deleteBlocks(self, request, context):
+        logger.debug(f"Received delete request for {len(request.block_uuids)} blocks")
+        results = self.Chunks().delete_many(request.block_uuids)
+        return minion_pb2.DeleteBlocksResponse(results=[
+            minion_pb2.BlockResult(block_uuid=block_uuid, status=status, error=error)
+            for block_uuid, status, error in results
+        ])
+
+    def multiGet(self, request, context):
+        logger.debug(f"Received get request for {len(request.block_uuids)} blocks")
+        with LOAD.track():
+            for block_uuid, status, data in self.Chunks().get_many(request.block_uuids):
+                yield minion_pb2.BlockData(block_uuid=block_uuid, status=status, data=data)
+
     def forward(self, request, context):
         block_uuid = request.block_uuid
         data = request.data
         minions = [(m.host, m.port) for m in request.minions]
         logger.debug(f"Received forward request for block {block_uuid} with data size {len(data)} and minions {minions}")
-        self.Chunks().forward(block_uuid, data, minions)
+        self.Chunks().forward(block_uuid, data, minions, request.expire_at)
         return minion_pb2.Empty()
 
 # Start the gRPC server
 def serve(address):
+    INVENTORY.scan(DATA_DIR)
+    EXPIRY.load(set(INVENTORY.snapshot()))
     server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
     minion_pb2_grpc.add_MinionServiceServicer_to_server(MinionService(), server)
     server.add_insecure_port(address)
     server.start()
     logger.info(f"Minion Server running on port {address.split(':')[-1]}")
+    if NODE_ID and MASTER_ADDRESS:
+        Reclaimer(EXPIRY, MinionService.Chunks().delete_many, EXPIRY_GRACE).start()
+        Heartbeater(NODE_ID, MASTER_ADDRESS, DATA_DIR, MinionService.Chunks().delete_many, HEARTBEAT_INTERVAL,
+                    EXPIRY.set).start()
+    else:
+        # No TTL change would reach this node: the master has expired blocks deleted here
+        logger.warning("DEEDS_NODE_ID or DEEDS_MASTER_ADDRESS not set, not sending heartbeats nor expiring blocks")
     server.wait_for_termination()
 
 if __name__ == "__main__":
@@ -0,0 +1,90 @@
+"""In-memory stand-ins for the master and the minions, driven through a real DeedsClient"""
+import json
+import uuid
+
+import master_pb2
+import minion_pb2
+import pytest
+
+from deedsclient.channels import MinionUnavailable
+from deedsclient.deedsclient import DeedsClient
+
+BLOCK_SIZE = 8
+
+
+class FakeMaster:
+    """Block maps of files held in memory, handed out the way the master's write does"""
+
+    def __init__(self):
+        self.files = {}         # path -> (size, [block uuid])
+        self.versions = {}      # path -> number of writes
+        self.lease_ttl = 0
+        self.calls = []         # names of the RPCs asked for a file's block map
+        self.replicas = ["A"]   # minions new blocks are placed on, primary first
+
+    def getBlockSize(self, request):
+        return master_pb2.BlockSize(size=BLOCK_SIZE)
+
+    def getFileTableEntry(self, request):
+        if request.fname not in self.files:
+            return master_pb2.FileMapping()
+        return master_pb2.FileMapping(attrs=json.dumps({"st_size": self.files[request.fname][0]}))
+
+    def _blocks(self, uuids):
+        return [master_pb2.Block(block_uuid=u, node_id=self.replicas[0], block_index=i, replicas=self.replicas)
+                for i, u in enumerate(uuids)]
+
+    def open(self, request):
+        self.calls.append("open")
+        return master_pb2.FileLease(blocks=self._blocks(self.files[request.fname][1]), block_size=BLOCK_SIZE,
+                                    version=self.versions[request.fname], lease_ttl=self.lease_ttl)
+
+    def read(self, request):
+        self.calls.append("read")
+        return master_pb2.FileMapping(blocks=self._blocks(self.files[request.fname][1]),
+                                      version=self.versions[request.fname])
+
+    def write(self, request):
+        size, uuids = self.files.get(request.dest, (0, []))
+        while len(uuids) * BLOCK_SIZE < request.size:
+            uuids.append(str(uuid.uuid4()))
+        self.files[request.dest] = (request.size, uuids)
+        self.versions[request.dest] = self.versions.get(request.dest, 0) + 1
+        return master_pb2.BlockList(blocks=self._blocks(uuids), version=self.versions[request.dest])
+
+
+class FakePool:
+    """Minions storing blocks in a dict, counting puts and gets per block"""
+
+    def __init__(self):
+        self.blocks = {}
+        self.puts = []
+        self.gets = []
+        self.down = set()       # addresses of minions that do not answer
+
+    def call(self, address, method, request, timeout=None):
+        if method == "get":
+            self.gets.append(request.block_uuid)
+            return minion_pb2.GetResponse(data=self.blocks.get(request.block_uuid, b""))
+        assert method == "put"
+        self.puts.append(request.block_uuid)
+        self.blocks[request.block_uuid] = request.data
+        return minion_pb2.Empty()
+
+    def stream(self, address, method, request, timeout=None):
+        assert method == "multiGet"
+        if address in self.down:
+            raise MinionUnavailable(address)
+        self.gets.extend(request.block_uuids)
+        return [minion_pb2.BlockData(block_uuid=block_uuid, status=minion_pb2.OK, data=self.blocks[block_uuid])
+                if block_uuid in self.blocks else
+                minion_pb2.BlockData(block_uuid=block_uuid, status=minion_pb2.NOT_FOUND)
+                for block_uuid in request.block_uuids]
+
+
+@pytest.fixture
+def client():
+    client = DeedsClient("fake:0")
+    client._master_stub = FakeMaster()
+    client.transfer.pool = FakePool()
+    return client
@@ -0,0 +1,94 @@
+import time
+
+import master_pb2
+
+from deedsclient.cache import AttrCache
+
+
+def test_entries_expire_after_their_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    attrs = AttrCache(ttl=1.0, negative_ttl=0.5)
+    attrs.put("/f", {"st_size": 1})
+    attrs.put("/missing", None)
+    now[0] += 0.6
+    assert attrs.get("/f") == (True, {"st_size": 1})
+    assert attrs.get("/missing") == (False, None)
+    now[0] += 0.5
+    assert attrs.get("/f") == (False, None)
+
+
+def test_entries_never_outlive_the_files_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    attrs = AttrCache(ttl=10.0)
+    attrs.put("/f", {"expire_at": 1002})
+    attrs.put("/gone", {"expire_at": 999})
+    assert attrs.get("/gone") == (False, None)
+    now[0] += 2
+    assert attrs.get("/f") == (False, None)
+
+
+def test_invalidate_tree_drops_everything_below(monkeypatch):
+    attrs = AttrCache()
+    for path in ("/d", "/d/f", "/d/e/g", "/dx"):
+        attrs.put(path, {})
+    attrs.invalidate_tree("/d")
+    assert [path for path in ("/d", "/d/f", "/d/e/g", "/dx") if attrs.get(path)[0]] == ["/dx"]
+
+
+def count_lookups(client, monkeypatch):
+    lookups = []
+    lookup = client.master_stub.getFileTableEntry
+    monkeypatch.setattr(client.master_stub, "getFileTableEntry",
+                        lambda request: lookups.append(request.fname) or lookup(request))
+    return lookups
+
+
+def test_stat_is_served_from_the_cache(client, monkeypatch):
+    client.write("/f", b"abc", 0, None)
+    lookups = count_lookups(client, monkeypatch)
+    assert client.stat("/f")["st_size"] == 3
+    assert client.stat("/f")["st_size"] == 3
+    assert client.stat("/nope") is None
+    assert client.stat("/nope") is None
+    assert lookups == ["/f", "/nope"]
+
+
+def test_own_write_invalidates_the_size(client):
+    client.write("/f", b"abc", 0, None)
+    assert client.stat("/f")["st_size"] == 3
+    client.write("/f", b"defgh", 3, None)
+    assert client.stat("/f")["st_size"] == 8
+
+
+def test_create_and_unlink_invalidate_the_path_and_its_parent(client, monkeypatch):
+    master = client.master_stub
+
+    def create(request):
+        master.write(master_pb2.WriteRequest(dest=request.path))
+        return request
+
+    def delete(request):
+        del master.files[request.fname]
+        return master_pb2.FileMapping()
+
+    master.create, master.delete = create, delete
+    client.attr_cache.put("/d", {"st_nlink": 1})
+    assert client.stat("/d/f") is None
+    client.create("/d/f", 0o644)
+    assert client.attr_cache.get("/d") == (False, None)
+    assert client.stat("/d/f") == {"st_size": 0}
+    client.attr_cache.put("/d", {"st_nlink": 2})
+    client.unlink("/d/f")
+    assert client.attr_cache.get("/d") == (False, None)
+    assert client.stat("/d/f") is None
+
+
+def test_rename_drops_cached_attributes_below_both_paths(client):
+    master = client.master_stub
+    master.rename = lambda request: master_pb2.Location(path=request.dest)
+    for path in ("/a", "/a/f", "/b", "/b/f"):
+        client.attr_cache.put(path, {})
+    client.rename("/a", "/b")
+    assert [path for path in ("/a", "/a/f", "/b", "/b/f") if client.attr_cache.get(path)[0]] == []
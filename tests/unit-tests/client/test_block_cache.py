@@ -0,0 +1,75 @@
+from deedsclient import cache
+from deedsclient.cache import BlockCache
+from deedsclient.deedsclient import DeedsClient
+
+
+def test_put_from_before_an_invalidation_is_dropped():
+    blocks = BlockCache()
+    epoch = blocks.epoch()
+    blocks.invalidate(["a"])
+    blocks.put("a", b"old", epoch)
+    blocks.put("b", b"other", epoch)
+    assert blocks.get("a") is None
+    assert blocks.get("b") == b"other"
+    blocks.put("a", b"new", blocks.epoch())
+    assert blocks.get("a") == b"new"
+
+
+def test_put_older_than_the_remembered_invalidations_is_dropped(monkeypatch):
+    monkeypatch.setattr(cache, "MAX_INVALIDATED", 2)
+    blocks = BlockCache()
+    epoch = blocks.epoch()
+    blocks.invalidate(["a"])
+    blocks.invalidate(["b", "c"])
+    blocks.put("a", b"old", epoch)
+    assert blocks.get("a") is None
+
+
+def test_reads_are_served_from_the_cache(client):
+    client.write("/f", b"0123456789", 0, None)
+    assert client.read("/f", 10, 0, None) == b"0123456789"
+    pool = client.transfer.pool
+    pool.gets.clear()
+    assert client.read("/f", 10, 0, None) == b"0123456789"
+    assert pool.gets == []
+
+
+def test_overwrite_by_another_client_evicts_cached_blocks(client):
+    client.write("/f", b"0123456789", 0, None)
+    assert client.read("/f", 10, 0, None) == b"0123456789"
+
+    # Same master and minions, another client: the overwrite keeps the block uuids
+    other = DeedsClient("fake:0")
+    other._master_stub = client.master_stub
+    other.transfer.pool = client.transfer.pool
+    other.write("/f", b"abcdefghij", 0, None)
+
+    assert client.read("/f", 10, 0, None) == b"abcdefghij"
+
+
+def test_own_writes_keep_other_cached_blocks(client):
+    client.write("/f", b"0123456789abcdef", 0, None)
+    client.read("/f", 16, 0, None)
+    client.write("/f", b"XY", 0, None)
+    pool = client.transfer.pool
+    pool.gets.clear()
+    assert client.read("/f", 16, 0, None) == b"XY23456789abcdef"
+    # Only the rewritten block is fetched again
+    assert pool.gets == [client.master_stub.files["/f"][1][0]]
+
+
+def test_fetch_racing_with_a_write_does_not_cache_old_bytes(client):
+    client.write("/f", b"01234567", 0, None)
+    pool = client.transfer.pool
+    get = pool.stream
+
+    def write_during_get(address, method, request, timeout=None):
+        responses = get(address, method, request, timeout)
+        if pool.stream is write_during_get:
+            pool.stream = get
+            client.write("/f", b"abcdefgh", 0, None)
+        return responses
+
+    pool.stream = write_during_get
+    assert client.read("/f", 8, 0, None) == b"01234567"
+    assert client.read("/f", 8, 0, None) == b"abcdefgh"
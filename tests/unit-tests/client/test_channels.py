@@ -0,0 +1,81 @@
+from concurrent import futures
+
+import grpc
+import pytest
+
+import minion_pb2
+import minion_pb2_grpc
+
+from deedsclient.channels import MinionChannelPool, MinionUnavailable
+
+
+class Minion(minion_pb2_grpc.MinionServiceServicer):
+    def __init__(self):
+        self.asked = []
+
+    def get(self, request, context):
+        self.asked.append(request.block_uuid)
+        return minion_pb2.GetResponse()
+
+
+@pytest.fixture
+def servicer():
+    return Minion()
+
+
+@pytest.fixture
+def minion(servicer):
+    server = grpc.server(futures.ThreadPoolExecutor(2))
+    minion_pb2_grpc.add_MinionServiceServicer_to_server(servicer, server)
+    port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+    yield f"127.0.0.1:{port}"
+    server.stop(None)
+
+
+def unused_address():
+    server = grpc.server(futures.ThreadPoolExecutor(1))
+    port = server.add_insecure_port("127.0.0.1:0")
+    return f"127.0.0.1:{port}"
+
+
+def test_calls_to_one_minion_share_a_channel(minion, servicer):
+    pool = MinionChannelPool()
+    stub = pool.get_stub(minion)
+    for name in ["a", "b", "c"]:
+        pool.call(minion, "get", minion_pb2.GetRequest(block_uuid=name))
+    assert servicer.asked == ["a", "b", "c"]
+    assert pool.get_stub(minion) is stub
+    assert pool.health() == {minion: {"connected": True, "healthy": True, "failures": 0}}
+    pool.close()
+    assert pool.health() == {}
+
+
+def test_unreachable_minion_is_backed_off_without_dialling_again():
+    pool = MinionChannelPool(connect_timeout=0.2, backoff_base=60)
+    address = unused_address()
+    with pytest.raises(MinionUnavailable, match="timed out"):
+        pool.get_stub(address)
+    with pytest.raises(MinionUnavailable, match="retrying"):
+        pool.get_stub(address)
+    assert pool.health()[address] == {"connected": False, "healthy": False, "failures": 1}
+
+
+def test_failure_drops_the_channel_until_the_backoff_is_over(minion):
+    pool = MinionChannelPool(backoff_base=0)
+    stub = pool.get_stub(minion)
+    pool.report_failure(minion)
+    assert pool.health()[minion]["connected"] is False
+    assert pool.get_stub(minion) is not stub
+    pool.report_success(minion)
+    assert pool.health()[minion]["healthy"] is True
+
+
+def test_idle_channels_are_closed(minion):
+    pool = MinionChannelPool(idle_timeout=10)
+    pool.get_stub(minion)
+    used = pool._entries[minion].last_used
+    pool._evict_idle(used + 5)
+    assert pool.health()[minion]["connected"] is True
+    pool._evict_idle(used + 11)
+    assert pool.health()[minion]["connected"] is False
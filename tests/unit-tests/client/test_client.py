@@ -0,0 +1,44 @@
+from concurrent import futures
+
+import grpc
+import master_pb2
+import master_pb2_grpc
+import pytest
+
+from deedsclient import deedsclient
+from deedsclient.deedsclient import DeedsClient
+
+
+class Master(master_pb2_grpc.MasterServiceServicer):
+    def ping(self, request, context):
+        return master_pb2.Empty()
+
+
+@pytest.fixture
+def master():
+    server = grpc.server(futures.ThreadPoolExecutor(2))
+    master_pb2_grpc.add_MasterServiceServicer_to_server(Master(), server)
+    port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+    yield f"127.0.0.1:{port}"
+    server.stop(None)
+
+
+def test_construction_does_not_dial_the_master(monkeypatch):
+    dialled = []
+    channel = grpc.insecure_channel
+    monkeypatch.setattr(deedsclient.grpc, "insecure_channel",
+                        lambda address: dialled.append(address) or channel(address))
+    client = DeedsClient("127.0.0.1:1")
+    assert dialled == []
+    assert client.channel is None
+    stub = client.master_stub
+    assert client.master_stub is stub
+    assert dialled == ["127.0.0.1:1"]
+
+
+def test_ping_reports_whether_the_master_answers(master):
+    assert DeedsClient(master).ping(timeout=5)
+    server = grpc.server(futures.ThreadPoolExecutor(1))
+    unused = f"127.0.0.1:{server.add_insecure_port('127.0.0.1:0')}"
+    assert not DeedsClient(unused).ping(timeout=1)
@@ -0,0 +1,96 @@
+import errno
+
+import grpc
+import pytest
+
+try:
+    from deedsclient import deedsfs
+except (ImportError, OSError):
+    # fusepy needs libfuse to import
+    pytest.skip("libfuse is not available", allow_module_level=True)
+
+from deedsclient.transfer import BlockUploadError
+
+
+class NotFound(grpc.RpcError):
+    def code(self):
+        return grpc.StatusCode.NOT_FOUND
+
+
+class FakeClient:
+    block_size = 4
+
+    def __init__(self, error=None):
+        self.error = error
+        self.released = []
+
+    def write_extents(self, path, extents):
+        if self.error is not None:
+            raise self.error
+
+    def release(self, path, fh):
+        self.released.append(fh)
+        return 0
+
+
+@pytest.fixture
+def fs():
+    fs = deedsfs.DEEDSFS()
+    fs._mountpoint = "/mnt"
+    return fs
+
+
+def use_client(fs, client):
+    fs.client = fs.writeback.client = client
+    return client
+
+
+@pytest.mark.parametrize("error, expected", [
+    (NotFound(), errno.ENOENT),
+    (BlockUploadError({0: "down"}, 0), errno.EIO),
+    (IOError("minion down"), errno.EIO),
+])
+def test_failed_write_maps_to_errno(fs, error, expected):
+    use_client(fs, FakeClient(error))
+    fs.writeback.max_handle_bytes = 1
+    with pytest.raises(deedsfs.FuseOSError) as raised:
+        fs.write("/f", b"data", 0, 1)
+    assert raised.value.errno == expected
+
+
+def test_release_frees_the_handle_even_if_the_flush_fails(fs):
+    client = use_client(fs, FakeClient(IOError("minion down")))
+    fs.write("/f", b"data", 0, 7)
+    with pytest.raises(deedsfs.FuseOSError) as raised:
+        fs.release("/f", 7)
+    assert raised.value.errno == errno.EIO
+    assert client.released == [7]
+
+
+def mount_options(fs, monkeypatch, **fuse_options):
+    mounts = []
+    monkeypatch.setattr(deedsfs, "FUSE", lambda ops, mountpoint, **options: mounts.append(options))
+    fs.mount("/mnt/deeds", **fuse_options)
+    [options] = mounts
+    return options
+
+
+def test_mount_passes_the_default_fuse_options(fs, monkeypatch):
+    options = mount_options(fs, monkeypatch)
+    assert options.pop("foreground") is True
+    assert options == {key: value for key, value in deedsfs.FUSE_OPTIONS.items() if value is not None}
+    assert "max_background" not in options
+
+
+def test_mount_options_override_the_defaults(fs, monkeypatch):
+    options = mount_options(fs, monkeypatch, attr_timeout=5.0, kernel_cache=True, max_background=32)
+    assert options["attr_timeout"] == 5.0
+    assert options["kernel_cache"] is True
+    assert options["max_background"] == 32
+    assert options["entry_timeout"] == deedsfs.FUSE_OPTIONS["entry_timeout"]
+
+
+def test_unknown_mount_option_is_refused(fs):
+    with pytest.raises(ValueError, match="direct_io"):
+        fs.mount("/mnt/deeds", direct_io=True)
+    assert fs._mountpoint == "/mnt"
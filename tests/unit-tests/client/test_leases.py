@@ -0,0 +1,64 @@
+import time
+
+from deedsclient.deedsclient import DeedsClient
+
+
+def other_client(client):
+    """Another client of the same master and minions"""
+    other = DeedsClient("fake:0")
+    other._master_stub = client.master_stub
+    other.transfer.pool = client.transfer.pool
+    return other
+
+
+def test_reads_on_a_handle_use_its_lease(client):
+    master = client.master_stub
+    master.lease_ttl = 60
+    client.write("/f", b"0123456789", 0, None)
+    fh = client.open("/f", 0)
+    for offset in range(0, 10, 2):
+        assert client.read("/f", 2, offset, fh) == b"0123456789"[offset:offset + 2]
+    assert master.calls == ["open"]
+
+
+def test_reads_without_a_handle_ask_the_master_every_time(client):
+    client.write("/f", b"0123456789", 0, None)
+    client.read("/f", 10, 0, None)
+    client.read("/f", 10, 0, None)
+    assert client.master_stub.calls == ["read", "read"]
+
+
+def test_expired_lease_is_renewed_and_sees_other_writers(client, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    master = client.master_stub
+    master.lease_ttl = 10
+    client.write("/f", b"0123456789", 0, None)
+    fh = client.open("/f", 0)
+    assert client.read("/f", 16, 0, fh) == b"0123456789"
+    other_client(client).write("/f", b"abcdefghijklmnop", 0, None)
+
+    # Within the lease the handle keeps its block map, and its cached blocks
+    now[0] += 9
+    assert client.read("/f", 16, 0, fh) == b"0123456789"
+    now[0] += 1
+    assert client.read("/f", 16, 0, fh) == b"abcdefghijklmnop"
+    assert master.calls == ["open", "open"]
+
+
+def test_own_write_refreshes_the_handles_block_map(client):
+    master = client.master_stub
+    master.lease_ttl = 60
+    client.write("/f", b"0123", 0, None)
+    fh = client.open("/f", 0)
+    client.write("/f", b"456789abcdef", 4, None)
+    assert client.read("/f", 16, 0, fh) == b"0123456789abcdef"
+    assert master.calls == ["open"]
+    assert client.fd_map[fh].version == master.versions["/f"]
+
+
+def test_release_drops_the_lease(client):
+    client.write("/f", b"0123", 0, None)
+    fh = client.open("/f", 0)
+    client.release("/f", fh)
+    assert fh not in client.fd_map
@@ -0,0 +1,49 @@
+from deedsclient.readahead import Readahead
+
+
+def test_window_doubles_on_sequential_reads_up_to_the_maximum():
+    readahead = Readahead(min_window=4, max_window=16)
+    assert readahead.access(1, 0, 2) == (2, 6)
+    assert readahead.access(1, 2, 2) == (6, 14)
+    assert readahead.access(1, 4, 2) == (14, 30)
+    # Plenty is prefetched already; top up once half of it is read
+    assert readahead.access(1, 6, 2) is None
+    assert readahead.access(1, 8, 14) == (30, 46)
+
+
+def test_random_read_turns_readahead_off_until_reads_are_sequential_again():
+    readahead = Readahead(min_window=4, max_window=16)
+    readahead.access(1, 0, 2)
+    readahead.access(1, 2, 2)
+    assert readahead.access(1, 100, 2) is None
+    assert readahead.access(1, 102, 2) == (104, 108)
+
+
+def test_reads_inside_the_prefetched_range_count_as_sequential():
+    readahead = Readahead(min_window=4, max_window=16)
+    readahead.access(1, 0, 2)
+    assert readahead.access(1, 5, 1) == (6, 14)
+
+
+def test_handles_are_tracked_separately():
+    readahead = Readahead(min_window=4, max_window=16)
+    readahead.access(1, 0, 2)
+    assert readahead.access(2, 50, 2) is None
+    assert readahead.access(1, 2, 2) == (6, 14)
+    readahead.forget(1)
+    assert readahead.access(1, 4, 2) is None
+
+
+def test_sequential_reads_prefetch_the_following_blocks(client):
+    client.readahead = Readahead(min_window=16, max_window=16)
+    client.write("/f", bytes(range(48)), 0, None)
+    pool = client.transfer.pool
+    pool.gets.clear()
+    assert client.read("/f", 8, 0, 1) == bytes(range(8))
+    for future in list(client.transfer._prefetching.values()):
+        future.result()
+    uuids = client.master_stub.files["/f"][1]
+    assert sorted(pool.gets) == sorted(uuids[:3])
+    pool.gets.clear()
+    assert client.read("/f", 16, 8, 1) == bytes(range(8, 24))
+    assert uuids[1] not in pool.gets and uuids[2] not in pool.gets
@@ -0,0 +1,24 @@
+from deedsclient.deedsclient import NODE_MAP
+
+
+def test_writes_go_to_the_primary_with_the_rest_of_the_chain(client):
+    client.master_stub.replicas = ["B", "C"]
+    pool = client.transfer.pool
+    requests = []
+    put = pool.call
+
+    def recording_put(address, method, request, timeout=None):
+        requests.append((address, [f"{m.host}:{m.port}" for m in request.minions]))
+        return put(address, method, request, timeout)
+
+    pool.call = recording_put
+    client.write("/f", b"0123456789", 0, None)
+    assert requests == [(NODE_MAP["B"], [NODE_MAP["C"]])] * 2
+
+
+def test_reads_fall_back_to_other_replicas(client):
+    client.master_stub.replicas = ["A", "B"]
+    client.write("/f", b"0123456789abcdefXYZ", 0, None)
+    client.block_cache.clear()
+    client.transfer.pool.down.add(NODE_MAP["A"])
+    assert client.read("/f", 19, 0, None) == b"0123456789abcdefXYZ"
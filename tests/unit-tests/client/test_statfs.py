@@ -0,0 +1,9 @@
+import master_pb2
+
+
+def test_statfs_fills_in_statvfs(client):
+    client.master_stub.statfs = lambda request: master_pb2.StatfsResponse(
+        total_blocks=100, free_blocks=40, block_size=64, total_files=7, free_files=993)
+    assert client.statfs("/") == dict(
+        f_bsize=64, f_frsize=64, f_blocks=100, f_bfree=40, f_bavail=40,
+        f_files=1000, f_ffree=993, f_favail=993)
@@ -0,0 +1,94 @@
+import random
+import threading
+import time
+
+import pytest
+
+import minion_pb2
+from deedsclient.channels import MinionUnavailable
+from deedsclient.transfer import MULTIGET_BLOCKS, BlockReadError, BlockTransfer
+
+
+class FakePool:
+    """Minions serving ``blocks`` (uuid -> bytes), a little slowly and in random order."""
+
+    def __init__(self, blocks):
+        self.blocks = blocks
+        self.inflight = {}
+        self.most = {}
+        self.lock = threading.Lock()
+        self.requests = []
+        self.down = set()
+
+    def stream(self, address, method, request, timeout=None):
+        assert method == "multiGet"
+        with self.lock:
+            self.requests.append((address, list(request.block_uuids)))
+            if address in self.down:
+                raise MinionUnavailable(address)
+            self.inflight[address] = self.inflight.get(address, 0) + 1
+            self.most[address] = max(self.most.get(address, 0), self.inflight[address])
+        try:
+            time.sleep(random.random() / 100)
+            return [minion_pb2.BlockData(block_uuid=block_uuid, status=minion_pb2.OK, data=self.blocks[block_uuid])
+                    if block_uuid in self.blocks else
+                    minion_pb2.BlockData(block_uuid=block_uuid, status=minion_pb2.NOT_FOUND)
+                    for block_uuid in request.block_uuids]
+        finally:
+            with self.lock:
+                self.inflight[address] -= 1
+
+
+def test_blocks_come_back_in_order_and_sliced():
+    blocks = {f"b{i}": bytes([i]) * 8 for i in range(20)}
+    transfer = BlockTransfer(FakePool(blocks))
+    extents = [(f"m{i % 3}", f"b{i}", 0, 8) for i in range(20)]
+    extents[0] = ("m0", "b0", 6, 8)
+    extents[-1] = ("m1", "b19", 0, 3)
+    expected = b"\0" * 2 + b"".join(bytes([i]) * 8 for i in range(1, 19)) + b"\x13" * 3
+    assert transfer.fetch(extents) == expected
+
+
+def test_missing_blocks_are_asked_for_in_one_multiget_per_minion():
+    count = MULTIGET_BLOCKS + 10
+    pool = FakePool({f"b{i}": b"x" for i in range(count)})
+    transfer = BlockTransfer(pool)
+    extents = [("m0" if i < MULTIGET_BLOCKS + 2 else "m1", f"b{i}", 0, 1) for i in range(count)]
+    assert transfer.fetch(extents) == b"x" * count
+    assert sorted((address, len(uuids)) for address, uuids in pool.requests) == [
+        ("m0", 2), ("m0", MULTIGET_BLOCKS), ("m1", 8)]
+
+
+def test_requests_per_minion_stay_within_the_window():
+    pool = FakePool({f"b{i}": b"x" for i in range(40)})
+    transfer = BlockTransfer(pool, max_workers=16, window=2)
+    threads = [threading.Thread(target=transfer.fetch, args=([(f"m{i % 2}", f"b{i}", 0, 1) for i in range(40)],))
+               for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(pool.most.values()) <= 2
+
+
+def test_a_failed_block_fails_the_read():
+    transfer = BlockTransfer(FakePool({"b0": b"x"}))
+    with pytest.raises(BlockReadError):
+        transfer.fetch([("m0", "b0", 0, 1), ("m1", "missing", 0, 1)])
+
+
+def test_blocks_of_an_unreachable_minion_are_read_from_other_replicas():
+    pool = FakePool({f"b{i}": bytes([i]) for i in range(4)})
+    pool.down.add("m0")
+    transfer = BlockTransfer(pool)
+    extents = [(["m0", "m1"], "b0", 0, 1), (["m1", "m0"], "b1", 0, 1),
+               (["m0", "m2", "m1"], "b2", 0, 1), ("m1", "b3", 0, 1)]
+    assert transfer.fetch(extents) == bytes([0, 1, 2, 3])
+    assert sorted(uuids for address, uuids in pool.requests if address == "m0") == [["b0", "b2"]]
+
+
+def test_a_read_fails_when_every_replica_fails():
+    pool = FakePool({"b0": b"x"})
+    pool.down.update(["m0", "m1"])
+    with pytest.raises(MinionUnavailable):
+        BlockTransfer(pool).fetch([(["m0", "m1"], "b0", 0, 1)])
@@ -0,0 +1,65 @@
+import master_pb2
+
+
+def read_all(client, path):
+    size = client.master_stub.files[path][0]
+    return client.read(path, size, 0, None)
+
+
+def test_partial_block_write_keeps_surrounding_bytes(client):
+    client.write("/f", b"abcdefghijklmnop", 0, None)
+    client.write("/f", b"XY", 3, None)
+    assert read_all(client, "/f") == b"abcXYfghijklmnop"
+
+
+def test_hole_reads_as_zeros(client):
+    client.write("/f", b"abc", 0, None)
+    client.write("/f", b"Z", 20, None)
+    assert read_all(client, "/f") == b"abc" + b"\0" * 17 + b"Z"
+
+
+def test_extending_write_leaves_old_partial_block_alone(client):
+    client.write("/f", b"abc", 0, None)
+    pool = client.transfer.pool
+    first = client.master_stub.files["/f"][1][0]
+    pool.puts.clear()
+    pool.gets.clear()
+    client.write("/f", b"0123456789", 8, None)
+    assert first not in pool.puts
+    assert first not in pool.gets
+    assert read_all(client, "/f") == b"abc" + b"\0" * 5 + b"0123456789"
+
+
+def test_read_ending_in_a_short_middle_block_is_zero_filled(client):
+    client.write("/f", b"abc", 0, None)
+    client.write("/f", b"0123456789", 8, None)
+    assert client.read("/f", 8, 0, None) == b"abc" + b"\0" * 5
+    assert client.read("/f", 4, 2, None) == b"c\0\0\0"
+    assert client.read("/f", 20, 16, None) == b"89"
+
+
+def count_lookups(client, monkeypatch):
+    lookups = []
+    lookup = client.master_stub.getFileTableEntry
+    monkeypatch.setattr(client.master_stub, "getFileTableEntry",
+                        lambda request: lookups.append(request.fname) or lookup(request))
+    return lookups
+
+
+def test_writes_do_not_ask_the_master_for_the_size_again(client, monkeypatch):
+    lookups = count_lookups(client, monkeypatch)
+    for offset in range(0, 40, 5):
+        client.write("/f", b"01234", offset, None)
+    assert lookups == ["/f"]
+    assert read_all(client, "/f") == b"01234" * 8
+
+
+def test_renamed_file_keeps_its_known_size(client, monkeypatch):
+    client.write("/d/f", b"abcdefghij", 0, None)
+    client.master_stub.files["/e/f"] = client.master_stub.files.pop("/d/f")
+    client.master_stub.rename = lambda request: master_pb2.Location(path=request.dest)
+    client.rename("/d", "/e")
+    lookups = count_lookups(client, monkeypatch)
+    client.write("/e/f", b"XY", 12, None)
+    assert lookups == []
+    assert read_all(client, "/e/f") == b"abcdefghij\0\0XY"
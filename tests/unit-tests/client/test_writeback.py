@@ -0,0 +1,122 @@
+import time
+
+import pytest
+
+from deedsclient.writeback import WriteBackCache, WriteBuffer
+
+
+class FakeClient:
+    block_size = 4
+
+    def __init__(self):
+        self.files = {}
+        self.fail = False
+
+    def write_extents(self, path, extents):
+        if self.fail:
+            raise IOError("minion down")
+        data = self.files.setdefault(path, bytearray())
+        for offset, chunk in extents:
+            if len(data) < offset + len(chunk):
+                data.extend(bytes(offset + len(chunk) - len(data)))
+            data[offset:offset + len(chunk)] = chunk
+
+
+@pytest.fixture
+def client():
+    return FakeClient()
+
+
+@pytest.fixture
+def cache(client):
+    return WriteBackCache(client, max_age=3600)
+
+
+def test_buffer_merges_overlapping_writes():
+    buffer = WriteBuffer("/f")
+    buffer.add(0, b"aaaa")
+    buffer.add(2, b"bbbb")
+    buffer.add(10, b"c")
+    assert buffer.extents == [[0, bytearray(b"aabbbb")], [10, bytearray(b"c")]]
+    assert buffer.size == 7
+
+
+def test_buffer_grows_the_last_extent_in_place():
+    buffer = WriteBuffer("/f")
+    buffer.add(0, b"ab")
+    tail = buffer.extents[-1][1]
+    buffer.add(2, b"cd")
+    buffer.add(3, b"XYZ")
+    buffer.add(10, b"gap")
+    assert buffer.extents == [[0, bytearray(b"abcXYZ")], [10, bytearray(b"gap")]]
+    assert buffer.extents[0][1] is tail
+    assert buffer.size == 9
+
+
+def test_buffer_size_follows_merges():
+    buffer = WriteBuffer("/f")
+    expected = bytearray(64)
+    written = set()
+    for offset, length in [(40, 8), (0, 4), (20, 6), (2, 20), (30, 30), (60, 4), (10, 1)]:
+        buffer.add(offset, bytes([offset + 1]) * length)
+        expected[offset:offset + length] = bytes([offset + 1]) * length
+        written.update(range(offset, offset + length))
+        assert buffer.size == len(written)
+    assert [start for start, _ in buffer.extents] == sorted(start for start, _ in buffer.extents)
+    for start, buf in buffer.extents:
+        assert buf == expected[start:start + len(buf)]
+
+
+def test_sequential_writes_take_linear_time():
+    buffer = WriteBuffer("/f")
+    chunk = bytes(4096)
+    started = time.monotonic()
+    for i in range(4096):
+        buffer.add(i * len(chunk), chunk)
+    assert time.monotonic() - started < 1.0
+    assert buffer.size == 16 * 1024 * 1024
+    assert len(buffer.extents) == 1
+
+
+def test_aligned_take_keeps_unaligned_tail():
+    buffer = WriteBuffer("/f")
+    buffer.add(0, b"0123456")
+    assert buffer.take(block_size=4) == [(0, b"0123")]
+    assert buffer.extents == [[4, bytearray(b"456")]]
+
+
+def test_flush_stores_merged_extents(client, cache):
+    cache.write(1, "/f", b"hello", 0)
+    cache.write(1, "/f", b" world", 5)
+    assert "/f" not in client.files
+    cache.flush(1)
+    assert client.files["/f"] == b"hello world"
+    assert cache.total_bytes == 0
+
+
+def test_failed_flush_keeps_data(client, cache):
+    cache.write(1, "/f", b"precious", 0)
+    client.fail = True
+    with pytest.raises(IOError):
+        cache.flush(1)
+    assert cache.dirty_end("/f") == 8
+    client.fail = False
+    cache.flush(1)
+    assert client.files["/f"] == b"precious"
+
+
+def test_failed_aligned_flush_keeps_tail_and_head(client, cache):
+    cache.write(1, "/f", b"0123456", 0)
+    client.fail = True
+    with pytest.raises(IOError):
+        cache._flush(cache.buffers[1], aligned=True)
+    assert cache.buffers[1].extents == [[0, bytearray(b"0123456")]]
+
+
+def test_rename_of_directory_moves_buffers_below_it(client, cache):
+    cache.write(1, "/r/x", b"data", 0)
+    cache.write(2, "/rest", b"other", 0)
+    cache.rename("/r", "/s")
+    cache.flush(1)
+    cache.flush(2)
+    assert client.files == {"/s/x": b"data", "/rest": b"other"}
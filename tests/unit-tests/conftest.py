@@ -0,0 +1,4 @@
+# Importing the packages puts the generated protobuf modules (master_pb2, minion_pb2) on
+# sys.path, as it does for the servers and the client; run with PYTHONPATH=./src.
+import deedsclient  # noqa: F401
+import servers  # noqa: F401
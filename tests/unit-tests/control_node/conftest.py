@@ -0,0 +1,24 @@
+"""A master servicer on an in-memory namespace, without operation log, minions or threads"""
+import pytest
+
+from servers.control_node import server
+from servers.control_node.expiry import TimingWheel
+from servers.control_node.locks import LockManager
+from servers.control_node.namespace import Namespace
+from servers.control_node.placement import Placement
+from servers.control_node.server import MasterService
+
+
+@pytest.fixture
+def master(monkeypatch):
+    Master = MasterService.Master
+    monkeypatch.setattr(server, "TTL", 30)
+    monkeypatch.setattr(server, "REFRESH_WINDOW", 5)
+    monkeypatch.setattr(Master, "namespace", Namespace())
+    monkeypatch.setattr(Master, "locks", LockManager())
+    monkeypatch.setattr(Master, "oplog", None)
+    monkeypatch.setattr(Master, "expiry", TimingWheel())
+    monkeypatch.setattr(Master, "minions", {"A": "a:1"})
+    monkeypatch.setattr(Master, "placement", Placement(Master.minions))
+    monkeypatch.setattr(Master, "block_size", 8)
+    return Master
@@ -0,0 +1,61 @@
+from servers.control_node.expiry import TimingWheel
+
+
+def fired(wheel, start, end):
+    """``{ino: second it expired}`` while turning the wheel from ``start`` to ``end``."""
+    seen = {}
+    for now in range(start + 1, end + 1):
+        for ino in wheel.advance(now):
+            seen[ino] = now
+    return seen
+
+
+def test_timers_fire_on_their_deadline_on_every_level():
+    wheel = TimingWheel(slots=4, levels=3)
+    base = wheel._now
+    deadlines = {ino: base + delay for ino, delay in enumerate([1, 3, 4, 5, 15, 16, 17, 40, 63])}
+    wheel.load(deadlines.items())
+    assert fired(wheel, base, base + 70) == deadlines
+    assert len(wheel) == 0
+
+
+def test_deadlines_beyond_the_wheel_are_filed_again():
+    wheel = TimingWheel(slots=4, levels=2)
+    base = wheel._now
+    wheel.arm(1, base + 50)
+    assert fired(wheel, base, base + 60) == {1: base + 50}
+
+
+def test_past_deadlines_fire_on_the_next_tick():
+    wheel = TimingWheel(slots=4, levels=2)
+    base = wheel._now
+    wheel.arm(1, base - 100)
+    assert wheel.advance(base + 1) == [1]
+    assert wheel.lag == 101
+
+
+def test_rearming_moves_and_none_disarms():
+    wheel = TimingWheel(slots=4, levels=3)
+    base = wheel._now
+    wheel.arm(1, base + 2)
+    wheel.arm(2, base + 3)
+    wheel.arm(1, base + 20)
+    wheel.arm(2, None)
+    assert fired(wheel, base, base + 30) == {1: base + 20}
+
+
+
+def test_arm_many_counts_refreshes():
+    wheel = TimingWheel(slots=4, levels=3)
+    base = wheel._now
+    wheel.arm(3, base + 5)
+    wheel.arm_many([(1, base + 5), (2, base + 6), (3, base + 8)], coalesced=4)
+    wheel.arm_many([(1, base + 7)])
+    assert fired(wheel, base, base + 10) == {1: base + 7, 2: base + 6, 3: base + 8}
+    stats = wheel.stats()
+    assert stats["expired"] == 3
+    assert stats["timers"] == 0
+    assert stats["refresh_calls"] == 2
+    assert stats["refreshed"] == 4
+    assert stats["coalesced"] == 4
+    assert stats["calls_saved"] == 6
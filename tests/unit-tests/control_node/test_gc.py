@@ -0,0 +1,177 @@
+import time
+import uuid
+
+import grpc
+import pytest
+
+import minion_pb2
+
+from servers.control_node import gc, oplog
+from servers.control_node.gc import GarbageCollector
+from servers.control_node.namespace import blocks_of, join_replicas, reaped
+from servers.control_node.oplog import OpLog
+
+
+def write(ns, log, inode, blocks):
+    """Replace the blocks of ``inode`` by ``blocks`` new ones on minion "A"; returns the dropped."""
+    before = len(inode.blocks)
+    dropped = inode.blocks.truncate(0)
+    for _ in range(blocks):
+        inode.blocks.append(str(uuid.uuid4()), "A")
+    ns.written(inode, blocks * 10, 0, before)
+    uuids, node_ids = inode.blocks.packed()
+    log.append(oplog.WRITE, inode.ino, inode.size, 0, 0, uuids, join_replicas(node_ids))
+    ns.discard(dropped)
+    return dropped
+
+
+def create(ns, log, path):
+    inode = ns.create(path)
+    log.append(oplog.CREATE, inode.ino, path, 0o644, inode.ctime)
+    return inode
+
+
+def garbage(ns):
+    return {node_id: sorted(pending) for node_id, pending in ns.garbage.items()}
+
+
+class FakeRpcError(grpc.RpcError):
+    pass
+
+
+class FakeStub:
+    def __init__(self, fail=False, statuses=None):
+        self.fail = fail
+        self.statuses = statuses or {}
+        self.deleted = []
+
+    def deleteBlocks(self, request, timeout=None):
+        if self.fail:
+            raise FakeRpcError()
+        self.deleted.extend(request.block_uuids)
+        return minion_pb2.DeleteBlocksResponse(results=[
+            minion_pb2.BlockResult(block_uuid=block_uuid, status=self.statuses.get(block_uuid, minion_pb2.OK))
+            for block_uuid in request.block_uuids])
+
+
+def collector(ns, log, stubs, **kwargs):
+    collector = GarbageCollector(ns, log, {node_id: "fake:0" for node_id in stubs}, **kwargs)
+    collector._stub = stubs.__getitem__
+    return collector
+
+
+def test_queue_follows_writes_removes_and_renames_and_is_recovered(tmp_path):
+    log = OpLog(str(tmp_path / "meta"))
+    ns = log.recover()
+    f = create(ns, log, "/f")
+    write(ns, log, f, 2)
+    overwritten = {block_uuid for block_uuid, _, _ in f.blocks}
+    write(ns, log, f, 1)
+    g = create(ns, log, "/g")
+    write(ns, log, g, 3)
+    log.sync()
+    log.checkpoint(wait=True)
+    replaced = {block_uuid for block_uuid, _, _ in f.blocks}
+    moved = ns.rename("/g", "/f")
+    log.append(oplog.RENAME, "/g", "/f", 0)
+    ns.discard(blocks_of(moved[1]))
+    removed = {block_uuid for block_uuid, _, _ in ns.resolve("/f").blocks}
+    ns.discard(blocks_of(ns.remove("/f")))
+    log.append(oplog.REMOVE, "/f", 0)
+    log.sync()
+    log.close()
+    assert garbage(ns) == {"A": sorted(overwritten | replaced | removed)}
+    # Half of it from the checkpoint, the rest replayed from the segments
+    assert garbage(OpLog(str(tmp_path / "meta")).recover()) == garbage(ns)
+
+
+@pytest.mark.parametrize("nodes", ["", "A"])
+def test_expiry_queues_the_blocks_of_due_files_only_on_the_nodes_it_names(tmp_path, nodes):
+    log = OpLog(str(tmp_path / "meta"))
+    ns = log.recover()
+    d = ns.mkdir("/d")
+    log.append(oplog.MKDIR, d.ino, "/d", d.mode, d.ctime)
+    due, live = create(ns, log, "/d/due"), create(ns, log, "/d/live")
+    write(ns, log, due, 2)
+    write(ns, log, live, 1)
+    for inode in (d, due):
+        inode.expire_at = 100
+        log.append(oplog.EXPIRE, inode.ino, 100)
+    expected = {block_uuid for block_uuid, _, _ in live.blocks}
+    if nodes:
+        expected |= {block_uuid for block_uuid, _, _ in due.blocks}
+    removed = ns.remove("/d", 200)
+    log.append(oplog.REAP, "/d", 200, nodes)
+    ns.discard(reaped(removed, 200, nodes.split(",") if nodes else ()))
+    log.sync()
+    log.close()
+    assert garbage(ns) == {"A": sorted(expected)}
+    assert garbage(OpLog(str(tmp_path / "meta")).recover()) == garbage(ns)
+
+
+def test_collector_drains_the_queue_in_batches_and_logs_it(tmp_path):
+    log = OpLog(str(tmp_path / "meta"))
+    ns = log.recover()
+    f = create(ns, log, "/f")
+    write(ns, log, f, 5)
+    dead = sorted(block_uuid for block_uuid, _, _ in write(ns, log, f, 0))
+    stubs = {"A": FakeStub()}
+    gc_ = collector(ns, log, stubs, batch_blocks=2)
+    assert gc_.pending() == 5
+    while gc_._collect("A"):
+        pass
+    assert sorted(stubs["A"].deleted) == dead
+    assert gc_.collected == 5
+    assert ns.garbage == {}
+    log.sync()
+    log.close()
+    assert OpLog(str(tmp_path / "meta")).recover().garbage == {}
+
+
+def test_missing_blocks_count_as_collected_and_failed_ones_stay_queued(tmp_path):
+    log = OpLog(str(tmp_path / "meta"))
+    ns = log.recover()
+    gone, failed, deleted = (str(uuid.uuid4()) for _ in range(3))
+    ns.discard([(gone, "A"), (failed, "A"), (deleted, "A")])
+    stubs = {"A": FakeStub(statuses={gone: minion_pb2.NOT_FOUND, failed: minion_pb2.FAILED})}
+    gc_ = collector(ns, log, stubs)
+    assert gc_._collect("A")
+    assert garbage(ns) == {"A": [failed]}
+    assert gc_.collected == 2
+    log.close()
+
+
+def test_failing_minion_backs_off_without_holding_up_the_others(tmp_path):
+    log = OpLog(str(tmp_path / "meta"))
+    ns = log.recover()
+    on_a, on_b = str(uuid.uuid4()), str(uuid.uuid4())
+    ns.discard([(on_a, "A"), (on_b, "B")])
+    stubs = {"A": FakeStub(fail=True), "B": FakeStub()}
+    gc_ = collector(ns, log, stubs).start()
+    try:
+        deadline = time.monotonic() + 5
+        while "B" in ns.garbage and time.monotonic() < deadline:
+            gc_.throttle(timeout=0.05)
+    finally:
+        gc_.stop()
+        log.close()
+    assert stubs["B"].deleted == [on_b]
+    assert garbage(ns) == {"A": [on_a]}
+    assert gc_._failures["A"][0] >= 1
+    # Only reachable minions count towards the backlog that throttles writers
+    assert gc_.pending() == 1 and gc_.pending(reachable=True) == 0
+
+
+def test_throttle_holds_callers_while_the_backlog_is_too_long(tmp_path, monkeypatch):
+    log = OpLog(str(tmp_path / "meta"))
+    ns = log.recover()
+    ns.discard([(str(uuid.uuid4()), "A") for _ in range(3)])
+    gc_ = collector(ns, log, {"A": FakeStub()}, max_pending=1)
+    start = time.monotonic()
+    gc_.throttle(timeout=0.2)
+    assert time.monotonic() - start >= 0.2
+    gc_.max_pending = gc.MAX_PENDING
+    start = time.monotonic()
+    gc_.throttle(timeout=5)
+    assert time.monotonic() - start < 1
+    log.close()
@@ -0,0 +1,83 @@
+import threading
+import time
+
+from servers.control_node.locks import LockManager
+
+
+def test_plan_locks_ancestors_shallowest_first():
+    plan = LockManager.plan(reads=["/a/b/c"], writes=["/a/x"])
+    assert plan == [("/", False), ("/a", False), ("/a/b", False), ("/a/x", True), ("/a/b/c", False)]
+
+
+def test_write_lock_on_a_leaf_wins_over_a_read_of_the_same_path():
+    assert dict(LockManager.plan(reads=["/a"], writes=["/a"]))["/a"] is True
+
+
+def test_rename_both_ways_takes_locks_in_the_same_order():
+    assert LockManager.plan(writes=["/a/x", "/b/y"]) == LockManager.plan(writes=["/b/y", "/a/x"])
+
+
+def test_writers_of_one_path_serialize():
+    locks = LockManager()
+    inside, overlaps = [], []
+
+    def work():
+        with locks.locked(writes=["/d/f"]):
+            inside.append(1)
+            if len(inside) > 1:
+                overlaps.append(1)
+            time.sleep(0.01)
+            inside.pop()
+
+    threads = [threading.Thread(target=work) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert overlaps == []
+    assert len(locks) == 0
+
+
+def test_siblings_only_share_the_parent():
+    locks = LockManager()
+    with locks.locked(writes=["/d/f"]):
+        done = threading.Event()
+
+        def other():
+            with locks.locked(writes=["/d/g"]):
+                done.set()
+
+        threading.Thread(target=other).start()
+        assert done.wait(1)
+
+
+def test_directory_cannot_be_locked_for_writing_while_a_child_is_in_use():
+    locks = LockManager()
+    entered = threading.Event()
+    with locks.locked(reads=["/d/f"]):
+        def remove_dir():
+            with locks.locked(writes=["/d"]):
+                entered.set()
+
+        threading.Thread(target=remove_dir, daemon=True).start()
+        assert not entered.wait(0.1)
+    assert entered.wait(1)
+
+
+def test_opposite_renames_do_not_deadlock():
+    locks = LockManager()
+    done = []
+
+    def rename(src, dest):
+        for _ in range(200):
+            with locks.locked(writes=[src, dest]):
+                pass
+        done.append(1)
+
+    threads = [threading.Thread(target=rename, args=("/a/x", "/b/y"), daemon=True),
+               threading.Thread(target=rename, args=("/b/y", "/a/x"), daemon=True)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert len(done) == 2
@@ -0,0 +1,105 @@
+import threading
+import time
+import uuid
+
+from servers.control_node.namespace import BlockMap, NodeIds, Namespace
+
+
+def test_resolve_follows_renamed_directories():
+    ns = Namespace()
+    ns.mkdir("/a")
+    ns.mkdir("/a/b")
+    f = ns.create("/a/b/f")
+    assert ns.resolve("/a/b/f") is f
+    ns.rename("/a", "/z")
+    assert ns.resolve("/a/b/f") is None
+    assert ns.resolve("/z/b/f") is f
+    assert ns.path_of(f) == "/z/b/f"
+
+
+def test_inode_numbers_survive_a_rename():
+    ns = Namespace()
+    f = ns.create("/f")
+    ino = f.ino
+    ns.rename("/f", "/g")
+    assert ns.resolve("/g").ino == ino
+
+
+def test_rename_refuses_to_move_a_directory_below_itself():
+    ns = Namespace()
+    ns.mkdir("/a")
+    ns.mkdir("/a/b")
+    assert ns.rename("/a", "/a/b/c") is None
+
+
+def test_rename_replaces_a_file_but_not_a_full_directory():
+    ns = Namespace()
+    ns.create("/x")
+    old = ns.create("/y")
+    inode, replaced = ns.rename("/x", "/y")
+    assert replaced == [old]
+    assert ns.resolve("/y") is inode
+    ns.mkdir("/d")
+    ns.mkdir("/e")
+    ns.create("/e/f")
+    assert ns.rename("/d", "/e") is None
+
+
+def test_create_needs_an_existing_parent_and_a_free_name():
+    ns = Namespace()
+    assert ns.create("/missing/f") is None
+    ns.create("/f")
+    assert ns.create("/f") is None
+    assert ns.create("/f/g") is None
+
+
+def test_remove_returns_the_subtree_and_updates_link_counts():
+    ns = Namespace()
+    ns.mkdir("/d")
+    ns.mkdir("/d/e")
+    ns.create("/d/x")
+    assert ns.resolve("/d").nlink == 3
+    removed = ns.remove("/d")
+    assert sorted(inode.name for inode in removed) == ["d", "e", "x"]
+    assert ns.resolve("/d/x") is None
+    assert ns.root.nlink == 2
+    assert set(ns.inodes) == {ns.root.ino}
+
+
+def test_block_map_round_trips_uuids_and_replica_sets():
+    blocks = [(str(uuid.uuid4()), ("A", "B")), (str(uuid.uuid4()), ("storage-3",)), (str(uuid.uuid4()), ("A", "B"))]
+    block_map = BlockMap(blocks)
+    assert [(u, n) for u, n, _ in block_map] == blocks
+    assert [index for _, _, index in block_map] == [0, 1, 2]
+    assert block_map[-1] == (blocks[2][0], ("A", "B"), 2)
+    dropped = block_map.truncate(1)
+    assert [u for u, _, _ in dropped] == [blocks[1][0], blocks[2][0]]
+    assert block_map == BlockMap(blocks[:1])
+
+
+class SlowList(list):
+    """Lets other threads run in the middle of adding a name"""
+
+    def append(self, item):
+        time.sleep(0.0001)
+        super().append(item)
+
+
+def test_concurrent_interning_gives_each_replica_set_its_own_number():
+    node_ids = NodeIds()
+    node_ids.names = SlowList()
+    nodes = [(f"node-{i}", f"node-{i + 1}") for i in range(200)]
+    start = threading.Barrier(8)
+
+    def intern():
+        start.wait()
+        for node_id in nodes:
+            node_ids.number(node_id)
+
+    threads = [threading.Thread(target=intern) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(node_ids.names) == len(nodes)
+    assert all(node_ids.names[node_ids.number(node_id)] == node_id for node_id in nodes)
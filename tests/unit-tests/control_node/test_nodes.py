@@ -0,0 +1,144 @@
+import threading
+import time
+import uuid
+
+import master_pb2
+
+from servers.control_node.namespace import Namespace
+from servers.control_node.nodes import NodeRegistry, usable_bytes
+
+
+def file_with_blocks(namespace, path, *replica_sets):
+    inode = namespace.create(path)
+    for replicas in replica_sets:
+        inode.blocks.append(str(uuid.uuid4()), replicas)
+    return [block_uuid for block_uuid, _, _ in inode.blocks]
+
+
+def full_report(registry, node_id, blocks):
+    return registry.heartbeat(master_pb2.Heartbeat(node_id=node_id, added=blocks, full_report=True,
+                                                   last_page=True))
+
+
+class CountingLock:
+    """RLock that counts how often it was taken from outside"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.depth = 0
+        self.acquired = 0
+
+    def __enter__(self):
+        self._lock.acquire()
+        self.depth += 1
+        if self.depth == 1:
+            self.acquired += 1
+
+    def __exit__(self, *exc):
+        self.depth -= 1
+        self._lock.release()
+
+
+def test_orphans_are_handed_back_after_two_passes():
+    namespace = Namespace()
+    registry = NodeRegistry(namespace, {"A": "a:1"}, batch=1)
+    kept = file_with_blocks(namespace, "/f", ("A",), ("A",))
+    orphan = str(uuid.uuid4())
+    full_report(registry, "A", kept + [orphan])
+    registry.reconcile()
+    assert registry.nodes["A"].stale == []
+    registry.reconcile()
+    assert registry.nodes["A"].stale == [orphan]
+    _, stale, _, _ = registry.heartbeat(master_pb2.Heartbeat(node_id="A"))
+    assert list(stale) == [orphan]
+
+
+def test_garbage_is_not_an_orphan_and_missing_blocks_are_counted():
+    namespace = Namespace()
+    registry = NodeRegistry(namespace, {"A": "a:1"})
+    blocks = file_with_blocks(namespace, "/f", ("A",), ("A",))
+    dead = str(uuid.uuid4())
+    namespace.discard([(dead, ("A",))])
+    full_report(registry, "A", blocks[:1] + [dead])
+    registry.reconcile()
+    registry.reconcile()
+    assert registry.nodes["A"].stale == []
+    assert registry.nodes["A"].missing == 1
+
+
+def test_walk_releases_the_namespace_mutex_between_batches():
+    namespace = Namespace()
+    for i in range(10):
+        file_with_blocks(namespace, f"/f{i}", ("A",))
+    registry = NodeRegistry(namespace, {"A": "a:1"}, batch=3)
+    full_report(registry, "A", [])
+    namespace.mutex = CountingLock()
+    registry.reconcile()
+    # 11 inodes (the root and ten files), three per hold of the mutex
+    assert namespace.mutex.acquired == 4
+
+
+def test_full_report_resends_the_deadlines_of_the_node_blocks():
+    namespace = Namespace()
+    registry = NodeRegistry(namespace, {"A": "a:1", "B": "b:1"})
+    blocks = file_with_blocks(namespace, "/f", ("A", "B"))
+    namespace.resolve("/f").expire_at = 1234
+    forever = file_with_blocks(namespace, "/forever", ("A",))
+    full_report(registry, "A", blocks)
+    registry.reconcile()
+    # Blocks without a deadline are sent 0, in case the node still has an old one
+    assert registry.nodes["A"].deadlines == {blocks[0]: 1234, forever[0]: 0}
+    assert registry.nodes["B"].deadlines == {}
+    assert registry.nodes["A"].resend is False
+
+
+def test_deadlines_are_sent_until_acknowledged():
+    namespace = Namespace()
+    registry = NodeRegistry(namespace, {"A": "a:1"})
+    first, second = file_with_blocks(namespace, "/f", ("A",), ("A",))
+    registry.push_deadlines(namespace.resolve("/f").blocks, 100)
+    _, _, deadlines, seq = registry.heartbeat(master_pb2.Heartbeat(node_id="A"))
+    assert deadlines == [(first, 100), (second, 100)] and seq
+    # The answer was lost: the next heartbeat does not acknowledge it
+    assert registry.heartbeat(master_pb2.Heartbeat(node_id="A"))[2:] == (deadlines, seq)
+    # A newer deadline waits until the batch in flight is acknowledged
+    registry.push_deadlines([namespace.resolve("/f").blocks[0]], 200)
+    assert registry.heartbeat(master_pb2.Heartbeat(node_id="A", deadlines_ack=seq - 1))[2:] == (deadlines, seq)
+    _, _, deadlines, newer = registry.heartbeat(master_pb2.Heartbeat(node_id="A", deadlines_ack=seq))
+    assert deadlines == [(first, 200)] and newer > seq
+    assert registry.heartbeat(master_pb2.Heartbeat(node_id="A", deadlines_ack=newer))[2:] == ([], 0)
+
+
+def test_unknown_nodes_are_refused():
+    registry = NodeRegistry(Namespace(), {"A": "a:1"})
+    assert registry.heartbeat(master_pb2.Heartbeat(node_id="Z")) is None
+
+
+def beat(registry, node_id, free_bytes=600):
+    return registry.heartbeat(master_pb2.Heartbeat(node_id=node_id, total_bytes=1000, free_bytes=free_bytes))
+
+
+def test_usable_bytes_count_every_copy_once_per_node():
+    assert usable_bytes([100, 100, 100], 1) == 300
+    assert usable_bytes([100, 100, 100], 2) == 150
+    # Every block needs a copy on one of the small nodes
+    assert usable_bytes([1000, 10, 10], 2) == 20
+    # Fewer nodes than replicas: each block is on all of them
+    assert usable_bytes([100, 40], 3) == 40
+    assert usable_bytes([], 2) == 0
+
+
+def test_statfs_totals_leave_out_dead_nodes_and_divide_by_the_replication():
+    registry = NodeRegistry(Namespace(), {"A": "a:1", "B": "b:1", "C": "c:1"}, dead_after=0.2,
+                            reconcile_interval=3600, replication=2).start()
+    for node_id in "ABC":
+        beat(registry, node_id)
+    assert registry.totals == (1500, 900)
+    # C goes silent while A and B keep beating
+    deadline = time.monotonic() + 5
+    while "C" in registry.stats and time.monotonic() < deadline:
+        beat(registry, "A")
+        beat(registry, "B")
+        time.sleep(0.05)
+    assert set(registry.stats) == {"A", "B"}
+    assert registry.totals == (1000, 600)
@@ -0,0 +1,122 @@
+import os
+import threading
+
+import pytest
+
+from servers.control_node import oplog
+from servers.control_node.oplog import LogError, OpLog
+
+
+def mkdir(namespace, log, path):
+    inode = namespace.mkdir(path)
+    log.append(oplog.MKDIR, inode.ino, path, 0o755, inode.ctime)
+    return inode
+
+
+def names(namespace):
+    return sorted(namespace.path_of(inode) for inode in namespace.walk())
+
+
+@pytest.fixture
+def directory(tmp_path):
+    return str(tmp_path / "meta")
+
+
+def test_concurrent_appends_share_syncs_and_recover(directory):
+    log = OpLog(directory)
+    namespace = log.recover()
+    lock = threading.Lock()
+
+    def work(worker):
+        for i in range(50):
+            with lock:
+                mkdir(namespace, log, f"/w{worker}-{i}")
+            log.sync()
+
+    threads = [threading.Thread(target=work, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert log.durable_seq == log.last_seq == 200
+    log.close()
+    assert names(OpLog(directory).recover()) == names(namespace)
+
+
+def test_checkpoint_folds_segments_and_recovery_replays_the_rest(directory):
+    log = OpLog(directory)
+    namespace = log.recover()
+    for i in range(10):
+        mkdir(namespace, log, f"/before{i}")
+    log.sync()
+    log.checkpoint(wait=True)
+    mkdir(namespace, log, "/after")
+    log.sync()
+    log.close()
+    assert [seq for seq, _ in log.checkpoints()] == [10]
+    assert all(first_seq > 10 for first_seq, _ in log.segments())
+    assert names(OpLog(directory).recover()) == names(namespace)
+
+
+def test_torn_tail_is_cut_off(directory):
+    log = OpLog(directory)
+    namespace = log.recover()
+    mkdir(namespace, log, "/kept")
+    log.sync()
+    log.close()
+    _, path = log.segments()[-1]
+    with open(path, "ab") as f:
+        f.write(oplog.frame(2, oplog.MKDIR, oplog.encode((9, "/torn", 0o755, 0)))[:-3])
+    recovered = OpLog(directory)
+    assert names(recovered.recover()) == ["/", "/kept"]
+    recovered.close()
+
+
+def test_torn_middle_segment_fails_recovery(directory):
+    first = OpLog(directory)
+    namespace = first.recover()
+    mkdir(namespace, first, "/a")
+    mkdir(namespace, first, "/b")
+    first.sync()
+    first.close()
+    second = OpLog(directory)
+    namespace = second.recover()
+    mkdir(namespace, second, "/c")
+    second.sync()
+    second.close()
+    _, path = first.segments()[0]
+    with open(path, "r+b") as f:
+        f.seek(os.path.getsize(path) - 1)
+        f.write(b"\xff")
+    with pytest.raises(LogError):
+        OpLog(directory).recover()
+
+
+def test_append_after_close_raises(directory):
+    log = OpLog(directory)
+    namespace = log.recover()
+    mkdir(namespace, log, "/a")
+    log.close()
+    assert log.durable_seq == 1
+    with pytest.raises(LogError):
+        log.append(oplog.MKDIR, 5, "/late", 0o755, 0)
+
+
+def test_close_wakes_up_waiters_of_records_never_written(directory):
+    log = OpLog(directory)
+    # No writer thread: the record stays queued
+    seq = log.append(oplog.MKDIR, 2, "/a", 0o755, 0)
+    errors = []
+
+    def wait():
+        try:
+            log.sync(seq)
+        except LogError as e:
+            errors.append(e)
+
+    waiter = threading.Thread(target=wait, daemon=True)
+    waiter.start()
+    log.close()
+    waiter.join(5)
+    assert not waiter.is_alive()
+    assert len(errors) == 1
@@ -0,0 +1,102 @@
+import uuid
+
+import grpc
+import pytest
+
+import master_pb2
+from servers.control_node.nodes import NodeRegistry
+from servers.control_node.server import MasterService
+
+
+class Context:
+    """Records the status a servicer method sets"""
+
+    def __init__(self):
+        self.code = None
+        self.details = None
+
+    def set_code(self, code):
+        self.code = code
+
+    def set_details(self, details):
+        self.details = details
+
+
+@pytest.fixture
+def service(master):
+    service = MasterService()
+    service.mkdir(master_pb2.Location(path="/d", mode=0o755), Context())
+    for path in ("/f", "/d/g"):
+        service.write(master_pb2.WriteRequest(dest=path, size=20), Context())
+    return service
+
+
+def expire(master, path):
+    # Past its deadline, with the timer not fired yet
+    master.namespace.resolve(path).expire_at -= 3600
+
+
+def read(service, path):
+    context = Context()
+    mapping = service.read(master_pb2.ReadRequest(fname=path), context)
+    return context.code, len(mapping.blocks)
+
+
+def listing(service, path):
+    return sorted(service.getListOfFiles(master_pb2.Location(path=path), Context()).files)
+
+
+@pytest.mark.parametrize("expired, path", [("/f", "/f"), ("/d", "/d/g")])
+def test_expired_entries_read_as_not_found(master, service, expired, path):
+    assert read(service, path) == (None, 3)
+    expire(master, expired)
+    assert read(service, path) == (grpc.StatusCode.NOT_FOUND, 0)
+    context = Context()
+    service.open(master_pb2.OpenRequest(fname=path), context)
+    assert context.code == grpc.StatusCode.NOT_FOUND
+    # Still in the tree until the timer fires, but only the expiry backend sees it
+    assert master.namespace.resolve(path) is not None
+
+
+def test_expired_entries_are_left_out_of_listings(master, service):
+    assert listing(service, "/") == ["d", "f"]
+    expire(master, "/f")
+    assert listing(service, "/") == ["d"]
+    assert listing(service, "/d") == ["g"]
+    expire(master, "/d")
+    assert listing(service, "/") == []
+    assert listing(service, "/d") == []
+
+
+def test_write_recreates_an_expired_file(master, service):
+    old = master.namespace.resolve("/f")
+    expire(master, "/f")
+    context = Context()
+    blocks = service.write(master_pb2.WriteRequest(dest="/f", size=4), context).blocks
+    assert context.code is None and len(blocks) == 1
+    new = master.namespace.resolve("/f")
+    assert new is not old and new.expire_at > old.expire_at
+    assert read(service, "/f") == (None, 1)
+    # No block inventory from "A": the garbage collector deletes the old blocks there
+    assert {block_uuid for block_uuid, _, _ in old.blocks} <= set(master.namespace.garbage["A"])
+
+
+def test_blocks_of_expired_files_are_left_to_the_minions_that_report(master, service, monkeypatch):
+    monkeypatch.setattr(master, "minions", {"A": "a:1", "B": "b:1"})
+    monkeypatch.setattr(master, "nodes", NodeRegistry(master.namespace, master.minions))
+    master.nodes.heartbeat(master_pb2.Heartbeat(node_id="A", full_report=True, last_page=True))
+    block_uuid = str(uuid.uuid4())
+    master.namespace.resolve("/f").blocks.append(block_uuid, ("A", "B"))
+    expire(master, "/f")
+    master.expire([master.namespace.resolve("/f").ino])
+    assert master.namespace.resolve("/f") is None
+    # "A" deletes the blocks by itself, "B" sends no heartbeats
+    assert {node_id: list(pending) for node_id, pending in master.namespace.garbage.items()} == {"B": [block_uuid]}
+
+
+def test_write_below_an_expired_directory_is_refused(master, service):
+    expire(master, "/d")
+    context = Context()
+    service.write(master_pb2.WriteRequest(dest="/d/h", size=4), context)
+    assert context.code == grpc.StatusCode.NOT_FOUND
+    assert read(service, "/d/h") == (grpc.StatusCode.NOT_FOUND, 0)
@@ -0,0 +1,63 @@
+import collections
+import random
+import types
+
+import pytest
+
+from servers.control_node.placement import Placement
+
+
+@pytest.fixture(autouse=True)
+def seeded():
+    random.seed(1234)
+
+
+def registry(**stats):
+    return types.SimpleNamespace(stats={node_id: (100, free, latency, inflight)
+                                        for node_id, (free, latency, inflight) in stats.items()})
+
+
+def test_replicas_are_distinct():
+    placement = Placement({"A": "a", "B": "b", "C": "c"}, replication=3)
+    for replicas in placement.choose(50):
+        assert sorted(replicas) == ["A", "B", "C"]
+
+
+def test_replication_is_capped_by_the_minions_available():
+    placement = Placement({"A": "a", "B": "b"}, replication=3)
+    assert all(len(replicas) == 2 for replicas in placement.choose(10))
+
+
+def test_replicas_spread_over_failure_domains():
+    minions = {"A": "a", "B": "b", "C": "c", "D": "d"}
+    domains = {"A": "rack1", "B": "rack1", "C": "rack2", "D": "rack2"}
+    placement = Placement(minions, replication=2, domains=domains)
+    for replicas in placement.choose(200):
+        assert {domains[node_id] for node_id in replicas} == {"rack1", "rack2"}
+
+
+def test_full_and_unreported_nodes_get_nothing():
+    nodes = registry(A=(50, 0, 0), B=(0, 0, 0))
+    placement = Placement({"A": "a", "B": "b", "C": "c"}, nodes=nodes)
+    assert placement.weights() == {"A": 1.0}
+    assert {replicas for replicas in placement.choose(20)} == {("A",)}
+
+
+def test_everything_full_falls_back_to_all_nodes():
+    placement = Placement({"A": "a", "B": "b"}, nodes=registry(A=(0, 0, 0), B=(0, 0, 0)))
+    assert placement.weights() == {"A": 1.0, "B": 1.0}
+
+
+def test_free_space_latency_and_requests_lower_the_weight():
+    nodes = registry(A=(100, 0, 0), B=(50, 0, 0), C=(100, 0.01, 0), D=(100, 0, 16))
+    weights = Placement(dict.fromkeys("ABCD", ""), nodes=nodes).weights()
+    assert weights == pytest.approx({"A": 1.0, "B": 0.5, "C": 0.5, "D": 0.5})
+
+
+def test_recent_placements_steer_new_blocks_elsewhere():
+    placement = Placement({"A": "a", "B": "b"})
+    placement.choose(1000)
+    weights = placement.weights()
+    assert weights["A"] < 0.8 and weights["B"] < 0.8
+    counts = collections.Counter(replicas[0] for replicas in placement.choose(4000))
+    assert abs(counts["A"] - counts["B"]) < 800
@@ -0,0 +1,25 @@
+def test_creates_below_a_directory_refresh_it_once_per_window(master):
+    master.mkdir("/d", 0o755)
+    for i in range(10):
+        master.create(f"/d/f{i}", 0o644)
+    stats = master.expiry.stats()
+    assert stats["refresh_calls"] == 11
+    assert stats["coalesced"] == 10
+    assert stats["refreshed"] == 11
+
+
+def test_directories_past_the_window_are_refreshed(master):
+    d = master.mkdir("/d", 0o755)
+    d.expire_at -= 10
+    master.create("/d/f", 0o644)
+    assert d.expire_at == master.namespace.resolve("/d/f").expire_at
+    assert master.expiry.stats()["coalesced"] == 0
+
+
+def test_a_later_deadline_is_kept_and_not_counted_as_coalesced(master):
+    d = master.mkdir("/d", 0o755)
+    master._set_expire(d, 3600)
+    later = d.expire_at
+    master.create("/d/f", 0o644)
+    assert d.expire_at == later
+    assert master.expiry.stats()["coalesced"] == 0
@@ -0,0 +1,97 @@
+import time
+from concurrent import futures
+
+import backup_master_pb2_grpc
+import grpc
+import pytest
+
+from servers.contorl_node_backup.server import BackUpServer, ReplicaStore
+from servers.control_node import oplog, replication
+from servers.control_node.oplog import OpLog
+from servers.control_node.replication import Replicator
+
+
+def mkdir(namespace, log, path):
+    inode = namespace.mkdir(path)
+    log.append(oplog.MKDIR, inode.ino, path, 0o755, inode.ctime)
+
+
+def names(namespace):
+    return sorted(namespace.path_of(inode) for inode in namespace.walk())
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def backup(tmp_path, monkeypatch):
+    directory = tmp_path / "backup"
+    directory.mkdir()
+    store = ReplicaStore(str(directory))
+    monkeypatch.setattr(BackUpServer, "store", store)
+    server = grpc.server(futures.ThreadPoolExecutor(4))
+    backup_master_pb2_grpc.add_BackUpServiceServicer_to_server(BackUpServer(), server)
+    port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+    yield f"127.0.0.1:{port}", store
+    server.stop(None)
+    store.close()
+
+
+@pytest.fixture
+def master(tmp_path):
+    log = OpLog(str(tmp_path / "meta"))
+    namespace = log.recover()
+    yield log, namespace
+    log.close()
+
+
+def test_backup_receives_the_checkpoint_and_the_log_after_it(master, backup):
+    log, namespace = master
+    address, store = backup
+    for i in range(10):
+        mkdir(namespace, log, f"/before{i}")
+    log.sync()
+    log.checkpoint(wait=True)
+    for i in range(5):
+        mkdir(namespace, log, f"/after{i}")
+    log.sync()
+
+    replicator = Replicator(log, address, batch_records=2).start()
+    try:
+        wait_for(lambda: replicator.acked_seq == log.last_seq)
+    finally:
+        replicator.stop()
+    assert store.seq == 15
+    assert [seq for seq, _ in oplog.list_files(store.directory, "checkpoint.")] == [10]
+    store.close()
+    assert names(OpLog(store.directory).recover()) == names(namespace)
+
+
+def test_replication_backs_off_and_retries_after_a_log_error(master, backup, monkeypatch):
+    log, namespace = master
+    address, store = backup
+    mkdir(namespace, log, "/d")
+    log.sync()
+    monkeypatch.setattr(replication, "BACKOFF_MAX", 0)
+    segments = log.segments
+    failures = []
+
+    def flaky_segments():
+        if not failures:
+            failures.append(1)
+            raise OSError("disk hiccup")
+        return segments()
+
+    monkeypatch.setattr(log, "segments", flaky_segments)
+    replicator = Replicator(log, address).start()
+    try:
+        wait_for(lambda: replicator.acked_seq == log.last_seq)
+    finally:
+        replicator.stop()
+    assert failures == [1]
+    assert store.seq == 1
@@ -0,0 +1,102 @@
+import time
+import uuid
+
+from servers.control_node.locks import LockManager
+from servers.control_node.namespace import Namespace
+from servers.control_node.retention import Job, RetentionJobs
+
+
+class Timers:
+    def __init__(self):
+        self.calls = []
+
+    def arm_many(self, timers, coalesced=0):
+        self.calls.append(list(timers))
+
+
+class Registry:
+    def __init__(self):
+        self.pushed = []
+
+    def push_deadlines(self, blocks, deadline):
+        self.pushed.extend((block_uuid, deadline) for block_uuid, _, _ in blocks)
+
+
+def tree():
+    ns = Namespace()
+    ns.mkdir("/logs")
+    ns.mkdir("/logs/old")
+    for path in ["/logs/a.log", "/logs/b.txt", "/logs/old/c.log", "/other.log"]:
+        ns.create(path)
+    return ns
+
+
+def run(ns, path, ttl, recursive=True, pattern="", **kwargs):
+    timers = Timers()
+    jobs = RetentionJobs(ns, LockManager(), None, timers, **kwargs)
+    job = jobs.submit(path, ttl, recursive, pattern)
+    deadline = time.monotonic() + 5
+    while not job.done and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert job.done
+    assert jobs.get(job.job_id) is job
+    return job, timers
+
+
+def deadlines(ns):
+    return {ns.path_of(inode): inode.expire_at for inode in ns.walk() if inode.expire_at is not None}
+
+
+def test_recursive_job_sets_the_whole_subtree():
+    ns = tree()
+    job, timers = run(ns, "/logs", 100)
+    now = int(time.time())
+    found = deadlines(ns)
+    assert sorted(found) == ["/logs", "/logs/a.log", "/logs/b.txt", "/logs/old", "/logs/old/c.log"]
+    assert all(now + 99 <= deadline <= now + 100 for deadline in found.values())
+    assert (job.scanned, job.updated, job.error) == (5, 5, "")
+    assert sum(len(call) for call in timers.calls) == 5
+
+
+def test_pattern_selects_entries_by_name():
+    ns = tree()
+    job, _ = run(ns, "/", 100, pattern="*.log")
+    assert sorted(deadlines(ns)) == ["/logs/a.log", "/logs/old/c.log", "/other.log"]
+    assert job.updated == 3
+
+
+def test_without_recursive_only_the_path_changes():
+    ns = tree()
+    run(ns, "/logs", 100, recursive=False)
+    assert list(deadlines(ns)) == ["/logs"]
+
+
+def test_zero_ttl_clears_deadlines_and_the_root_keeps_none():
+    ns = tree()
+    run(ns, "/", 100)
+    assert "/" not in deadlines(ns)
+    job, timers = run(ns, "/logs", 0)
+    assert sorted(deadlines(ns)) == ["/other.log"]
+    assert all(deadline is None for call in timers.calls for _, deadline in call)
+
+
+def test_batches_arm_their_timers_separately():
+    ns = tree()
+    _, timers = run(ns, "/", 100, batch=2)
+    assert [len(call) for call in timers.calls] == [1, 2, 2, 1]
+
+
+def test_deadlines_of_blocks_go_to_the_minions():
+    ns = tree()
+    inode = ns.resolve("/logs/a.log")
+    block_uuid = str(uuid.uuid4())
+    inode.blocks.append(block_uuid, ("A", "B"))
+    registry = Registry()
+    RetentionJobs(ns, LockManager(), None, None, registry)._step(Job(1, "/logs/a.log", 100, False, ""), [inode])
+    assert registry.pushed == [(block_uuid, inode.expire_at)]
+
+
+def test_missing_path_fails_the_job():
+    job, timers = run(tree(), "/nope", 100)
+    assert job.error == "No such file or directory"
+    assert timers.calls == []
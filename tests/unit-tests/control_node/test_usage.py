@@ -0,0 +1,50 @@
+import uuid
+
+from servers.control_node import oplog
+from servers.control_node.namespace import Namespace
+from servers.control_node.oplog import OpLog
+
+
+def usage(ns):
+    return ns.files, ns.directories, ns.used_blocks, ns.used_bytes
+
+
+def write(ns, inode, num_blocks, size):
+    before = len(inode.blocks)
+    inode.blocks.truncate(num_blocks)
+    while len(inode.blocks) < num_blocks:
+        inode.blocks.append(str(uuid.uuid4()), "A")
+    ns.written(inode, size, 0, before)
+
+
+def test_counters_follow_creates_writes_and_removes():
+    ns = Namespace()
+    # The root directory counts
+    assert usage(ns) == (0, 1, 0, 0)
+    ns.mkdir("/d")
+    f = ns.create("/d/f")
+    g = ns.create("/g")
+    write(ns, f, 3, 150)
+    write(ns, g, 1, 10)
+    assert usage(ns) == (2, 2, 4, 160)
+    write(ns, f, 1, 40)
+    assert usage(ns) == (2, 2, 2, 50)
+    ns.remove("/d")
+    assert usage(ns) == (1, 1, 1, 10)
+
+
+def test_counters_are_rebuilt_on_recovery(tmp_path):
+    log = OpLog(str(tmp_path / "meta"))
+    ns = log.recover()
+    inode = ns.mkdir("/d")
+    log.append(oplog.MKDIR, inode.ino, "/d", 0o755, inode.ctime)
+    inode = ns.create("/d/f")
+    log.append(oplog.CREATE, inode.ino, "/d/f", 0o644, inode.ctime)
+    log.sync()
+    log.checkpoint(wait=True)
+    inode = ns.create("/g")
+    log.append(oplog.CREATE, inode.ino, "/g", 0o644, inode.ctime)
+    log.sync()
+    log.close()
+    assert usage(OpLog(str(tmp_path / "meta")).recover()) == usage(ns) == (2, 2, 0, 0)
+
@@ -0,0 +1,5 @@
+import os
+import tempfile
+
+# Importing the storage node package creates its data directory; keep it out of $HOME
+os.environ.setdefault("GFS_DATA_DIR", tempfile.mkdtemp(prefix="deeds-test-"))
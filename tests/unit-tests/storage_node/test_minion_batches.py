@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+import minion_pb2
+from servers.storage_node import server
+
+
+@pytest.fixture
+def minion(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "DATA_DIR", str(tmp_path))
+    minion = server.MinionService()
+    for name in ("b1", "b2", "b3"):
+        minion.put(minion_pb2.PutRequest(block_uuid=name, data=name.encode() * 100), None)
+    return minion
+
+
+def statuses(results):
+    return [(result.block_uuid, result.status) for result in results]
+
+
+def test_multiget_streams_blocks_in_request_order(minion):
+    responses = list(minion.multiGet(minion_pb2.MultiGetRequest(block_uuids=["b3", "missing", "b1"]), None))
+    assert statuses(responses) == [("b3", minion_pb2.OK), ("missing", minion_pb2.NOT_FOUND), ("b1", minion_pb2.OK)]
+    assert [response.data for response in responses] == [b"b3" * 100, b"", b"b1" * 100]
+
+
+def test_delete_blocks_reports_each_block(minion, tmp_path):
+    response = minion.deleteBlocks(minion_pb2.DeleteBlocksRequest(block_uuids=["b1", "missing", "b3"]), None)
+    assert statuses(response.results) == [
+        ("b1", minion_pb2.OK), ("missing", minion_pb2.NOT_FOUND), ("b3", minion_pb2.OK)]
+    assert sorted(os.listdir(tmp_path)) == ["b2"]
+
+
+def test_failing_fstat_fails_only_its_block(minion, tmp_path, monkeypatch):
+    fstat, close, closed = os.fstat, os.close, []
+
+    def fstat_failing_on_b2(fd):
+        if os.readlink(f"/proc/self/fd/{fd}").endswith("/b2"):
+            raise OSError("I/O error")
+        return fstat(fd)
+
+    def recording_close(fd):
+        closed.append(fd)
+        close(fd)
+
+    monkeypatch.setattr(os, "fstat", fstat_failing_on_b2)
+    monkeypatch.setattr(os, "close", recording_close)
+    response = minion.deleteBlocks(minion_pb2.DeleteBlocksRequest(block_uuids=["b1", "b2", "b3"]), None)
+    assert statuses(response.results) == [("b1", minion_pb2.OK), ("b2", minion_pb2.FAILED), ("b3", minion_pb2.OK)]
+    assert len(closed) == 3
+    assert sorted(os.listdir(tmp_path)) == ["b2"]
@@ -0,0 +1,26 @@
+import os
+
+import pytest
+
+import minion_pb2
+from servers.storage_node import server
+
+
+@pytest.fixture
+def minion(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "DATA_DIR", str(tmp_path))
+    return server.MinionService()
+
+
+def test_delete_acknowledges_and_removes_the_block(minion, tmp_path):
+    minion.put(minion_pb2.PutRequest(block_uuid="b1", data=b"secret"), None)
+    assert os.path.isfile(tmp_path / "b1")
+    response = minion.deleteBlock(minion_pb2.DeleteRequest(block_uuid="b1"), None)
+    assert response.success
+    assert not os.path.exists(tmp_path / "b1")
+
+
+def test_delete_of_a_missing_block_is_not_an_error(minion):
+    # The collector retries batches, so a block may already be gone
+    response = minion.deleteBlock(minion_pb2.DeleteRequest(block_uuid="never-stored"), None)
+    assert not response.success
@@ -0,0 +1,68 @@
+import minion_pb2
+
+from servers.storage_node.reclaim import ExpiryIndex, Reclaimer
+
+
+def index_in(tmp_path, blocks=()):
+    index = ExpiryIndex(str(tmp_path))
+    index.load(set(blocks))
+    return index
+
+
+def test_later_deadlines_and_zero_supersede_earlier_ones(tmp_path):
+    index = index_in(tmp_path)
+    index.set([("a", 10), ("b", 10), ("c", 10)])
+    index.set([("a", 50), ("b", 0)])
+    assert index.due(20) == ["c"]
+    assert index.due(60) == ["a"]
+
+
+def test_due_hands_out_batches(tmp_path):
+    index = index_in(tmp_path)
+    index.set((f"b{i}", 10 + i) for i in range(5))
+    assert index.due(100, limit=2) == ["b0", "b1"]
+    assert index.due(100, limit=10) == ["b2", "b3", "b4"]
+
+
+def test_journal_survives_a_restart_for_the_blocks_still_on_disk(tmp_path):
+    index = index_in(tmp_path)
+    index.set([("a", 10), ("b", 20), ("gone", 30)])
+    index.set([("a", 40), ("b", 0)])
+    with open(index.path, "a") as f:
+        f.write("torn")
+    index._journal.close()
+    again = index_in(tmp_path, {"a", "b"})
+    assert again.deadlines == {"a": 40}
+    with open(again.path) as f:
+        assert f.read() == "a 40\n"
+
+
+def test_reclaimer_waits_for_the_grace_period(tmp_path):
+    index = index_in(tmp_path)
+    index.set([("a", 100), ("b", 100), ("c", 200)])
+    deleted = []
+
+    def delete(batch):
+        deleted.append(list(batch))
+        return [(block_uuid, minion_pb2.OK, "") for block_uuid in batch]
+
+    reclaimer = Reclaimer(index, delete, grace=60, batch=1)
+    assert reclaimer.reclaim(159) == 0
+    assert reclaimer.reclaim(160) == 2
+    assert deleted == [["a"], ["b"]]
+    assert index.deadlines == {"c": 200}
+    assert reclaimer.reclaimed == 2
+
+
+def test_failed_deletes_are_left_to_the_master(tmp_path):
+    index = index_in(tmp_path)
+    index.set([("a", 10), ("b", 10)])
+
+    def delete(batch):
+        return [(block_uuid, minion_pb2.OK if block_uuid == "a" else minion_pb2.FAILED, "")
+                for block_uuid in batch]
+
+    reclaimer = Reclaimer(index, delete, grace=0)
+    assert reclaimer.reclaim(10) == 1
+    assert index.deadlines == {}
+    assert reclaimer.reclaim(10) == 0